@@ -0,0 +1,4 @@
+"""Бенчмарки проектов ya_news и ya_note.
+
+Запускаются из корня репозитория: python -m benchmarks.<имя> --help
+"""
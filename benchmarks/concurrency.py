@@ -0,0 +1,276 @@
+"""Синхронный WSGI против асинхронного ASGI при медленных клиентах.
+
+На тех же данных, что и benchmarks.load, страницы чтения вызываются
+--clients одновременными клиентами в трёх режимах:
+
+- wsgi — WSGIHandler и --workers рабочих потоков, как у синхронного
+  сервера: поток занят, пока ответ отдаётся медленному клиенту;
+- asgi-sync — ASGIHandler с обычными представлениями, которые
+  Django 3.2 выполняет по очереди в одном общем потоке;
+- asgi-async — ASGIHandler с асинхронными представлениями
+  (NEWS_ASYNC_VIEWS / NOTES_ASYNC_VIEWS), работающими в пуле потоков.
+
+Медленный клиент принимает тело ответа --client-delay миллисекунд.
+Сервер не нужен: обработчики вызываются напрямую, так что сравнивается
+только модель исполнения Django. Каждый режим идёт в своём процессе,
+результат — JSON с пропускной способностью и задержками.
+
+python -m benchmarks.concurrency ya_news --clients 64 --workers 8
+"""
+import argparse
+import asyncio
+import io
+import json
+import queue
+import random
+import subprocess
+import sys
+import threading
+import time
+
+from .django_setup import ROOT, setup
+from .load import (
+    PROJECTS, git_revision, seed_news, seed_notes, session_cookie, summarize
+)
+
+MODES = ('wsgi', 'asgi-sync', 'asgi-async')
+ASYNC_SETTINGS = {
+    'ya_news': 'NEWS_ASYNC_VIEWS',
+    'ya_note': 'NOTES_ASYNC_VIEWS',
+}
+HOST = 'testserver'
+
+
+def news_pages(rng, args):
+    """Страницы читателей, вошедших на сайт: их не отдаёт кеш."""
+    from django.urls import reverse
+
+    world = seed_news(rng, args)
+    pages = []
+    for _ in range(args.pages):
+        pages.append((rng.choice(world['users']), reverse('news:home')))
+        pages.append((
+            rng.choice(world['users']),
+            reverse('news:detail', args=(rng.choice(world['news']),))
+        ))
+    return pages
+
+
+def notes_pages(rng, args):
+    from django.urls import reverse
+
+    from notes.models import Note
+
+    seed_notes(rng, args)
+    notes = list(Note.objects.values_list('author_id', 'slug'))
+    pages = []
+    for _ in range(args.pages):
+        author_id, slug = rng.choice(notes)
+        pages.append((author_id, reverse('notes:list')))
+        pages.append((author_id, reverse('notes:detail', args=(slug,))))
+    return pages
+
+
+PAGES = {
+    'ya_news': news_pages,
+    'ya_note': notes_pages,
+}
+
+
+def wsgi_environ(path, cookie):
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': HOST,
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': HOST,
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+def asgi_scope(path, cookie):
+    return {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+        'server': (HOST, 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+def drive_wsgi(calls, args):
+    """Клиенты ждут свободный рабочий поток; поток занят и обработкой,
+    и отдачей ответа медленному клиенту.
+    """
+    from django.core.wsgi import get_wsgi_application
+
+    application = get_wsgi_application()
+    pending = queue.SimpleQueue()
+    for call in calls:
+        pending.put(call)
+    workers = threading.BoundedSemaphore(args.workers)
+    results = []
+    delay = args.client_delay / 1000
+
+    def client():
+        while True:
+            try:
+                path, cookie = pending.get_nowait()
+            except queue.Empty:
+                return
+            started = time.perf_counter()
+            statuses = []
+            with workers:
+                body = application(
+                    wsgi_environ(path, cookie),
+                    lambda status, headers: statuses.append(status)
+                )
+                try:
+                    b''.join(body)
+                    time.sleep(delay)
+                finally:
+                    body.close()
+            results.append((
+                time.perf_counter() - started, int(statuses[0].split()[0])
+            ))
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def drive_asgi(calls, args):
+    """Медленная отдача ответа ждёт в event loop, не занимая потоков."""
+    from django.core.asgi import get_asgi_application
+
+    application = get_asgi_application()
+    pending = iter(calls)
+    results = []
+    delay = args.client_delay / 1000
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def client():
+        for path, cookie in pending:
+            started = time.perf_counter()
+            statuses = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif not message.get('more_body'):
+                    await asyncio.sleep(delay)
+
+            await application(asgi_scope(path, cookie), receive, send)
+            results.append((time.perf_counter() - started, statuses[0]))
+
+    async def clients():
+        await asyncio.gather(*(client() for _ in range(args.clients)))
+
+    asyncio.run(clients())
+    return results
+
+
+def run(project, mode, args):
+    setup(
+        project, migrate=True, DEBUG=False, ALLOWED_HOSTS=['*'],
+        **{ASYNC_SETTINGS[project]: mode == 'asgi-async'}
+    )
+    import django
+
+    rng = random.Random(args.seed)
+    pages = PAGES[project](rng, args)
+    cookies = {user_id: session_cookie(user_id) for user_id, _ in pages}
+    calls = [(path, cookies[user_id]) for user_id, path in pages]
+    rng.shuffle(calls)
+    drive = drive_wsgi if mode == 'wsgi' else drive_asgi
+    drive(calls[:args.warmup], args)
+    started = time.perf_counter()
+    results = drive(calls, args)
+    elapsed = time.perf_counter() - started
+    latencies = [latency for latency, _ in results]
+    errors = sum(status >= 400 for _, status in results)
+    return {
+        'meta': {
+            'project': project,
+            'mode': mode,
+            **git_revision(),
+            'django': django.get_version(),
+            'clients': args.clients,
+            'workers': args.workers if mode == 'wsgi' else None,
+            'client_delay_ms': args.client_delay,
+            'seed': args.seed,
+        },
+        'pages': summarize(latencies, None, errors, elapsed),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('project', choices=PROJECTS)
+    parser.add_argument('--mode', choices=(*MODES, 'all'), default='all')
+    parser.add_argument('--clients', type=int, default=64)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--client-delay', type=float, default=50)
+    parser.add_argument(
+        '--pages', type=int, default=100,
+        help='Запросов к каждой из двух страниц.'
+    )
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--news', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--notes', type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.mode != 'all':
+        results = [run(args.project, args.mode, args)]
+    else:
+        # Настройки и URLconf выбираются при запуске Django, поэтому
+        # каждый режим — в своём процессе.
+        results = []
+        for mode in MODES:
+            command = [
+                sys.executable, '-m', 'benchmarks.concurrency',
+                args.project, '--mode', mode,
+            ]
+            for name in (
+                    'clients', 'workers', 'client_delay', 'pages',
+                    'warmup', 'seed', 'users', 'news', 'comments', 'notes'
+            ):
+                command += [
+                    f'--{name.replace("_", "-")}', str(getattr(args, name))
+                ]
+            output = subprocess.run(
+                command, cwd=ROOT, check=True, capture_output=True,
+                text=True
+            ).stdout
+            results.extend(json.loads(output))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Подготовка Django-проекта для запуска бенчмарков вне manage.py."""
+import atexit
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import django
+
+ROOT = Path(__file__).resolve().parent.parent
+PROJECTS = {
+    'ya_news': 'yanews.settings',
+    'ya_note': 'yanote.settings',
+}
+
+
+def _remove(directory):
+    from django.db import connections
+
+    connections.close_all()
+    directory.cleanup()
+
+
+def setup(project, database=None, migrate=False, **overrides):
+    """Настраивает Django для проекта project.
+
+    database — путь к файлу SQLite; по умолчанию временный файл, чтобы
+    бенчмарк не трогал рабочую базу. Временный каталог с ним удаляется
+    при выходе из процесса. overrides подменяют настройки.
+    """
+    sys.path.insert(0, str(ROOT / project))
+    os.environ['DJANGO_SETTINGS_MODULE'] = PROJECTS[project]
+    from django.conf import settings
+
+    if database is None:
+        directory = tempfile.TemporaryDirectory(prefix='bench-')
+        atexit.register(_remove, directory)
+        database = Path(directory.name) / 'bench.sqlite3'
+    settings.DATABASES['default']['NAME'] = str(database)
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    django.setup()
+    if migrate:
+        from django.core.management import call_command
+
+        call_command('migrate', verbosity=0)
+    return database
@@ -0,0 +1,506 @@
+"""Нагрузочный прогон основных маршрутов ya_news и ya_note.
+
+База заполняется через модели проекта: пользователи, новости,
+комментарии (по новостям распределены по закону Ципфа, как у
+«вирусных» статей) и заметки. Затем каждый маршрут вызывается
+--requests раз через один из транспортов:
+
+- client — django.test.Client, то есть WSGIHandler в том же процессе;
+- asgi — django.test.AsyncClient через ASGIHandler;
+- wsgi — настоящий HTTP к многопоточному WSGI-серверу на 127.0.0.1,
+  с --concurrency параллельными клиентами.
+
+Для каждого маршрута выводятся пропускная способность, p50/p95/p99
+задержки и число SQL-запросов в JSON вместе с коммитом, версиями
+и параметрами прогона, чтобы результаты разных коммитов можно было
+сравнивать.
+
+python -m benchmarks.load ya_news --transport wsgi --concurrency 4
+python -m benchmarks.load all --output results.json
+"""
+import argparse
+import asyncio
+import http.client
+import io
+import json
+import logging
+import math
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import count
+from urllib.parse import urlencode
+
+from .django_setup import ROOT, setup
+
+PROJECTS = ('ya_news', 'ya_note')
+TRANSPORTS = ('client', 'asgi', 'wsgi')
+QUERIES_HEADER = 'X-Bench-Queries'
+MIDDLEWARE = 'benchmarks.load.QueryCountMiddleware'
+FORM_CONTENT_TYPE = 'application/x-www-form-urlencoded'
+TEXT = (
+    'Городские власти сообщили о планах по благоустройству набережной. '
+    'Работы начнутся весной и продлятся до конца лета. '
+) * 5
+
+# Запрос маршрута: user — id пользователя или None для анонима.
+Call = namedtuple('Call', 'method path data user')
+
+
+class QueryCountMiddleware:
+    """Считает SQL-запросы обработки и пишет их число в заголовок.
+
+    Стоит первым в MIDDLEWARE, поэтому учитывает и сессии, и отрисовку
+    шаблона. Как и тестовый клиент, отключает проверку CSRF, чтобы POST
+    по HTTP проходил без предварительного GET за токеном.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        from django.db import connection
+
+        count = 0
+
+        def counter(execute, sql, params, many, context):
+            nonlocal count
+            count += 1
+            return execute(sql, params, many, context)
+
+        request._dont_enforce_csrf_checks = True
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        response[QUERIES_HEADER] = str(count)
+        return response
+
+
+def zipf_choices(rng, population, size):
+    weights = [1 / rank for rank in range(1, len(population) + 1)]
+    return rng.choices(population, weights, k=size)
+
+
+def seed_users(count):
+    from django.contrib.auth import get_user_model
+
+    User = get_user_model()
+    User.objects.bulk_create(
+        User(username=f'user{index}') for index in range(count)
+    )
+    return list(User.objects.values_list('pk', flat=True))
+
+
+def seed_news(rng, args):
+    from django.core.management import call_command
+
+    from news.models import Comment, News
+
+    users = seed_users(args.users)
+    today = date.today()
+    News.objects.bulk_create(
+        News(
+            title=f'Новость {index}', text=TEXT,
+            date=today - timedelta(days=index // 5)
+        )
+        for index in range(args.news)
+    )
+    news = list(News.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (
+            Comment(
+                news_id=news_id, author_id=rng.choice(users),
+                text=f'Комментарий {index}'
+            )
+            for index, news_id in enumerate(
+                zipf_choices(rng, news, args.comments)
+            )
+        ),
+        batch_size=1000
+    )
+    # bulk_create не ведёт счётчики комментариев.
+    call_command('recount_comments', stderr=io.StringIO())
+    return {'users': users, 'news': news}
+
+
+def seed_notes(rng, args):
+    from notes.models import Note
+
+    users = seed_users(args.users)
+    Note.objects.bulk_create(
+        (
+            Note(
+                author_id=author_id, title=f'Заметка {index}', text=TEXT,
+                slug=f'note-{index}', revision=index + 1
+            )
+            for index, author_id in enumerate(
+                zipf_choices(rng, users, args.notes)
+            )
+        ),
+        batch_size=1000
+    )
+    return {'users': users}
+
+
+def news_routes(world):
+    from django.urls import reverse
+
+    def detail(rng):
+        return reverse('news:detail', args=(rng.choice(world['news']),))
+
+    return {
+        'news:home': lambda rng: Call(
+            'GET', reverse('news:home'), None, None
+        ),
+        'news:home (auth)': lambda rng: Call(
+            'GET', reverse('news:home'), None, rng.choice(world['users'])
+        ),
+        'news:detail': lambda rng: Call('GET', detail(rng), None, None),
+        'news:detail (auth)': lambda rng: Call(
+            'GET', detail(rng), None, rng.choice(world['users'])
+        ),
+        'comment POST': lambda rng: Call(
+            'POST', detail(rng), {'text': 'Интересная новость'},
+            rng.choice(world['users'])
+        ),
+    }
+
+
+def notes_routes(world):
+    from django.urls import reverse
+
+    # Одинаковые заголовки мерили бы перебор суффиксов slug, а не
+    # создание заметки.
+    numbers = count()
+    return {
+        'notes:list': lambda rng: Call(
+            'GET', reverse('notes:list'), None, rng.choice(world['users'])
+        ),
+        'notes:add': lambda rng: Call(
+            'POST', reverse('notes:add'),
+            {'title': f'Новая заметка {next(numbers)}', 'text': TEXT},
+            rng.choice(world['users'])
+        ),
+    }
+
+
+SCENARIOS = {
+    'ya_news': (seed_news, news_routes),
+    'ya_note': (seed_notes, notes_routes),
+}
+
+
+def session_cookie(user_id):
+    """Cookie сессии, созданной заранее, как после входа на сайт."""
+    from django.conf import settings
+    from django.contrib.auth import get_user_model
+    from django.test import Client
+
+    client = Client()
+    client.force_login(get_user_model()(pk=user_id))
+    name = settings.SESSION_COOKIE_NAME
+    return f'{name}={client.cookies[name].value}'
+
+
+def form(data):
+    """Тело POST как у браузера: все транспорты шлют одно и то же."""
+    return urlencode(data), FORM_CONTENT_TYPE
+
+
+class ClientTransport:
+    """Тестовый клиент: WSGIHandler без сети."""
+    concurrent = False
+
+    def __init__(self):
+        self.clients = {}
+
+    def make_client(self):
+        from django.test import Client
+
+        return Client()
+
+    def client(self, user_id):
+        from django.contrib.auth import get_user_model
+
+        if user_id not in self.clients:
+            client = self.make_client()
+            if user_id is not None:
+                client.force_login(get_user_model()(pk=user_id))
+            self.clients[user_id] = client
+        return self.clients[user_id]
+
+    def send(self, call):
+        client = self.client(call.user)
+        if call.method == 'POST':
+            response = client.post(call.path, *form(call.data))
+        else:
+            response = client.get(call.path)
+        return response.status_code, int(response[QUERIES_HEADER])
+
+    def close(self):
+        pass
+
+
+class AsgiTransport(ClientTransport):
+    """AsyncClient: тот же стек через ASGIHandler."""
+
+    def __init__(self):
+        super().__init__()
+        self.loop = asyncio.new_event_loop()
+
+    def make_client(self):
+        from django.test import AsyncClient
+
+        return AsyncClient()
+
+    def send(self, call):
+        client = self.client(call.user)
+        if call.method == 'POST':
+            request = client.post(call.path, *form(call.data))
+        else:
+            request = client.get(call.path)
+        response = self.loop.run_until_complete(request)
+        return response.status_code, int(response[QUERIES_HEADER])
+
+    def close(self):
+        self.loop.close()
+
+
+class WsgiTransport:
+    """HTTP к многопоточному WSGI-серверу Django в том же процессе."""
+    concurrent = True
+
+    def __init__(self):
+        from django.core.servers.basehttp import (
+            ThreadedWSGIServer, WSGIRequestHandler
+        )
+        from django.core.wsgi import get_wsgi_application
+
+        self.server = ThreadedWSGIServer(
+            ('127.0.0.1', 0), WSGIRequestHandler, allow_reuse_address=False
+        )
+        self.server.set_app(get_wsgi_application())
+        self.port = self.server.server_address[1]
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True
+        )
+        self.thread.start()
+        self.cookies = {}
+        self.lock = threading.Lock()
+
+    def cookie(self, user_id):
+        if user_id is None:
+            return None
+        with self.lock:
+            if user_id not in self.cookies:
+                self.cookies[user_id] = session_cookie(user_id)
+            return self.cookies[user_id]
+
+    def send(self, call):
+        headers = {}
+        cookie = self.cookie(call.user)
+        if cookie:
+            headers['Cookie'] = cookie
+        body = None
+        if call.method == 'POST':
+            body, headers['Content-Type'] = form(call.data)
+        connection = http.client.HTTPConnection('127.0.0.1', self.port)
+        try:
+            connection.request(call.method, call.path, body, headers)
+            response = connection.getresponse()
+            response.read()
+            return response.status, int(response.getheader(QUERIES_HEADER))
+        finally:
+            connection.close()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+TRANSPORT_CLASSES = {
+    'client': ClientTransport,
+    'asgi': AsgiTransport,
+    'wsgi': WsgiTransport,
+}
+
+
+def percentile(ordered, share):
+    """Значение по методу ближайшего ранга."""
+    rank = max(1, math.ceil(share * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(latencies, queries, errors, elapsed):
+    """queries=None — число SQL-запросов не измерялось."""
+    ordered = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            name: round(value * 1000, 3) for name, value in (
+                ('p50', percentile(ordered, 0.50)),
+                ('p95', percentile(ordered, 0.95)),
+                ('p99', percentile(ordered, 0.99)),
+                ('mean', sum(ordered) / len(ordered)),
+            )
+        },
+    }
+    if queries is not None:
+        summary['queries'] = {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        }
+    return summary
+
+
+def run_route(transport, make_call, rng, args):
+    calls = [make_call(rng) for _ in range(args.warmup + args.requests)]
+    for call in calls[:args.warmup]:
+        transport.send(call)
+    latencies, queries = [], []
+    errors = 0
+
+    def measure(call):
+        started = time.perf_counter()
+        status, executed = transport.send(call)
+        return time.perf_counter() - started, status, executed
+
+    workers = args.concurrency if transport.concurrent else 1
+    started = time.perf_counter()
+    with ThreadPoolExecutor(workers) as pool:
+        for latency, status, executed in pool.map(
+                measure, calls[args.warmup:]
+        ):
+            latencies.append(latency)
+            queries.append(executed)
+            errors += status >= 400
+    return summarize(
+        latencies, queries, errors, time.perf_counter() - started
+    )
+
+
+def git_revision():
+    def git(*command):
+        return subprocess.run(
+            ('git', *command), cwd=ROOT, capture_output=True, text=True
+        ).stdout.strip()
+
+    return {
+        'commit': git('rev-parse', 'HEAD'),
+        'dirty': bool(git('status', '--porcelain', '--untracked-files=no')),
+    }
+
+
+def run(project, transport_name, args):
+    setup(project, migrate=True, DEBUG=False, ALLOWED_HOSTS=['*'])
+    import django
+    from django.conf import settings
+
+    # Обработчики читают MIDDLEWARE при создании, то есть позже.
+    settings.MIDDLEWARE = [MIDDLEWARE, *settings.MIDDLEWARE]
+
+    seed, routes = SCENARIOS[project]
+    rng = random.Random(args.seed)
+    world = seed(rng, args)
+    transport = TRANSPORT_CLASSES[transport_name]()
+    # get_wsgi_application() заново настраивает логирование.
+    for name in ('django.request', 'django.server'):
+        logging.getLogger(name).setLevel(logging.CRITICAL)
+    try:
+        results = {
+            name: run_route(transport, make_call, rng, args)
+            for name, make_call in routes(world).items()
+        }
+    finally:
+        transport.close()
+    return {
+        'meta': {
+            'project': project,
+            'transport': transport_name,
+            **git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'seed': args.seed,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'concurrency': (
+                args.concurrency
+                if TRANSPORT_CLASSES[transport_name].concurrent else 1
+            ),
+            'data': {
+                name: getattr(args, name)
+                for name in ('users', 'news', 'comments', 'notes')
+            },
+        },
+        'routes': results,
+    }
+
+
+def run_all(args, projects, transports):
+    """Каждый прогон — в своём процессе: Django настраивается один раз."""
+    results = []
+    for project in projects:
+        for transport in transports:
+            command = [
+                sys.executable, '-m', 'benchmarks.load', project,
+                '--transport', transport,
+            ]
+            for name in (
+                    'requests', 'warmup', 'concurrency', 'seed', 'users',
+                    'news', 'comments', 'notes'
+            ):
+                command += [f'--{name}', str(getattr(args, name))]
+            output = subprocess.run(
+                command, cwd=ROOT, check=True, capture_output=True, text=True
+            ).stdout
+            results.extend(json.loads(output))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('project', choices=(*PROJECTS, 'all'))
+    parser.add_argument(
+        '--transport', choices=(*TRANSPORTS, 'all'), default='client'
+    )
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--news', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=20_000)
+    parser.add_argument('--notes', type=int, default=5000)
+    parser.add_argument('--output', help='Файл для JSON вместо stdout.')
+    args = parser.parse_args()
+
+    projects = PROJECTS if args.project == 'all' else (args.project,)
+    transports = (
+        TRANSPORTS if args.transport == 'all' else (args.transport,)
+    )
+    if len(projects) * len(transports) > 1:
+        results = run_all(args, projects, transports)
+    else:
+        results = [run(projects[0], transports[0], args)]
+    report = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as output:
+            output.write(report + '\n')
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Сравнение фильтра комментариев с прежней проверкой в цикле.
+
+python -m benchmarks.profanity --words 5000 --length 20000
+"""
+import argparse
+import random
+import timeit
+
+from .django_setup import setup
+
+ALPHABET = 'абвгдежзийклмнопрстуфхцчшщыэюя'
+
+
+def random_word(rng, length):
+    return ''.join(rng.choice(ALPHABET) for _ in range(length))
+
+
+def legacy_check(words, text):
+    """Проверка, которая была в CommentForm.clean_text."""
+    lowered_text = text.lower()
+    return [word for word in words if word in lowered_text]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--words', type=int, default=5000)
+    parser.add_argument('--length', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup('ya_news')
+    from news.profanity import ProfanityMatcher
+
+    rng = random.Random(args.seed)
+    words = [random_word(rng, rng.randint(5, 10)) for _ in range(args.words)]
+    text = ' '.join(
+        random_word(rng, rng.randint(2, 9))
+        for _ in range(args.length // 6)
+    )[:args.length]
+
+    build = min(timeit.repeat(
+        lambda: ProfanityMatcher(words), number=1, repeat=args.repeat
+    ))
+    matcher = ProfanityMatcher(words)
+    assert sorted(matcher.find(text)) == sorted(legacy_check(words, text))
+    legacy = min(timeit.repeat(
+        lambda: legacy_check(words, text), number=1, repeat=args.repeat
+    ))
+    automaton = min(timeit.repeat(
+        lambda: matcher.find(text), number=1, repeat=args.repeat
+    ))
+    print(f'слов: {args.words}, длина текста: {len(text)}')
+    print(f'построение автомата: {build * 1000:.2f} мс')
+    print(f'цикл по словам:      {legacy * 1000:.2f} мс')
+    print(f'автомат:             {automaton * 1000:.2f} мс')
+    print(f'ускорение:           x{legacy / automaton:.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Пропускная способность построения slug для заметок.
+
+Сравнивает pytils slugify с кешированной транслитерацией
+notes.slugs.transliterate на корпусе кириллических заголовков, где,
+как и в жизни, часть заметок остаётся с заголовком по умолчанию.
+
+python -m benchmarks.slugify --titles 100000 --distinct 5000
+"""
+import argparse
+import random
+import time
+
+from .django_setup import setup
+
+WORDS = (
+    'список', 'покупок', 'идеи', 'для', 'проекта', 'встреча', 'с',
+    'командой', 'план', 'на', 'неделю', 'книги', 'прочитать', 'рецепт',
+    'борща', 'заметки', 'лекции', 'по', 'истории', 'отпуск', 'в', 'горах',
+    'подарки', 'друзьям', 'задачи', 'спринта', 'черновик', 'письма',
+)
+
+
+def make_corpus(rng, size, distinct, default_share):
+    titles = [
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 6)))
+        for _ in range(distinct)
+    ]
+    # Популярность заголовков убывает по закону Ципфа.
+    weights = [1 / rank for rank in range(1, distinct + 1)]
+    corpus = rng.choices(titles, weights, k=size)
+    for index in range(0, size, max(1, round(1 / default_share))):
+        corpus[index] = 'Название заметки'
+    return corpus
+
+
+def throughput(function, corpus):
+    started = time.perf_counter()
+    for title in corpus:
+        function(title)
+    return len(corpus) / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--titles', type=int, default=100_000)
+    parser.add_argument('--distinct', type=int, default=5000)
+    parser.add_argument('--default-share', type=float, default=0.3)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup('ya_note')
+    from pytils.translit import slugify
+
+    from notes.slugs import transliterate
+
+    corpus = make_corpus(
+        random.Random(args.seed), args.titles, args.distinct,
+        args.default_share
+    )
+    plain = throughput(slugify, corpus)
+    transliterate.cache_clear()
+    cached = throughput(transliterate, corpus)
+    info = transliterate.cache_info()
+    print(f'заголовков: {len(corpus)}, различных: {len(set(corpus))}')
+    print(f'slugify:       {plain:,.0f} заголовков/с')
+    print(f'transliterate: {cached:,.0f} заголовков/с (x{cached / plain:.1f})')
+    print(
+        f'кеш: попаданий {info.hits}, промахов {info.misses}, '
+        f'размер {info.currsize}/{info.maxsize}'
+    )
+
+
+if __name__ == '__main__':
+    main()
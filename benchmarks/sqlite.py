@@ -0,0 +1,219 @@
+"""Профиль SQLite при одновременной записи комментариев и чтении.
+
+На данных benchmarks.load --writers потоков отправляют комментарии к
+новостям, а --readers потоков открывают главную страницу от имени
+вошедших читателей, которых не отдаёт кеш. Потоки живут весь прогон,
+как рабочие потоки WSGI-сервера, и вызывают WSGIHandler напрямую,
+поэтому с CONN_MAX_AGE каждый поток держит своё соединение.
+
+Прогон повторяется для профиля по умолчанию и для production
+(YANEWS_DB_PROFILE), каждый — в своём процессе на своей базе.
+Результат — JSON с пропускной способностью, задержками и ошибками
+(«database is locked») отдельно для записи и чтения.
+
+python -m benchmarks.sqlite --writers 4 --readers 8 --seconds 10
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from itertools import count
+
+from .concurrency import wsgi_environ
+from .django_setup import ROOT, setup
+from .load import (
+    FORM_CONTENT_TYPE, MIDDLEWARE, form, git_revision, seed_news,
+    session_cookie, summarize
+)
+
+PROFILES = ('default', 'production')
+PROFILE_ENV = 'YANEWS_DB_PROFILE'
+
+
+def request_environ(path, cookie, data=None):
+    """GET страницы или POST формы, если передан data."""
+    environ = wsgi_environ(path, cookie)
+    if data is not None:
+        body = form(data)[0].encode()
+        environ.update({
+            'REQUEST_METHOD': 'POST',
+            'CONTENT_TYPE': FORM_CONTENT_TYPE,
+            'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': io.BytesIO(body),
+        })
+    return environ
+
+
+def drive(application, calls, args):
+    """Гоняет по потоку на каждую функцию из calls до конца прогона.
+
+    Функция возвращает environ очередного запроса; результат —
+    списки (задержка, статус) по потокам.
+    """
+    from django.db import connections
+
+    results = [[] for _ in calls]
+    ready = threading.Barrier(len(calls) + 1)
+    deadline = []
+
+    def worker(index, make_environ):
+        ready.wait()
+        try:
+            while time.perf_counter() < deadline[0]:
+                started = time.perf_counter()
+                statuses = []
+                body = application(
+                    make_environ(),
+                    lambda status, headers: statuses.append(status)
+                )
+                try:
+                    b''.join(body)
+                finally:
+                    # close() шлёт request_finished: соединение
+                    # закрывается или остаётся по CONN_MAX_AGE.
+                    body.close()
+                results[index].append((
+                    time.perf_counter() - started,
+                    int(statuses[0].split()[0])
+                ))
+        finally:
+            connections.close_all()
+
+    threads = [
+        threading.Thread(target=worker, args=(index, make_environ))
+        for index, make_environ in enumerate(calls)
+    ]
+    for thread in threads:
+        thread.start()
+    deadline.append(time.perf_counter() + args.seconds)
+    ready.wait()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def run(profile, args):
+    if profile == 'production':
+        os.environ[PROFILE_ENV] = profile
+    else:
+        os.environ.pop(PROFILE_ENV, None)
+    setup('ya_news', migrate=True, DEBUG=False, ALLOWED_HOSTS=['*'])
+    import django
+    from django.conf import settings
+    from django.core.wsgi import get_wsgi_application
+    from django.db import connection
+    from django.urls import reverse
+
+    # Обработчик читает MIDDLEWARE при создании, то есть позже.
+    settings.MIDDLEWARE = [MIDDLEWARE, *settings.MIDDLEWARE]
+    rng = random.Random(args.seed)
+    world = seed_news(rng, args)
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        journal_mode = cursor.fetchone()[0]
+    connection.close()
+    application = get_wsgi_application()
+    # get_wsgi_application() заново настраивает логирование.
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+
+    home = reverse('news:home')
+    texts = count()
+    users = iter(world['users'])
+    calls = []
+    for _ in range(args.writers):
+        cookie = session_cookie(next(users))
+        writer_rng = random.Random(rng.random())
+
+        def post(cookie=cookie, writer_rng=writer_rng):
+            path = reverse(
+                'news:detail', args=(writer_rng.choice(world['news']),)
+            )
+            return request_environ(
+                path, cookie, {'text': f'Комментарий {next(texts)}'}
+            )
+
+        calls.append(post)
+    for _ in range(args.readers):
+        cookie = session_cookie(next(users))
+        calls.append(lambda cookie=cookie: request_environ(home, cookie))
+
+    started = time.perf_counter()
+    results = drive(application, calls, args)
+    elapsed = time.perf_counter() - started
+    summaries = {}
+    for kind, runs in (
+            ('post_comment', results[:args.writers]),
+            ('home', results[args.writers:]),
+    ):
+        measured = [result for thread in runs for result in thread]
+        summaries[kind] = summarize(
+            [latency for latency, _ in measured], None,
+            sum(status >= 400 for _, status in measured), elapsed
+        )
+    return {
+        'meta': {
+            'profile': profile,
+            **git_revision(),
+            'django': django.get_version(),
+            'journal_mode': journal_mode,
+            'conn_max_age': settings.DATABASES['default']['CONN_MAX_AGE'],
+            'writers': args.writers,
+            'readers': args.readers,
+            'seconds': args.seconds,
+            'seed': args.seed,
+        },
+        'routes': summaries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        '--profile', choices=(*PROFILES, 'all'), default='all'
+    )
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--news', type=int, default=200)
+    parser.add_argument('--comments', type=int, default=20_000)
+    args = parser.parse_args()
+    if args.writers + args.readers > args.users:
+        parser.error('Каждому потоку нужен свой пользователь: --users.')
+
+    if args.profile != 'all':
+        results = [run(args.profile, args)]
+    else:
+        # Профиль выбирается при загрузке настроек, поэтому каждый —
+        # в своём процессе.
+        results = []
+        for profile in PROFILES:
+            command = [
+                sys.executable, '-m', 'benchmarks.sqlite',
+                '--profile', profile,
+            ]
+            for name in (
+                    'writers', 'readers', 'seconds', 'seed', 'users',
+                    'news', 'comments'
+            ):
+                command += [f'--{name}', str(getattr(args, name))]
+            output = subprocess.run(
+                command, cwd=ROOT, check=True, capture_output=True,
+                text=True
+            ).stdout
+            results.extend(json.loads(output))
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
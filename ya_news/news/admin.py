@@ -10,6 +10,19 @@ class CommentInline(admin.StackedInline):
 
 @admin.register(News)
 class NewsAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date', 'comment_count')
+    readonly_fields = ('comment_count',)
     inlines = [
         CommentInline,
     ]
+
+    def save_related(self, request, form, formsets, change):
+        """Комментарии из формы сохраняются мимо счётчика: пересчитываем."""
+        super().save_related(request, form, formsets, change)
+        news = form.instance
+        news.comment_count = news.comment_set.filter(
+            status=Comment.Status.PUBLISHED
+        ).count()
+        News.objects.filter(pk=news.pk).update(
+            comment_count=news.comment_count
+        )
@@ -0,0 +1,154 @@
+"""JSON API только для чтения: новости и комментарии к ним.
+
+Строки выбираются через .values() без создания объектов моделей,
+параметр fields= ограничивает и колонки SELECT, а длинный список
+комментариев отдаётся потоком по мере чтения из БД.
+"""
+import json
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import generic
+
+from .models import Comment, News
+from .pagination import InvalidCursor, KeysetPaginator
+
+# Поля ответа и соответствующие им пути для .values().
+NEWS_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'text': 'text',
+    'date': 'date',
+    'comment_count': 'comment_count',
+}
+COMMENT_FIELDS = {
+    'id': 'id',
+    'news': 'news_id',
+    'author': 'author__username',
+    'text': 'text',
+    'created': 'created',
+}
+
+
+class ApiError(Exception):
+    """Ошибка запроса, которую клиент получает в JSON."""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+class ApiView(generic.View):
+    """Отвечает только на GET; ошибки ApiError превращает в JSON."""
+    http_method_names = ('get', 'head', 'options')
+    fields = {}
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse(
+                {'error': error.message}, status=error.status
+            )
+
+    def get_fields(self):
+        """Поля из параметра fields= через запятую, по умолчанию все."""
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return list(self.fields)
+        names = [name.strip() for name in requested.split(',')]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise ApiError(
+                HTTPStatus.BAD_REQUEST,
+                f'Неизвестные поля: {", ".join(unknown)}.'
+            )
+        return list(dict.fromkeys(names))
+
+    def values(self, queryset, names, *extra):
+        """Выборка путей полей names и служебных полей extra."""
+        paths = [self.fields[name] for name in names]
+        return queryset.values(*dict.fromkeys(paths + list(extra)))
+
+    def project(self, row, names):
+        return {name: row[self.fields[name]] for name in names}
+
+
+class NewsListApi(ApiView):
+    """Новости постранично по курсору, свежие первыми."""
+    fields = NEWS_FIELDS
+    paginate_keys = ('-date', '-id')
+
+    def get(self, request, *args, **kwargs):
+        names = self.get_fields()
+        paginator = KeysetPaginator(
+            self.values(News.objects.all(), names, 'date', 'id'),
+            self.paginate_keys, settings.NEWS_API_PAGE_SIZE
+        )
+        try:
+            page = paginator.page(request.GET.get('cursor'))
+        except InvalidCursor:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'Неверный курсор.')
+        return JsonResponse({
+            'results': [self.project(row, names) for row in page],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        }, json_dumps_params={'ensure_ascii': False})
+
+
+class NewsDetailApi(ApiView):
+    fields = NEWS_FIELDS
+
+    def get(self, request, *args, **kwargs):
+        names = self.get_fields()
+        row = self.values(
+            News.objects.filter(pk=kwargs['pk']), names
+        ).first()
+        if row is None:
+            raise ApiError(HTTPStatus.NOT_FOUND, 'Новость не найдена.')
+        return JsonResponse(
+            self.project(row, names), json_dumps_params={'ensure_ascii': False}
+        )
+
+
+class NewsCommentsApi(ApiView):
+    """Все опубликованные комментарии новости одним потоковым ответом.
+
+    Строки читаются из БД пачками через iterator() и сразу пишутся
+    в ответ, поэтому память не зависит от числа комментариев.
+    """
+    fields = COMMENT_FIELDS
+
+    def get(self, request, *args, **kwargs):
+        names = self.get_fields()
+        if not News.objects.filter(pk=kwargs['pk']).exists():
+            raise ApiError(HTTPStatus.NOT_FOUND, 'Новость не найдена.')
+        rows = self.values(
+            Comment.objects.filter(
+                news_id=kwargs['pk'], status=Comment.Status.PUBLISHED
+            ).order_by('created', 'id'),
+            names
+        ).iterator(chunk_size=settings.NEWS_API_STREAM_CHUNK)
+        return StreamingHttpResponse(
+            self.stream(rows, names), content_type='application/json'
+        )
+
+    def stream(self, rows, names):
+        chunk_size = settings.NEWS_API_STREAM_CHUNK
+        yield '{"results": ['
+        chunk = []
+        separator = ''
+        for row in rows:
+            chunk.append(separator + dumps(self.project(row, names)))
+            separator = ', '
+            if len(chunk) == chunk_size:
+                yield ''.join(chunk)
+                chunk = []
+        yield ''.join(chunk) + ']}'
@@ -0,0 +1,188 @@
+"""Кеширование страниц новостей и их фрагментов."""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, router
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from .models import Comment
+from .pagination import KeysetPaginator
+
+# Порядок комментариев: по времени, при равенстве — по id.
+COMMENT_KEYS = ('created', 'id')
+
+COMMENTS_KEY = 'news:comments:{news_id}:{version}:{cursor}'
+COMMENT_TEMPLATE = 'news/includes/comment.html'
+VERSION_KEY = 'news:version:{scope}'
+PAGE_KEY = 'news:page:{scope}:{version}:{path}'
+LIST_SCOPE = 'list'
+
+
+def comments_cache_key(news_id, version, cursor=None):
+    """Ключ страницы комментариев включает версию новости.
+
+    Любое изменение комментариев меняет версию, и все закешированные
+    страницы новости становятся недостижимыми разом.
+    """
+    return COMMENTS_KEY.format(
+        news_id=news_id, version=version, cursor=cursor or ''
+    )
+
+
+def comments_paginator(news_id):
+    return KeysetPaginator(
+        Comment.objects.filter(
+            news_id=news_id, status=Comment.Status.PUBLISHED
+        ).select_related('author'),
+        COMMENT_KEYS, settings.NEWS_COMMENTS_ON_PAGE
+    )
+
+
+def render_comments(news_id, cursor=None):
+    """Отрисовывает страницу опубликованных комментариев по курсору.
+
+    Комментарии идут по (created, id) страницами по
+    NEWS_COMMENTS_ON_PAGE, так что объём работы не зависит от их общего
+    числа. Ссылки на редактирование и удаление зависят от того, кто
+    смотрит страницу, поэтому в кеш вместе с разметкой кладётся только
+    author_id. Неверный курсор даёт InvalidCursor.
+    """
+    page = comments_paginator(news_id).page(cursor)
+    return {
+        'comments': [
+            {
+                'pk': comment.pk,
+                'author_id': comment.author_id,
+                'html': render_to_string(
+                    COMMENT_TEMPLATE, {'comment': comment}
+                ),
+            }
+            for comment in page
+        ],
+        'next_cursor': page.next_cursor,
+    }
+
+
+def get_rendered_comments(news_id, cursor=None):
+    """Страница комментариев из кеша; при промахе отрисовывает и кеширует."""
+    version = get_version(news_scope(news_id))
+    key = comments_cache_key(news_id, version, cursor)
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = render_comments(news_id, cursor)
+        if may_fill(version):
+            cache.set(key, rendered, settings.NEWS_COMMENTS_CACHE_TIMEOUT)
+    return rendered
+
+
+def _version_key(scope):
+    return VERSION_KEY.format(scope=scope)
+
+
+def _now_version():
+    """Версия — время изменения в микросекундах."""
+    return time.time_ns() // 1000
+
+
+def get_version(scope):
+    """Текущая версия области кеша; при отсутствии заводит новую.
+
+    Версии хранятся NEWS_VERSION_CACHE_TIMEOUT секунд: области
+    заводятся и для адресов несуществующих новостей.
+    """
+    key = _version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        version = _now_version()
+        if not cache.add(key, version, settings.NEWS_VERSION_CACHE_TIMEOUT):
+            # Другой процесс успел завести версию раньше.
+            version = cache.get(key, version)
+    return version
+
+
+def bump_versions(*scopes):
+    """Делает устаревшими страницы перечисленных областей.
+
+    Старые записи не удаляются, а перестают находиться по новому ключу,
+    поэтому схема работает с любым бэкендом, включая файловый.
+    """
+    keys = [_version_key(scope) for scope in scopes]
+    current = cache.get_many(keys)
+    now = _now_version()
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys},
+        settings.NEWS_VERSION_CACHE_TIMEOUT
+    )
+
+
+def may_fill(version):
+    """Можно ли положить прочитанное под версию version.
+
+    Реплика может ещё не содержать изменения, сменившего версию, поэтому
+    её данные кешируются, только когда версия старше REPLICA_PIN_SECONDS.
+    Иначе устаревшая страница жила бы под новой версией до следующей
+    записи, в том числе для самого автора изменения.
+    """
+    if router.db_for_read(Comment) == DEFAULT_DB_ALIAS:
+        return True
+    return _now_version() - version > settings.REPLICA_PIN_SECONDS * 10 ** 6
+
+
+def news_scope(news_id):
+    return f'news-{news_id}'
+
+
+class AnonymousPageCacheMixin:
+    """Целиком кеширует страницу для анонимных читателей.
+
+    Ключ страницы включает версию области, поэтому запись сама становится
+    недостижимой после изменения новости или её комментариев. Версия же
+    служит ETag и Last-Modified: условный GET отвечает 304 без отрисовки.
+
+    Last-Modified точен до секунды, а версия — до микросекунды: изменение
+    в ту же секунду не сдвинуло бы дату, и If-Modified-Since дал бы 304
+    на устаревшую страницу. Поэтому, пока секунда версии не прошла,
+    Last-Modified не отдаётся и не сравнивается — работает только ETag.
+    """
+
+    def get_cache_scope(self):
+        raise NotImplementedError
+
+    def dispatch(self, request, *args, **kwargs):
+        if (
+            request.method not in ('GET', 'HEAD')
+            or request.user.is_authenticated
+        ):
+            return super().dispatch(request, *args, **kwargs)
+        scope = self.get_cache_scope()
+        version = get_version(scope)
+        etag = quote_etag(f'{scope}-{version}')
+        last_modified = version // 10 ** 6
+        if last_modified >= int(time.time()):
+            last_modified = None
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            # 304 несёт тот же ETag, что отдал бы ответ 200.
+            response['ETag'] = etag
+            return response
+        path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+        key = PAGE_KEY.format(scope=scope, version=version, path=path)
+        response = cache.get(key)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if response.status_code == 200 and may_fill(version):
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(
+                        key, rendered, settings.NEWS_PAGE_CACHE_TIMEOUT
+                    )
+                )
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
@@ -2,6 +2,7 @@ from django.forms import ModelForm
 from django.core.exceptions import ValidationError
 
 from .models import Comment
+from .profanity import build_matcher
 
 BAD_WORDS = (
     'редиска',
@@ -10,6 +11,9 @@ BAD_WORDS = (
 )
 WARNING = 'Не ругайтесь!'
 
+# Дополнительные слова задаются настройками BAD_WORDS и BAD_WORDS_FILE.
+bad_words_matcher = build_matcher(BAD_WORDS)
+
 
 class CommentForm(ModelForm):
 
@@ -20,8 +24,9 @@ class CommentForm(ModelForm):
     def clean_text(self):
         """Не позволяем ругаться в комментариях."""
         text = self.cleaned_data['text']
-        lowered_text = text.lower()
-        for word in BAD_WORDS:
-            if word in lowered_text:
-                raise ValidationError(WARNING)
+        found = bad_words_matcher.find(text)
+        if found:
+            raise ValidationError(
+                WARNING, code='bad_words', params={'words': found}
+            )
         return text
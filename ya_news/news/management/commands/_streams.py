@@ -0,0 +1,73 @@
+"""Общие форматы для news_export и news_import."""
+import csv
+import json
+import sys
+from contextlib import contextmanager
+from datetime import date, datetime
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+
+NEWS = 'news'
+COMMENTS = 'comments'
+
+# Поля записи и соответствующие им пути для .values().
+FIELDS = {
+    NEWS: {
+        'id': 'id',
+        'title': 'title',
+        'text': 'text',
+        'date': 'date',
+    },
+    COMMENTS: {
+        'id': 'id',
+        'news': 'news_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+        'status': 'status',
+    },
+}
+
+
+@contextmanager
+def open_stream(path, mode):
+    """Файл по пути или stdin/stdout для '-'."""
+    if path == '-':
+        yield sys.stdin if 'r' in mode else sys.stdout
+        return
+    with open(path, mode, encoding='utf-8', newline='') as stream:
+        yield stream
+
+
+def to_text(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def write_records(stream, records, fields, file_format):
+    """Пишет записи по одной, не накапливая их в памяти."""
+    if file_format == CSV:
+        writer = csv.DictWriter(stream, fieldnames=fields)
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        def write(record):
+            stream.write(json.dumps(record, ensure_ascii=False) + '\n')
+    count = 0
+    for record in records:
+        write({field: to_text(record[field]) for field in fields})
+        count += 1
+    return count
+
+
+def read_records(stream, file_format):
+    """Лениво читает записи из потока."""
+    if file_format == CSV:
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
@@ -0,0 +1,92 @@
+import re
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import RequestFactory
+from django.utils import timezone
+
+from news.caching import comments_paginator
+from news.models import Comment, News
+from news.pagination import NEXT, PREVIOUS
+from news.views import CommentUpdate, NewsDetail, NewsList
+
+# Полный просмотр таблицы, любой последовательный просмотр и сортировка
+# во временной структуре для SQLite и PostgreSQL. Сортировка допустима
+# только поверх поиска по индексу, когда строк заведомо немного.
+FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b)(?!CONSTANT)|\bSeq Scan\b')
+ANY_SCAN = re.compile(r'\bSCAN \w|\bSeq Scan\b')
+SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY|\bSort\b')
+
+
+def is_unindexed(plan):
+    """План читает таблицу целиком или сортирует весь просмотр."""
+    return bool(
+        FULL_SCAN.search(plan)
+        or SORT.search(plan) and ANY_SCAN.search(plan)
+    )
+
+
+def _setup_view(view_class, user):
+    request = RequestFactory().get('/')
+    request.user = user
+    view = view_class()
+    view.setup(request, pk=1)
+    return view
+
+
+def view_querysets():
+    """Запросы, которые выполняют представления приложения news."""
+    user = get_user_model()(pk=1)
+    news_list = _setup_view(NewsList, user)
+    queryset = news_list.get_queryset()
+    paginator, page, object_list, _ = news_list.paginate_queryset(
+        queryset, news_list.get_paginate_by(queryset)
+    )
+    boundary = News(pk=1, date=date.today())
+    news_detail = _setup_view(NewsDetail, user)
+    comments = _setup_view(CommentUpdate, user)
+    comment_pages = comments_paginator(news_detail.kwargs['pk'])
+    comment_boundary = Comment(pk=1, created=timezone.now())
+    return (
+        ('news:home', object_list),
+        ('news:home next', paginator.page(
+            paginator.encode(NEXT, boundary)
+        ).object_list),
+        ('news:home previous', paginator.page(
+            paginator.encode(PREVIOUS, boundary)
+        ).object_list),
+        ('news:detail', News.objects.filter(pk=news_detail.kwargs['pk'])),
+        ('news:detail comments', comment_pages.page().object_list),
+        ('news:comments next', comment_pages.page(
+            comment_pages.encode(NEXT, comment_boundary)
+        ).object_list),
+        ('news:edit/delete', comments.get_queryset().filter(
+            pk=comments.kwargs['pk']
+        )),
+        ('moderation queue', Comment.objects.filter(
+            status=Comment.Status.PENDING, pk__gt=0
+        ).order_by('pk')[:100]),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов представлений и завершается '
+        'ошибкой, если какой-то из них читает таблицу целиком и '
+        'сортирует результат без индекса.'
+    )
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in view_querysets():
+            plan = queryset.explain()
+            bad = is_unindexed(plan)
+            self.stdout.write(f'{label}: {"FAIL" if bad else "OK"}')
+            self.stdout.write(plan)
+            if bad:
+                failures.append(label)
+        if failures:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(failures)
+            )
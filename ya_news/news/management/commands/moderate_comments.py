@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from news.moderation import moderate, pending_batches
+
+
+class Command(BaseCommand):
+    help = (
+        'Модерирует комментарии, ожидающие проверки, пачками. '
+        'С --loop работает как постоянный обработчик очереди в БД.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.NEWS_MODERATION_BATCH_SIZE
+        )
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а ждать новые комментарии.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=1.0,
+            help='Пауза между проверками очереди в режиме --loop, с.'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            published = rejected = 0
+            for batch in pending_batches(options['batch_size']):
+                batch_published, batch_rejected = moderate(batch)
+                published += len(batch_published)
+                rejected += len(batch_rejected)
+            if published or rejected or not options['loop']:
+                self.stderr.write(
+                    f'Опубликовано: {published}, отклонено: {rejected}'
+                )
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
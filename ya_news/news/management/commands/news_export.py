@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from news.models import Comment, News
+
+from ._streams import (
+    COMMENTS, FIELDS, FORMATS, NDJSON, NEWS, open_stream, write_records
+)
+
+MODELS = {NEWS: News, COMMENTS: Comment}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает новости или комментарии в NDJSON или CSV. '
+        'Строки читаются из БД курсором порциями, память не растёт '
+        'с размером таблицы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=tuple(MODELS))
+        parser.add_argument(
+            '-o', '--output', default='-',
+            help='Файл для записи, по умолчанию stdout.'
+        )
+        parser.add_argument('--format', choices=FORMATS, default=NDJSON)
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Сколько строк читать из БД за раз.'
+        )
+
+    def handle(self, *args, **options):
+        model = options['model']
+        fields = FIELDS[model]
+        rows = MODELS[model].objects.order_by('pk').values_list(
+            *fields.values()
+        ).iterator(chunk_size=options['chunk_size'])
+        records = (dict(zip(fields, row)) for row in rows)
+        with open_stream(options['output'], 'w') as stream:
+            count = write_records(
+                stream, records, tuple(fields), options['format']
+            )
+        self.stderr.write(f'Выгружено записей: {count}')
@@ -0,0 +1,212 @@
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError, transaction
+
+from news import search
+from news.caching import (
+    LIST_SCOPE, bump_versions, news_scope
+)
+from news.models import Comment, News
+
+from ._streams import (
+    COMMENTS, FORMATS, NDJSON, NEWS, open_stream, read_records
+)
+
+User = get_user_model()
+
+ERROR = 'error'
+SKIP = 'skip'
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def field_value(model, field, value):
+    if value in (None, ''):
+        return None
+    return model._meta.get_field(field).to_python(value)
+
+
+class AuthorLookup:
+    """Кеш username -> id, который добирает недостающих одним запросом.
+
+    Размер ограничен, чтобы длинный импорт не копил всех авторов сразу.
+    """
+
+    def __init__(self, max_size=100_000):
+        self.max_size = max_size
+        self.ids = {}
+
+    def resolve(self, usernames):
+        usernames = set(usernames)
+        missing = usernames - self.ids.keys()
+        if missing:
+            if len(self.ids) + len(missing) > self.max_size:
+                self.ids.clear()
+                missing = usernames
+            self.ids.update(dict.fromkeys(missing))
+            self.ids.update(
+                User.objects.filter(
+                    username__in=missing
+                ).values_list('username', 'id')
+            )
+        return self.ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает новости или комментарии из NDJSON или CSV, '
+        'выгруженных news_export. Файл читается потоком и сохраняется '
+        'пачками через bulk_create. Записи без id попадут в поиск только '
+        'после rebuild_search_index. Запись с уже занятым id '
+        'останавливает загрузку, если не указан --on-conflict skip.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('model', choices=(NEWS, COMMENTS))
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для чтения, по умолчанию stdin.'
+        )
+        parser.add_argument('--format', choices=FORMATS, default=NDJSON)
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько объектов сохранять за один INSERT.'
+        )
+        parser.add_argument(
+            '--on-conflict', choices=(ERROR, SKIP), default=ERROR,
+            help=(
+                'Что делать с записями, чей id уже занят: остановить '
+                'загрузку на этой пачке или пропустить их.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        self.authors = AuthorLookup()
+        self.on_conflict = options['on_conflict']
+        load = (
+            self.load_news if options['model'] == NEWS
+            else self.load_comments
+        )
+        created = skipped = 0
+        with open_stream(options['path'], 'r') as stream:
+            records = read_records(stream, options['format'])
+            batch_size = options['batch_size']
+            for number, batch in enumerate(batches(records, batch_size)):
+                first = number * batch_size + 1
+                failed = (
+                    f'Пачка записей {first}–{first + len(batch) - 1} '
+                    f'не загружена'
+                )
+                saved = (
+                    f'Предыдущие пачки сохранены (загружено: {created}, '
+                    f'пропущено: {skipped})'
+                )
+                try:
+                    with transaction.atomic():
+                        batch_created, batch_skipped = load(batch)
+                except ValidationError as error:
+                    raise CommandError(
+                        f'{failed}: {" ".join(error.messages)} {saved}.'
+                    ) from error
+                except IntegrityError as error:
+                    raise CommandError(
+                        f'{failed}: {error}. {saved}; записи с занятыми '
+                        f'id пропускает --on-conflict {SKIP}.'
+                    ) from error
+                created += batch_created
+                skipped += batch_skipped
+        self.stderr.write(
+            f'Загружено: {created}, пропущено: {skipped}'
+        )
+
+    def load_news(self, batch):
+        news = [
+            News(
+                id=field_value(News, 'id', record.get('id')),
+                title=record['title'],
+                text=record['text'],
+                date=field_value(News, 'date', record['date']),
+            )
+            for record in batch
+        ]
+        news = self.without_taken_ids(News, news)
+        News.objects.bulk_create(news)
+        # Id берутся из файла и могли принадлежать удалённым строкам,
+        # поэтому старые записи индекса удаляются.
+        search.index_news_items(
+            news_item for news_item in news if news_item.pk is not None
+        )
+        transaction.on_commit(lambda: bump_versions(LIST_SCOPE))
+        return len(news), len(batch) - len(news)
+
+    def without_taken_ids(self, model, objects):
+        """При --on-conflict skip отбрасывает объекты, чей id уже занят.
+
+        Проверка одним запросом на пачку; bulk_create(ignore_conflicts)
+        не подходит: по нему не узнать, какие строки вставлены, а от
+        этого зависят поиск и счётчики комментариев.
+        """
+        if self.on_conflict != SKIP:
+            return objects
+        taken = set(model.objects.filter(
+            pk__in={obj.pk for obj in objects if obj.pk is not None}
+        ).values_list('pk', flat=True))
+        return [obj for obj in objects if obj.pk not in taken]
+
+    def load_comments(self, batch):
+        """Пропускает записи с неизвестными автором или новостью."""
+        author_ids = self.authors.resolve(
+            record['author'] for record in batch
+        )
+        batch_news_ids = [
+            field_value(Comment, 'news', record['news']) for record in batch
+        ]
+        news_ids = set(News.objects.filter(
+            pk__in=set(batch_news_ids)
+        ).values_list('pk', flat=True))
+        comments = []
+        for record, news_id in zip(batch, batch_news_ids):
+            author_id = author_ids.get(record['author'])
+            if author_id is None or news_id not in news_ids:
+                continue
+            comment = Comment(
+                id=field_value(Comment, 'id', record.get('id')),
+                news_id=news_id,
+                author_id=author_id,
+                text=record['text'],
+                status=record.get('status') or Comment.Status.PUBLISHED,
+            )
+            created = field_value(Comment, 'created', record.get('created'))
+            if created is not None:
+                comment.created = created
+            comments.append(comment)
+        comments = self.without_taken_ids(Comment, comments)
+        Comment.objects.bulk_create(comments)
+        search.index_comments(
+            comment for comment in comments if comment.pk is not None
+        )
+        published = Counter(
+            comment.news_id for comment in comments
+            if comment.status == Comment.Status.PUBLISHED
+        )
+        for news_id, count in published.items():
+            News.add_comments(news_id, count)
+        # Версии меняются после фиксации пачки, как в signals: иначе
+        # читатель закеширует под новой версией данные до загрузки.
+        scopes = [
+            LIST_SCOPE,
+            *map(news_scope, {comment.news_id for comment in comments}),
+        ]
+        transaction.on_commit(lambda: bump_versions(*scopes))
+        return len(comments), len(batch) - len(comments)
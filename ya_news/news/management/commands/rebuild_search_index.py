@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from news import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс новостей и комментариев.'
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stderr.write(f'Индекс перестроен ({search.backend()}).')
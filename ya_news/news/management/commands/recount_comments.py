@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from news.caching import LIST_SCOPE, bump_versions
+from news.models import Comment, News
+
+
+def published_count():
+    """Число опубликованных комментариев новости подзапросом."""
+    comments = Comment.objects.filter(
+        news=OuterRef('pk'), status=Comment.Status.PUBLISHED
+    ).order_by().values('news').annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(comments), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает News.comment_count по опубликованным комментариям. '
+        'Новости обрабатываются пачками по id, каждая пачка — отдельным '
+        'UPDATE в своей транзакции.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        fixed = total = 0
+        last_id = 0
+        while True:
+            ids = list(News.objects.filter(pk__gt=last_id).order_by(
+                'pk'
+            ).values_list('pk', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            with transaction.atomic():
+                batch = News.objects.filter(pk__in=ids)
+                fixed += batch.exclude(
+                    comment_count=published_count()
+                ).update(comment_count=published_count())
+            total += len(ids)
+            last_id = ids[-1]
+        if fixed:
+            bump_versions(LIST_SCOPE)
+        self.stderr.write(f'Новостей: {total}, исправлено: {fixed}')
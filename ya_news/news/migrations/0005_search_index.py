@@ -0,0 +1,55 @@
+# Generated by Django 3.2.15 on 2026-10-18 02:23
+
+from django.db import migrations, models
+
+FTS_TABLE = 'news_search_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    """Таблица FTS5 создаётся, только если SQLite собран с FTS5."""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+        if 'ENABLE_FTS5' not in options:
+            return
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} '
+            'USING fts5(title, body, target UNINDEXED)'
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) "
+            "VALUES ('rank', 'bm25(2.0, 1.0)')"
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0004_comment_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('document', models.BigIntegerField(db_index=True)),
+                ('target', models.BigIntegerField()),
+                ('weight', models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=models.Index(fields=['term', 'target'], name='search_term_target_idx'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
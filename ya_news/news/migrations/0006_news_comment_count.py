@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-18 02:35
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_comments(apps, schema_editor):
+    News = apps.get_model('news', 'News')
+    Comment = apps.get_model('news', 'Comment')
+    comments = Comment.objects.filter(
+        news=models.OuterRef('pk'), status='published'
+    ).order_by().values('news').annotate(
+        count=models.Count('pk')
+    ).values('count')
+    News.objects.update(
+        comment_count=Coalesce(models.Subquery(comments), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('news', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='news',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(count_comments, migrations.RunPython.noop),
+    ]
@@ -2,23 +2,50 @@ from datetime import datetime
 
 from django.conf import settings
 from django.db import models
+from django.db.models.functions import Greatest
+from django.utils import timezone
 
 
 class News(models.Model):
     title = models.CharField(max_length=50)
     text = models.TextField()
     date = models.DateField(default=datetime.today)
+    # Число опубликованных комментариев. Меняется через F() в той же
+    # транзакции, что и комментарий; чинится командой recount_comments.
+    comment_count = models.PositiveIntegerField(
+        'Комментариев', default=0, editable=False
+    )
 
     class Meta:
-        ordering = ('-date',)
+        ordering = ('-date', '-id')
+        indexes = (
+            models.Index(fields=('-date', '-id'), name='news_date_id_idx'),
+        )
         verbose_name_plural = 'Новости'
         verbose_name = 'Новость'
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def add_comments(cls, news_id, count=1):
+        """Сдвигает счётчик комментариев новости на count.
+
+        Разошедшийся счётчик не уходит ниже нуля, чтобы не ломать
+        удаление комментария; точное значение вернёт recount_comments.
+        """
+        cls.objects.filter(pk=news_id).update(
+            comment_count=Greatest(models.F('comment_count') + count, 0)
+        )
+
 
 class Comment(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'На модерации'
+        PUBLISHED = 'published', 'Опубликован'
+        REJECTED = 'rejected', 'Отклонён'
+
     news = models.ForeignKey(
         News,
         on_delete=models.CASCADE
@@ -28,10 +55,47 @@ class Comment(models.Model):
         on_delete=models.CASCADE,
     )
     text = models.TextField()
-    created = models.DateTimeField(auto_now_add=True)
+    # Не auto_now_add: иначе bulk_create затирает время при импорте.
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PUBLISHED,
+    )
 
     class Meta:
         ordering = ('created',)
+        indexes = (
+            models.Index(
+                fields=('news', 'created'), name='comment_news_created_idx'
+            ),
+            # Очередь модерации: в индексе только ожидающие комментарии.
+            models.Index(
+                fields=('id',),
+                condition=models.Q(status='pending'),
+                name='comment_pending_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:50]
+
+
+class SearchEntry(models.Model):
+    """Запись обратного индекса поиска на случай, когда FTS5 недоступен.
+
+    document — ключ проиндексированного объекта, target — id новости,
+    которую он находит, weight — число вхождений основы с учётом
+    веса заголовка.
+    """
+    term = models.CharField(max_length=100)
+    document = models.BigIntegerField(db_index=True)
+    target = models.BigIntegerField()
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('term', 'target'), name='search_term_target_idx'
+            ),
+        )
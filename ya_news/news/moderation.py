@@ -0,0 +1,182 @@
+"""Отложенная модерация комментариев.
+
+В режиме NEWS_COMMENT_MODERATION комментарий сохраняется со статусом
+«на модерации», а проверки из NEWS_MODERATION_CHECKS выполняются вне
+запроса пачками. Очередь либо живёт в процессе (потоки-обработчики),
+либо хранится в самой БД и разбирается командой moderate_comments.
+
+Очередь в процессе не переживает его остановку: комментарии, оставшиеся
+на модерации, заново ставятся в очередь при запуске обработчиков, то
+есть с первым новым комментарием. Не дожидаясь его, их разбирает
+moderate_comments.
+"""
+import logging
+import queue
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils.module_loading import import_string
+
+from . import search
+from .caching import (
+    LIST_SCOPE, bump_versions, news_scope
+)
+from .models import Comment, News
+
+logger = logging.getLogger(__name__)
+
+THREAD_QUEUE = 'thread'
+DB_QUEUE = 'db'
+
+LINK = re.compile(r'https?://|www\.', re.IGNORECASE)
+
+
+def check_links(comments):
+    """Отклоняет комментарии, похожие на рассылку ссылок."""
+    limit = settings.NEWS_MODERATION_MAX_LINKS
+    return {
+        comment.pk for comment in comments
+        if len(LINK.findall(comment.text)) > limit
+    }
+
+
+def get_checks():
+    return [import_string(path) for path in settings.NEWS_MODERATION_CHECKS]
+
+
+def moderate(comment_ids):
+    """Проверяет пачку ожидающих комментариев и публикует прошедшие.
+
+    Возвращает пару множеств: опубликованные и отклонённые id.
+    """
+    comments = list(Comment.objects.filter(
+        pk__in=comment_ids, status=Comment.Status.PENDING
+    ))
+    if not comments:
+        return set(), set()
+    rejected = set()
+    for check in get_checks():
+        rejected |= check(comments)
+    published = {comment.pk for comment in comments} - rejected
+    with transaction.atomic():
+        # Ту же пачку может разбирать и другой обработчик, а комментарий
+        # могли удалить: меняются только строки, всё ещё ожидающие
+        # модерации, и считаются только они.
+        pending = Comment.objects.select_for_update().filter(
+            status=Comment.Status.PENDING
+        )
+        published = set(pending.filter(pk__in=published).values_list(
+            'pk', flat=True
+        ))
+        rejected = set(pending.filter(pk__in=rejected).values_list(
+            'pk', flat=True
+        ))
+        Comment.objects.filter(pk__in=published).update(
+            status=Comment.Status.PUBLISHED
+        )
+        Comment.objects.filter(pk__in=rejected).update(
+            status=Comment.Status.REJECTED
+        )
+        counts = Counter(
+            comment.news_id for comment in comments
+            if comment.pk in published
+        )
+        for news_id, count in counts.items():
+            News.add_comments(news_id, count)
+        # update() не отправляет сигналы, поэтому кеши и поиск
+        # обновляются здесь; версии — после фиксации, как в signals.
+        if counts:
+            scopes = [LIST_SCOPE, *map(news_scope, counts)]
+            transaction.on_commit(lambda: bump_versions(*scopes))
+    for comment in comments:
+        if comment.pk in published:
+            comment.status = Comment.Status.PUBLISHED
+            search.index_comment(comment)
+    return published, rejected
+
+
+def pending_batches(batch_size):
+    """Id ожидающих комментариев пачками по возрастанию id."""
+    last_id = 0
+    while True:
+        batch = list(Comment.objects.filter(
+            status=Comment.Status.PENDING, pk__gt=last_id
+        ).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]
+
+
+class ModerationQueue:
+    """Очередь в памяти процесса с пулом потоков-обработчиков.
+
+    Обработчик забирает из очереди всё, что успело накопиться, но не
+    больше NEWS_MODERATION_BATCH_SIZE, и модерирует это одной пачкой.
+    """
+
+    def __init__(self):
+        self.queue = queue.Queue()
+        self.workers = []
+        self.lock = threading.Lock()
+
+    def submit(self, comment_id):
+        self._start()
+        self.queue.put(comment_id)
+
+    def join(self):
+        """Ждёт, пока все отправленные комментарии будут обработаны."""
+        self.queue.join()
+
+    def _start(self):
+        with self.lock:
+            if not self.workers:
+                for batch in pending_batches(
+                        settings.NEWS_MODERATION_BATCH_SIZE
+                ):
+                    for comment_id in batch:
+                        self.queue.put(comment_id)
+            while len(self.workers) < settings.NEWS_MODERATION_WORKERS:
+                worker = threading.Thread(
+                    target=self._work, name='comment-moderation',
+                    daemon=True
+                )
+                worker.start()
+                self.workers.append(worker)
+
+    def _take_batch(self):
+        batch = [self.queue.get()]
+        while len(batch) < settings.NEWS_MODERATION_BATCH_SIZE:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                moderate(batch)
+            except Exception:
+                logger.exception('Ошибка модерации комментариев %s', batch)
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self.queue.task_done()
+
+
+moderation_queue = ModerationQueue()
+
+
+def submit(comment):
+    """Ставит комментарий в очередь после фиксации транзакции.
+
+    В режиме очереди в БД достаточно статуса: комментарий заберёт
+    moderate_comments.
+    """
+    if settings.NEWS_MODERATION_QUEUE == THREAD_QUEUE:
+        transaction.on_commit(lambda: moderation_queue.submit(comment.pk))
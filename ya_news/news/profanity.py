@@ -0,0 +1,117 @@
+"""Поиск запрещённых слов автоматом Ахо — Корасик.
+
+Автомат строится один раз, после чего проверка текста занимает время,
+линейное по его длине, независимо от размера списка слов.
+"""
+from collections import deque
+from pathlib import Path
+
+from django.conf import settings
+
+# Латинские буквы и цифры, которыми подменяют похожие кириллические.
+HOMOGLYPHS = str.maketrans({
+    'a': 'а', 'b': 'в', 'c': 'с', 'e': 'е', 'h': 'н', 'k': 'к', 'm': 'м',
+    'o': 'о', 'p': 'р', 't': 'т', 'x': 'х', 'y': 'у', 'u': 'и',
+    '0': 'о', '3': 'з', '6': 'б', 'ё': 'е',
+})
+
+
+def normalize(text):
+    """Приводит текст к нижнему регистру и кириллическим двойникам."""
+    return text.lower().translate(HOMOGLYPHS)
+
+
+class ProfanityMatcher:
+    """Автомат для одновременного поиска всех слов списка."""
+
+    def __init__(self, words, whole_words=False):
+        self.whole_words = whole_words
+        self.words = []
+        self.transitions = [{}]
+        self.fail = [0]
+        self.outputs = [()]
+        for word in words:
+            self._add(word)
+        self._link()
+
+    def _add(self, word):
+        pattern = normalize(word.strip())
+        if not pattern:
+            return
+        state = 0
+        for char in pattern:
+            next_state = self.transitions[state].get(char)
+            if next_state is None:
+                next_state = len(self.transitions)
+                self.transitions.append({})
+                self.fail.append(0)
+                self.outputs.append(())
+                self.transitions[state][char] = next_state
+            state = next_state
+        self.outputs[state] += ((len(self.words), len(pattern)),)
+        self.words.append(word.strip())
+
+    def _link(self):
+        """Строит суффиксные ссылки обходом в ширину."""
+        queue = deque(self.transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.transitions[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.transitions[fallback].get(
+                    char, 0
+                )
+                self.outputs[next_state] += self.outputs[
+                    self.fail[next_state]
+                ]
+
+    def _is_word(self, text, start, end):
+        return (
+            (start == 0 or not text[start - 1].isalnum())
+            and (end == len(text) or not text[end].isalnum())
+        )
+
+    def find(self, text):
+        """Возвращает найденные слова списка в порядке появления."""
+        text = normalize(text)
+        found = {}
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in self.transitions[state]:
+                state = self.fail[state]
+            state = self.transitions[state].get(char, 0)
+            for index, length in self.outputs[state]:
+                start = position + 1 - length
+                if self.whole_words and not self._is_word(
+                        text, start, position + 1
+                ):
+                    continue
+                found.setdefault(self.words[index], start)
+        return sorted(found, key=found.get)
+
+
+def load_words(defaults=()):
+    """Слова по умолчанию, из настройки BAD_WORDS и файла BAD_WORDS_FILE.
+
+    В файле одно слово на строку, строки с # пропускаются.
+    """
+    words = list(defaults)
+    words.extend(getattr(settings, 'BAD_WORDS', ()))
+    path = getattr(settings, 'BAD_WORDS_FILE', None)
+    if path:
+        with Path(path).open(encoding='utf-8') as source:
+            words.extend(
+                line.strip() for line in source
+                if line.strip() and not line.lstrip().startswith('#')
+            )
+    return words
+
+
+def build_matcher(defaults=()):
+    return ProfanityMatcher(
+        load_words(defaults),
+        whole_words=getattr(settings, 'BAD_WORDS_WHOLE_WORDS', False),
+    )
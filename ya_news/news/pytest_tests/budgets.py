@@ -0,0 +1,110 @@
+"""Бюджеты SQL: сколько запросов и сколько времени в БД можно потратить.
+
+Бюджеты представлений задаются настройкой QUERY_BUDGETS по имени
+маршрута, например {'news:home': Budget(queries=3, time_ms=100)}.
+QueryBudgetMiddleware проверяет их для каждого запроса тестового
+клиента, маршруты без своего бюджета получают QUERY_BUDGET_DEFAULT.
+Для произвольного блока кода есть контекстный менеджер QueryBudget.
+Превышение завершается BudgetExceeded со списком выполненных SQL.
+
+Запросы потокового ответа выполняются уже после middleware и в бюджет
+представления не попадают.
+"""
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import connection
+
+MIDDLEWARE = f'{__name__}.QueryBudgetMiddleware'
+
+# Ограничение None означает «без ограничения».
+Budget = namedtuple('Budget', 'queries time_ms', defaults=(None, None))
+
+
+class BudgetExceeded(AssertionError):
+    """Код выполнил больше запросов или провёл в БД больше времени."""
+
+
+class QueryBudget:
+    """Считает запросы внутри блока with и проверяет их по бюджету."""
+
+    def __init__(self, queries=None, time_ms=None, label='Блок'):
+        self.budget = Budget(queries, time_ms)
+        self.label = label
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append(
+                (sql, params, time.perf_counter() - started)
+            )
+
+    def __enter__(self):
+        connection.execute_wrappers.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection.execute_wrappers.remove(self)
+        if exc_type is None:
+            self.check()
+
+    @property
+    def time_ms(self):
+        return sum(duration for _, _, duration in self.queries) * 1000
+
+    def check(self):
+        problems = []
+        if (
+            self.budget.queries is not None
+            and len(self.queries) > self.budget.queries
+        ):
+            problems.append(
+                f'запросов {len(self.queries)} при бюджете '
+                f'{self.budget.queries}'
+            )
+        if (
+            self.budget.time_ms is not None
+            and self.time_ms > self.budget.time_ms
+        ):
+            problems.append(
+                f'время в БД {self.time_ms:.1f} мс при бюджете '
+                f'{self.budget.time_ms} мс'
+            )
+        if problems:
+            raise BudgetExceeded(self.report(problems))
+
+    def report(self, problems):
+        lines = [f'{self.label}: {", ".join(problems)}.']
+        for number, (sql, params, duration) in enumerate(self.queries, 1):
+            lines.append(
+                f'{number}. [{duration * 1000:.2f} мс] {sql} {params!r}'
+            )
+        return '\n'.join(lines)
+
+
+class QueryBudgetMiddleware:
+    """Проверяет бюджет представления, найденного по имени маршрута.
+
+    Должен стоять первым, чтобы учитывать запросы остальных middleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryBudget() as spent:
+            response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None:
+            spent.budget = settings.QUERY_BUDGETS.get(
+                match.view_name, settings.QUERY_BUDGET_DEFAULT
+            )
+            spent.label = (
+                f'{request.method} {request.path} ({match.view_name})'
+            )
+            spent.check()
+        return response
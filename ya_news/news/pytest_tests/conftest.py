@@ -1,14 +1,64 @@
+import io
 from datetime import timedelta
 
 import pytest
+from django.core.management import call_command
+from django.core.cache import cache
 from django.urls import reverse
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from news.models import News, Comment
+from news.pytest_tests.budgets import MIDDLEWARE, Budget
 
 User = get_user_model()
 
+MANY_COMMENTS_COUNT = 2000
+
+# Число запросов — с учётом сессии и пользователя, время — суммарное
+# время SQL с запасом на медленные машины.
+QUERY_BUDGETS = {
+    'news:home': Budget(queries=4, time_ms=50),
+    'news:detail': Budget(queries=8, time_ms=50),
+    'news:comments': Budget(queries=3, time_ms=50),
+    'news:search': Budget(queries=4, time_ms=50),
+    'news:edit': Budget(queries=6, time_ms=50),
+    'news:delete': Budget(queries=8, time_ms=50),
+    'news:api_list': Budget(queries=3, time_ms=50),
+    'news:api_detail': Budget(queries=1, time_ms=50),
+    'news:api_comments': Budget(queries=1, time_ms=50),
+}
+QUERY_BUDGET_DEFAULT = Budget(queries=5, time_ms=50)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budgets(**budgets): бюджеты SQL маршрутов для одного теста, '
+        'например query_budgets(**{"news:home": Budget(queries=1)})'
+    )
+
+
+@pytest.fixture(autouse=True)
+def query_budgets(request, settings):
+    """Каждый запрос тестового клиента проверяется по бюджету SQL."""
+    budgets = dict(QUERY_BUDGETS)
+    marker = request.node.get_closest_marker('query_budgets')
+    if marker is not None:
+        budgets.update(marker.kwargs)
+    settings.QUERY_BUDGETS = budgets
+    settings.QUERY_BUDGET_DEFAULT = QUERY_BUDGET_DEFAULT
+    settings.MIDDLEWARE = [MIDDLEWARE, *settings.MIDDLEWARE]
+    return budgets
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Кеш процесса не должен переживать тест, в отличие от БД."""
+    cache.clear()
+    yield
+    cache.clear()
+
 
 @pytest.fixture
 def author(db):
@@ -59,6 +109,23 @@ def comments(db, news_detail):
     Comment.objects.bulk_create(comments_list)
 
 
+@pytest.fixture
+def news_with_many_comments(db, author):
+    """Создает несколько новостей с тысячами комментариев у каждой."""
+    news_list = [
+        News.objects.create(title=f'Новость {index}', text='Текст новости')
+        for index in range(3)
+    ]
+    Comment.objects.bulk_create(
+        Comment(news=news_item, author=author, text=f'Комментарий {index}')
+        for news_item in news_list
+        for index in range(MANY_COMMENTS_COUNT)
+    )
+    # bulk_create не ведёт счётчики комментариев.
+    call_command('recount_comments', stderr=io.StringIO())
+    return news_list
+
+
 @pytest.fixture
 def news(db):
     """Создает тестовую новость и возвращает её."""
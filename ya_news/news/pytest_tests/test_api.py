@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import date, timedelta
+from http import HTTPStatus
+
+import pytest
+from django.urls import reverse
+
+from news.models import Comment, News
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def api_list_url():
+    return reverse('news:api_list')
+
+
+@pytest.fixture
+def api_detail_url(news_detail):
+    return reverse('news:api_detail', args=(news_detail.pk,))
+
+
+@pytest.fixture
+def api_comments_url(news_detail):
+    return reverse('news:api_comments', args=(news_detail.pk,))
+
+
+def read_stream(response):
+    return json.loads(b''.join(response.streaming_content))
+
+
+def test_list_pages_by_cursor(client, settings, api_list_url):
+    """Курсор next проходит все новости без повторов, свежие первыми."""
+    settings.NEWS_API_PAGE_SIZE = 2
+    today = date.today()
+    for index in range(5):
+        News.objects.create(
+            title=f'Новость {index}', text='Текст',
+            date=today - timedelta(days=index)
+        )
+    titles, cursor = [], None
+    while True:
+        params = {'cursor': cursor} if cursor else {}
+        data = client.get(api_list_url, params).json()
+        titles.extend(item['title'] for item in data['results'])
+        cursor = data['next']
+        if cursor is None:
+            break
+    assert titles == [f'Новость {index}' for index in range(5)]
+
+
+def test_fields_projection(client, news_detail, api_detail_url,
+                           django_assert_num_queries):
+    """Выбираются только запрошенные поля, одним запросом."""
+    with django_assert_num_queries(1) as context:
+        data = client.get(api_detail_url, {'fields': 'id,title'}).json()
+    assert data == {'id': news_detail.pk, 'title': news_detail.title}
+    assert '"text"' not in context.captured_queries[0]['sql']
+
+
+@pytest.mark.parametrize('params', (
+    {'fields': 'title,password'},
+    {'cursor': 'broken'},
+    {'cursor': base64.urlsafe_b64encode(b'["n",["2024-13-45",1]]').decode()},
+))
+def test_bad_request(client, api_list_url, params):
+    response = client.get(api_list_url, params)
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert 'error' in response.json()
+
+
+def test_missing_news(client):
+    for name in ('news:api_detail', 'news:api_comments'):
+        response = client.get(reverse(name, args=(0,)))
+        assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_comments_streamed_in_order(client, settings, author, news_detail,
+                                    api_comments_url):
+    """Комментарии идут потоком по порядку, скрытые не попадают."""
+    settings.NEWS_API_STREAM_CHUNK = 2
+    for index in range(5):
+        Comment.objects.create(
+            news=news_detail, author=author, text=f'Комментарий {index}'
+        )
+    Comment.objects.create(
+        news=news_detail, author=author, text='На модерации',
+        status=Comment.Status.PENDING
+    )
+    response = client.get(api_comments_url, {'fields': 'text,author'})
+    assert response.streaming
+    assert read_stream(response)['results'] == [
+        {'text': f'Комментарий {index}', 'author': author.username}
+        for index in range(5)
+    ]
+
+
+def test_read_only(author_client, api_list_url):
+    response = author_client.post(api_list_url)
+    assert response.status_code == HTTPStatus.METHOD_NOT_ALLOWED
@@ -0,0 +1,67 @@
+import asyncio
+import importlib
+from http import HTTPStatus
+from urllib.parse import urlencode
+
+import pytest
+from django.test import AsyncClient
+from django.urls import clear_url_caches, resolve
+
+import news.urls
+import yanews.urls
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+def reload_urls():
+    """Корневой URLconf хранит вложенный resolver со списком маршрутов,
+    поэтому перезагружается вслед за news.urls.
+    """
+    importlib.reload(news.urls)
+    importlib.reload(yanews.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def async_views(settings):
+    """Маршруты собираются заново с асинхронными страницами чтения."""
+    settings.NEWS_ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.NEWS_ASYNC_VIEWS = False
+    reload_urls()
+
+
+def test_read_views_are_async(async_views, home_url, news_detail_url):
+    for url in (home_url, news_detail_url):
+        assert asyncio.iscoroutinefunction(resolve(url).func)
+
+
+def test_async_pages_under_asgi(async_views, settings, comment, home_url,
+                                news_detail_url):
+    """Под ASGI страницы отдают те же данные, что и синхронные, а
+    запросы из пула потоков попадают в Server-Timing.
+    """
+    settings.PROFILING_SERVER_TIMING = True
+    client = AsyncClient()
+    response = asyncio.run(client.get(home_url))
+    assert response.status_code == HTTPStatus.OK
+    assert [news.pk for news in response.context['object_list']] == [
+        comment.news_id
+    ]
+    response = asyncio.run(client.get(news_detail_url))
+    assert response.status_code == HTTPStatus.OK
+    assert comment.text in response.content.decode()
+    assert 'sql;desc="0 queries"' not in response['Server-Timing']
+
+
+def test_comment_post_under_asgi(async_views, author, comment_form_data,
+                                 news_detail, news_detail_url):
+    client = AsyncClient()
+    client.force_login(author)
+    response = asyncio.run(client.post(
+        news_detail_url, urlencode(comment_form_data),
+        content_type='application/x-www-form-urlencoded'
+    ))
+    assert response.status_code == HTTPStatus.FOUND
+    assert news_detail.comment_set.get().text == comment_form_data['text']
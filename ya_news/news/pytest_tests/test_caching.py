@@ -0,0 +1,135 @@
+import time
+from http import HTTPStatus
+
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.http import http_date
+from pytest_lazyfixture import lazy_fixture
+
+from news.caching import VERSION_KEY, bump_versions, get_version, news_scope
+from news.models import Comment
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(params=('locmem', 'filebased'))
+def cache_backend(request, settings, tmp_path):
+    """Кеш страниц проверяется на локальном и файловом бэкендах."""
+    if request.param == 'locmem':
+        backend = {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    else:
+        backend = {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': str(tmp_path / 'cache'),
+        }
+    settings.CACHES = {'default': backend}
+    return request.param
+
+
+@pytest.mark.parametrize('url', (
+    lazy_fixture('home_url'),
+    lazy_fixture('news_detail_url'),
+))
+def test_anonymous_page_served_from_cache(cache_backend, client, url,
+                                          django_assert_num_queries):
+    """Повторный анонимный запрос не обращается к БД."""
+    first = client.get(url)
+    assert first['ETag']
+    with django_assert_num_queries(0):
+        second = client.get(url)
+    assert second.status_code == HTTPStatus.OK
+    assert second.content == first.content
+    assert second['ETag'] == first['ETag']
+
+
+@pytest.mark.parametrize('url', (
+    lazy_fixture('home_url'),
+    lazy_fixture('news_detail_url'),
+))
+def test_conditional_get_not_modified(cache_backend, client, url,
+                                      django_assert_num_queries):
+    """Совпавший If-None-Match даёт 304 без отрисовки."""
+    etag = client.get(url)['ETag']
+    with django_assert_num_queries(0):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response['ETag'] == etag
+    assert not response.content
+
+
+def test_last_modified_after_version_second(client, news_detail,
+                                            news_detail_url):
+    """Когда секунда версии прошла, If-Modified-Since даёт 304."""
+    second = int(time.time()) - 10
+    cache.set(
+        VERSION_KEY.format(scope=news_scope(news_detail.pk)),
+        second * 10 ** 6, None
+    )
+    last_modified = client.get(news_detail_url)['Last-Modified']
+    assert last_modified == http_date(second)
+    response = client.get(
+        news_detail_url, HTTP_IF_MODIFIED_SINCE=last_modified
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+
+
+def test_no_last_modified_within_version_second(client, news_detail,
+                                                news_detail_url):
+    """Изменение в ту же секунду не даёт 304 по If-Modified-Since."""
+    bump_versions(news_scope(news_detail.pk))
+    response = client.get(
+        news_detail_url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 1)
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert not response.has_header('Last-Modified')
+
+
+def test_missing_news_versions_expire(client, settings):
+    """Запросы к несуществующим новостям не оставляют вечных версий."""
+    settings.NEWS_VERSION_CACHE_TIMEOUT = 0
+    response = client.get(reverse('news:detail', args=(0,)))
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert cache.get(VERSION_KEY.format(scope=news_scope(0))) is None
+
+
+def test_comment_bumps_page_version(cache_backend, client, author,
+                                    news_detail, home_url,
+                                    news_detail_url,
+                                    django_capture_on_commit_callbacks):
+    """Новый комментарий меняет версию новости и главной страницы."""
+    detail_etag = client.get(news_detail_url)['ETag']
+    home_etag = client.get(home_url)['ETag']
+    with django_capture_on_commit_callbacks(execute=True):
+        Comment.objects.create(news=news_detail, author=author, text='Новый')
+    response = client.get(news_detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+    assert response.status_code == HTTPStatus.OK
+    assert 'Новый' in response.content.decode()
+    assert response['ETag'] != detail_etag
+    assert client.get(home_url)['ETag'] != home_etag
+
+
+def test_version_bumped_after_commit(author, news_detail,
+                                     django_capture_on_commit_callbacks):
+    """До фиксации читатели видят старую версию и не кешируют под новой
+    ещё не зафиксированные данные.
+    """
+    scope = news_scope(news_detail.pk)
+    version = get_version(scope)
+    with django_capture_on_commit_callbacks() as callbacks:
+        Comment.objects.create(news=news_detail, author=author, text='Новый')
+    assert get_version(scope) == version
+    for callback in callbacks:
+        callback()
+    assert get_version(scope) > version
+
+
+def test_authorized_user_bypasses_page_cache(author_client, news_detail_url):
+    """Страницы для вошедших пользователей не кешируются целиком."""
+    etag = author_client.get(news_detail_url).get('ETag')
+    response = author_client.get(news_detail_url, HTTP_IF_NONE_MATCH=etag)
+    assert etag is None
+    assert response.status_code == HTTPStatus.OK
+    assert response.context is not None
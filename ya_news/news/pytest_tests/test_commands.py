@@ -0,0 +1,151 @@
+import io
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from news import search
+from news.caching import LIST_SCOPE, get_version, news_scope
+from news.models import Comment, News
+
+pytestmark = pytest.mark.django_db
+
+
+def export(model, path, file_format):
+    call_command(
+        'news_export', model, output=str(path), format=file_format,
+        stderr=io.StringIO()
+    )
+
+
+def import_(model, path, file_format, batch_size=2, **options):
+    call_command(
+        'news_import', model, str(path), format=file_format,
+        batch_size=batch_size, stderr=io.StringIO(), **options
+    )
+
+
+def snapshot():
+    return (
+        list(News.objects.values_list('id', 'title', 'text', 'date')),
+        list(Comment.objects.values_list(
+            'id', 'news_id', 'author__username', 'text', 'created'
+        )),
+    )
+
+
+@pytest.mark.parametrize('file_format', ('ndjson', 'csv'))
+def test_export_import_round_trip(file_format, tmp_path, news_detail,
+                                  comments):
+    """Выгрузка и загрузка сохраняют новости, авторов и время."""
+    expected = snapshot()
+    news_path = tmp_path / f'news.{file_format}'
+    comments_path = tmp_path / f'comments.{file_format}'
+    export('news', news_path, file_format)
+    export('comments', comments_path, file_format)
+    News.objects.all().delete()
+
+    import_('news', news_path, file_format)
+    import_('comments', comments_path, file_format)
+
+    assert snapshot() == expected
+    assert News.objects.get().comment_count == Comment.objects.count()
+
+
+def test_import_skips_unknown_authors(tmp_path, news_detail, comment):
+    """Комментарии неизвестных авторов не ломают загрузку."""
+    path = tmp_path / 'comments.ndjson'
+    export('comments', path, 'ndjson')
+    Comment.objects.all().delete()
+    path.write_text(
+        path.read_text(encoding='utf-8').replace('"Автор"', '"Никто"'),
+        encoding='utf-8'
+    )
+    import_('comments', path, 'ndjson')
+    assert Comment.objects.count() == 0
+
+
+def test_import_stops_on_taken_id(tmp_path, news_detail, comments):
+    """Занятый id останавливает загрузку с номерами записей пачки."""
+    path = tmp_path / 'comments.ndjson'
+    export('comments', path, 'ndjson')
+    Comment.objects.exclude(pk=Comment.objects.latest('pk').pk).delete()
+    with pytest.raises(CommandError, match='Пачка записей 3–3'):
+        import_('comments', path, 'ndjson')
+    assert Comment.objects.count() == 3
+
+
+def test_import_skips_taken_ids(tmp_path, news_detail, comments):
+    """С --on-conflict skip загружаются только записи со свободными id."""
+    expected = snapshot()
+    path = tmp_path / 'comments.ndjson'
+    export('comments', path, 'ndjson')
+    Comment.objects.exclude(pk=Comment.objects.latest('pk').pk).delete()
+    News.objects.update(comment_count=1)
+    import_('comments', path, 'ndjson', on_conflict='skip')
+    assert snapshot() == expected
+    assert News.objects.get().comment_count == 3
+
+
+def test_import_rejects_bad_news_id(tmp_path, news_detail, comment):
+    """Нечисловой id новости останавливает загрузку с номерами пачки."""
+    path = tmp_path / 'comments.ndjson'
+    export('comments', path, 'ndjson')
+    Comment.objects.all().delete()
+    path.write_text(
+        path.read_text(encoding='utf-8').replace(
+            f'"news": {news_detail.pk}', '"news": "первая"'
+        ),
+        encoding='utf-8'
+    )
+    with pytest.raises(CommandError, match='Пачка записей 1–1'):
+        import_('comments', path, 'ndjson')
+    assert Comment.objects.count() == 0
+
+
+def test_import_bumps_versions_after_commit(
+        tmp_path, news_detail, comment, django_capture_on_commit_callbacks):
+    """До фиксации пачки версии новостей и главной не меняются."""
+    path = tmp_path / 'comments.ndjson'
+    export('comments', path, 'ndjson')
+    Comment.objects.all().delete()
+    scopes = (LIST_SCOPE, news_scope(news_detail.pk))
+    versions = [get_version(scope) for scope in scopes]
+    with django_capture_on_commit_callbacks() as callbacks:
+        import_('comments', path, 'ndjson')
+    assert [get_version(scope) for scope in scopes] == versions
+    for callback in callbacks:
+        callback()
+    assert all(
+        get_version(scope) > version
+        for scope, version in zip(scopes, versions)
+    )
+
+
+def test_recount_comments_repairs_counters(news_detail, comments):
+    """Команда чинит счётчики, разошедшиеся из-за bulk_create."""
+    News.objects.create(title='Без комментариев', text='Текст')
+    News.objects.update(comment_count=7)
+    call_command('recount_comments', batch_size=1, stderr=io.StringIO())
+    assert dict(News.objects.values_list('title', 'comment_count')) == {
+        news_detail.title: 3, 'Без комментариев': 0,
+    }
+
+
+def test_import_indexes_each_batch_at_once(tmp_path, news_detail, comments):
+    """Число запросов к индексу не зависит от размера пачки."""
+    path = tmp_path / 'comments.ndjson'
+    export('comments', path, 'ndjson')
+    total = Comment.objects.count()
+    Comment.objects.all().delete()
+    search.backend()
+    with CaptureQueriesContext(connection) as queries:
+        import_('comments', path, 'ndjson', batch_size=total)
+    index = [
+        query['sql'] for query in queries
+        if search.FTS_TABLE in query['sql']
+        or 'news_searchentry' in query['sql']
+    ]
+    assert len(index) == 2
+    assert search.search_news('Комментарий', 10) == [news_detail]
@@ -1,9 +1,22 @@
+import base64
+import io
+import json
+from datetime import date, timedelta
+from http import HTTPStatus
+
 import pytest
 
 from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 from news.forms import CommentForm
+from news.models import Comment, News
+from news.pytest_tests.budgets import Budget, BudgetExceeded
 
 User = get_user_model()
 
@@ -33,6 +46,106 @@ def test_news_order(news, client, home_url):
     assert all_dates == sorted_dates
 
 
+def test_home_page_comment_count_query(news_with_many_comments, client,
+                                       home_url,
+                                       django_assert_num_queries):
+    """Главная страница строится одним запросом (новости со счётчиком
+    и строка следующей страницы) независимо от количества комментариев.
+    """
+    with django_assert_num_queries(1) as context:
+        response = client.get(home_url)
+    assert not any(
+        'news_comment' in query['sql'] for query in context.captured_queries
+    )
+    object_list = list(response.context[CONTEXT_OBJECT_LIST])
+    assert len(object_list) == len(news_with_many_comments)
+    for news_item in object_list:
+        expected_count = Comment.objects.filter(news=news_item).count()
+        assert news_item.comment_count == expected_count
+        assert 'comment_set' not in getattr(
+            news_item, '_prefetched_objects_cache', {}
+        )
+        assert (
+            f'Комментариев: {expected_count}' in response.content.decode()
+        )
+
+
+@pytest.mark.query_budgets(**{'news:home': Budget(queries=0)})
+def test_query_budget_exceeded(news, client, home_url):
+    """Запрос сверх бюджета маршрута падает со списком выполненных SQL."""
+    with pytest.raises(BudgetExceeded, match='запросов 1 при бюджете 0'):
+        client.get(home_url)
+
+
+def test_news_keyset_pagination(client, home_url, settings):
+    """Курсоры next/prev проходят ленту без пропусков и повторов."""
+    settings.NEWS_COUNT_ON_HOME_PAGE = 2
+    today = date.today()
+    News.objects.bulk_create(
+        News(title=f'Новость {index}', text='Текст',
+             date=today - timedelta(days=index // 2))
+        for index in range(5)
+    )
+    expected = list(News.objects.order_by('-date', '-id'))
+    pages = []
+    response = client.get(home_url)
+    while True:
+        page = response.context['page_obj']
+        pages.append(list(response.context[CONTEXT_OBJECT_LIST]))
+        if not page.has_next:
+            break
+        response = client.get(home_url, {'cursor': page.next_cursor})
+    assert [item for page in pages for item in page] == expected
+    assert [len(page) for page in pages] == [2, 2, 1]
+
+    back = client.get(
+        home_url, {'cursor': response.context['page_obj'].previous_cursor}
+    )
+    assert list(back.context[CONTEXT_OBJECT_LIST]) == pages[1]
+
+
+def test_news_is_paginated_only_with_other_pages(author_client, home_url,
+                                                 news, settings):
+    """Новости на одной странице не дают is_paginated и ссылок."""
+    News.objects.create(title='Вторая', text='Текст')
+    settings.NEWS_COUNT_ON_HOME_PAGE = 2
+    response = author_client.get(home_url)
+    assert response.context['is_paginated'] is False
+    assert 'page-link' not in response.content.decode()
+    settings.NEWS_COUNT_ON_HOME_PAGE = 1
+    assert author_client.get(home_url).context['is_paginated'] is True
+
+
+def test_news_invalid_cursor(client, home_url):
+    """Испорченный курсор даёт 404, а не ошибку сервера."""
+    response = client.get(home_url, {'cursor': 'not-a-cursor'})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def tampered_cursor(values):
+    """Курсор с правильной обёрткой, но негодными значениями ключей."""
+    raw = json.dumps(['n', values]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('name, values', (
+    ('news:home', ['не дата', 1]),
+    ('news:comments', ['не время', 'не число']),
+))
+def test_news_tampered_cursor(client, news, name, values):
+    """Негодные значения в курсоре дают 404, а не ошибку сервера."""
+    url = reverse(name) if name == 'news:home' else reverse(
+        name, args=(news.pk,)
+    )
+    response = client.get(url, {'cursor': tampered_cursor(values)})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_view_queries_use_indexes():
+    """Запросы представлений не читают таблицы целиком с сортировкой."""
+    call_command('check_query_plans', stdout=io.StringIO())
+
+
 def test_comments_order(news_detail, comments, client, news_detail_url):
     """Комментарии на странице отдельной новости отсортированы в
     хронологическом порядке: старые в начале списка, новые — в конце.
@@ -46,6 +159,55 @@ def test_comments_order(news_detail, comments, client, news_detail_url):
     assert all_timestamps == sorted_timestamps
 
 
+def test_comments_served_from_cache(news_detail, comments, author_client,
+                                    news_detail_url):
+    """Повторный просмотр новости не обращается к комментариям в БД."""
+    author_client.get(news_detail_url)
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.get(news_detail_url)
+    assert not any(
+        'news_comment' in query['sql'] for query in queries.captured_queries
+    )
+    for comment in Comment.objects.filter(news=news_detail):
+        assert comment.text in response.content.decode()
+
+
+def test_comment_cache_invalidated_on_write(
+        author_client, comment, news_detail_url, edit_comment_url,
+        django_capture_on_commit_callbacks
+):
+    """Создание, правка и удаление комментария сбрасывают кеш."""
+    author_client.get(news_detail_url)
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(
+            news_detail_url, data={'text': 'Свежий комментарий'}
+        )
+    content = author_client.get(news_detail_url).content.decode()
+    assert 'Свежий комментарий' in content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(edit_comment_url, data={'text': 'Исправленный'})
+    content = author_client.get(news_detail_url).content.decode()
+    assert 'Исправленный' in content
+
+    with django_capture_on_commit_callbacks(execute=True):
+        author_client.post(reverse('news:delete', args=(comment.pk,)))
+    content = author_client.get(news_detail_url).content.decode()
+    assert 'Исправленный' not in content
+
+
+def test_edit_links_only_for_comment_author(comment, client, author,
+                                            not_author, news_detail_url,
+                                            edit_comment_url):
+    """Ссылки правки добавляются к кешу только автору комментария."""
+    client.force_login(author)
+    assert edit_comment_url in client.get(news_detail_url).content.decode()
+    client.force_login(not_author)
+    assert edit_comment_url not in client.get(
+        news_detail_url
+    ).content.decode()
+
+
 def test_anonymous_client_has_no_form(news_detail,
                                       client,
                                       news_detail_url):
@@ -64,3 +226,40 @@ def test_authorized_client_has_form(author_client, news_detail,
     response = author_client.get(news_detail_url)
     assert CONTEXT_OBJECT_FORM in response.context
     assert isinstance(response.context[CONTEXT_OBJECT_FORM], CommentForm)
+
+
+def test_comments_paginated_by_cursor(news_detail, author, client, settings,
+                                      news_detail_url):
+    """Страница новости показывает первые комментарии, остальные идут
+    фрагментами по курсору без пропусков и повторов.
+    """
+    settings.NEWS_COMMENTS_ON_PAGE = 2
+    now = timezone.now()
+    expected = [
+        Comment.objects.create(
+            news=news_detail, author=author, text=f'Комментарий {index}',
+            created=now + timedelta(minutes=index // 2)
+        ).pk
+        for index in range(5)
+    ]
+    response = client.get(news_detail_url)
+    seen = [comment['pk'] for comment in response.context['comments']]
+    assert seen == expected[:2]
+    cursor = response.context['next_cursor']
+    comments_url = reverse('news:comments', args=(news_detail.pk,))
+    while cursor:
+        fragment = client.get(comments_url, {'cursor': cursor})
+        assert fragment.status_code == HTTPStatus.OK
+        seen += [comment['pk'] for comment in fragment.context['comments']]
+        cursor = fragment.context['next_cursor']
+    assert seen == expected
+
+
+def test_comment_fragment_errors(client, news_detail):
+    url = reverse('news:comments', args=(news_detail.pk,))
+    assert client.get(
+        url, {'cursor': 'broken'}
+    ).status_code == HTTPStatus.NOT_FOUND
+    assert client.get(
+        reverse('news:comments', args=(news_detail.pk + 1,))
+    ).status_code == HTTPStatus.NOT_FOUND
@@ -1,17 +1,30 @@
+import io
+import re
 from http import HTTPStatus
 
 import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from pytest_django.asserts import assertRedirects
 from pytest_django.asserts import assertFormError
+from pytest_lazyfixture import lazy_fixture
 
-from news.forms import BAD_WORDS, WARNING
-from news.models import Comment
+from news.forms import BAD_WORDS, WARNING, CommentForm
+from news.models import Comment, News
+from news.moderation import ModerationQueue, moderate, moderation_queue
+from news.profanity import ProfanityMatcher
+from news.pytest_tests.budgets import Budget
 
 COMMENT_TEXT = 'Текст комментария'
 NEW_COMMENT_TEXT = 'Обновлённый комментарий'
 COMMENTS_REDIRECT = '#comments'
 FORM_DATA = {'text': COMMENT_TEXT}
 NEW_FORM_DATA = {'text': NEW_COMMENT_TEXT}
+TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)')
+MANY = re.compile(r'^\d+ times: ')
+SESSION_AND_USER = ['SELECT django_session', 'SELECT auth_user']
 
 pytestmark = pytest.mark.django_db
 
@@ -60,6 +73,32 @@ def test_user_cant_use_bad_words(author_client,
     assert Comment.objects.count() == 0
 
 
+def test_bad_words_with_latin_homoglyphs_rejected():
+    """Подмена букв латинскими двойниками не обходит фильтр."""
+    form = CommentForm(data={'text': 'Ты PEДИCKA!'})
+    assert not form.is_valid()
+    assert form.errors['text'] == [WARNING]
+    assert form.errors.as_data()['text'][0].params == {
+        'words': ['редиска']
+    }
+
+
+@pytest.mark.parametrize('text, whole_words, expected', (
+    ('он и она', False, ['он', 'она']),
+    ('он и она', True, ['он', 'она']),
+    ('сонный', False, ['он']),
+    ('сонный', True, []),
+    ('ушки и хушки', False, ['ушки', 'хушки']),
+    ('ничего такого', False, []),
+))
+def test_profanity_matcher_reports_terms(text, whole_words, expected):
+    """Автомат находит все слова списка, включая перекрывающиеся."""
+    matcher = ProfanityMatcher(
+        ('он', 'она', 'ушки', 'хушки'), whole_words=whole_words
+    )
+    assert matcher.find(text) == expected
+
+
 @pytest.mark.django_db
 def test_author_can_edit_comment(author_client,
                                  comment,
@@ -112,3 +151,263 @@ def test_user_cant_delete_comment_of_another_user(not_author_client,
     assert response.status_code == HTTPStatus.NOT_FOUND
     comments_after = Comment.objects.count()
     assert comments_before == comments_after
+
+
+def statements(queries):
+    """Запросы в виде «команда таблица»; таблицы поискового индекса
+    обоих способов хранения называются search.
+    """
+    result = []
+    for query in queries.captured_queries:
+        sql = MANY.sub('', query['sql'])
+        command = sql.split()[0]
+        match = TABLE.search(sql)
+        if match:
+            table = match.group(1)
+            command += ' search' if 'search' in table else f' {table}'
+        result.append(command)
+    return result
+
+
+@pytest.fixture
+def db_sessions(settings):
+    """Планы ниже начинаются с чтения сессии и пользователя из БД,
+    какой бы режим ни задавал YANEWS_SESSION_MODE.
+    """
+    settings.SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+    settings.AUTHENTICATION_BACKENDS = [
+        'django.contrib.auth.backends.ModelBackend'
+    ]
+
+
+@pytest.mark.usefixtures('db_sessions')
+@pytest.mark.parametrize('url, data, plan', (
+    (lazy_fixture('news_detail_url'), FORM_DATA, [
+        *SESSION_AND_USER, 'SELECT news_news', 'SAVEPOINT',
+        'INSERT news_comment', 'INSERT search', 'UPDATE news_news',
+        'RELEASE',
+    ]),
+    (lazy_fixture('edit_comment_url'), NEW_FORM_DATA, [
+        *SESSION_AND_USER, 'SELECT news_comment', 'UPDATE news_comment',
+        'DELETE search', 'INSERT search',
+    ]),
+    (lazy_fixture('delete_comment_url'), None, [
+        *SESSION_AND_USER, 'SAVEPOINT', 'SELECT news_comment',
+        'DELETE news_comment', 'DELETE search', 'UPDATE news_news',
+        'RELEASE',
+    ]),
+))
+def test_comment_write_query_plan(author_client, comment, url, data, plan):
+    """Запись комментария не перечитывает ни комментарий, ни новость:
+    адрес перехода строится по уже загруженному объекту и news_id.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.post(url, data=data)
+    assert response.status_code == HTTPStatus.FOUND
+    assert statements(queries) == plan
+
+
+@pytest.mark.usefixtures('db_sessions')
+@pytest.mark.parametrize('url', (
+    lazy_fixture('edit_comment_url'), lazy_fixture('delete_comment_url')
+))
+def test_comment_pages_load_news_with_comment(author_client, url):
+    """Заголовок новости на страницах правки и удаления приходит
+    в одном запросе с комментарием.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.get(url)
+    assert response.status_code == HTTPStatus.OK
+    assert statements(queries) == [*SESSION_AND_USER, 'SELECT news_comment']
+
+
+@pytest.fixture
+def cached_auth(settings):
+    settings.SESSION_ENGINE = (
+        'django.contrib.sessions.backends.signed_cookies'
+    )
+    settings.AUTHENTICATION_BACKENDS = ['yanews.auth.CachedModelBackend']
+    settings.AUTH_USER_CACHE_TTL = 60
+
+
+def test_cached_auth_skips_session_and_user(cached_auth, author_client,
+                                            edit_comment_url):
+    """Сессия приходит в cookie, а пользователь — из кеша процесса."""
+    author_client.get(edit_comment_url)
+    with CaptureQueriesContext(connection) as queries:
+        response = author_client.get(edit_comment_url)
+    assert response.status_code == HTTPStatus.OK
+    assert statements(queries) == ['SELECT news_comment']
+
+
+def test_cached_auth_drops_user_on_password_change(cached_auth, author,
+                                                   author_client,
+                                                   edit_comment_url,
+                                                   login_url):
+    author_client.get(edit_comment_url)
+    author.set_password('new-password')
+    author.save()
+    response = author_client.get(edit_comment_url)
+    assertRedirects(response, f'{login_url}?next={edit_comment_url}')
+
+
+@pytest.fixture
+def moderation_settings(settings):
+    settings.NEWS_COMMENT_MODERATION = True
+    settings.NEWS_MODERATION_QUEUE = 'db'
+    return settings
+
+
+def test_moderated_comment_waits_for_worker(
+        moderation_settings, author_client, news_detail_url,
+        django_capture_on_commit_callbacks
+):
+    """В режиме модерации комментарий публикуется только обработчиком."""
+    author_client.post(news_detail_url, data=FORM_DATA)
+    comment = Comment.objects.get()
+    assert comment.status == Comment.Status.PENDING
+    assert COMMENT_TEXT not in author_client.get(
+        news_detail_url
+    ).content.decode()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('moderate_comments', stderr=io.StringIO())
+
+    comment.refresh_from_db()
+    assert comment.status == Comment.Status.PUBLISHED
+    assert COMMENT_TEXT in author_client.get(
+        news_detail_url
+    ).content.decode()
+
+
+def test_moderation_rejects_link_spam(moderation_settings, author_client,
+                                      news_detail_url):
+    """Обработчик отклоняет комментарии, не прошедшие проверки."""
+    spam = 'http://a.example http://b.example http://c.example'
+    author_client.post(news_detail_url, data={'text': spam})
+    author_client.post(news_detail_url, data=FORM_DATA)
+
+    published, rejected = moderate(
+        Comment.objects.values_list('pk', flat=True)
+    )
+
+    assert rejected == {Comment.objects.get(text=spam).pk}
+    assert published == {Comment.objects.get(text=COMMENT_TEXT).pk}
+    assert Comment.objects.get(text=spam).status == Comment.Status.REJECTED
+
+
+def test_moderation_counts_each_comment_once(moderation_settings,
+                                             monkeypatch, author_client,
+                                             news_detail, news_detail_url):
+    """Пока пачка проверяется, её уже опубликовал другой обработчик,
+    а один из комментариев удалён: счётчик растёт только один раз.
+    """
+    author_client.post(news_detail_url, data=FORM_DATA)
+    author_client.post(news_detail_url, data={'text': 'Удалят'})
+    ids = list(Comment.objects.values_list('pk', flat=True))
+    gone = Comment.objects.get(text='Удалят')
+
+    def concurrent_worker(comments):
+        monkeypatch.setattr('news.moderation.get_checks', lambda: [])
+        moderate([comment.pk for comment in comments if comment != gone])
+        gone.delete()
+        return set()
+
+    monkeypatch.setattr(
+        'news.moderation.get_checks', lambda: [concurrent_worker]
+    )
+    published, rejected = moderate(ids)
+
+    assert published == rejected == set()
+    news_detail.refresh_from_db()
+    assert news_detail.comment_count == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_thread_queue_publishes_after_commit(moderation_settings,
+                                             author_client,
+                                             news_detail_url):
+    """Очередь в процессе получает комментарий после фиксации записи."""
+    moderation_settings.NEWS_MODERATION_QUEUE = 'thread'
+    author_client.post(news_detail_url, data=FORM_DATA)
+    moderation_queue.join()
+    assert Comment.objects.get().status == Comment.Status.PUBLISHED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_thread_queue_resumes_pending_comments(moderation_settings, author,
+                                               news_detail):
+    """Комментарии, не разобранные до перезапуска, проверяются снова."""
+    moderation_settings.NEWS_MODERATION_QUEUE = 'thread'
+    left = Comment.objects.create(
+        news=news_detail, author=author, text='Остался',
+        status=Comment.Status.PENDING
+    )
+    new = Comment.objects.create(
+        news=news_detail, author=author, text=COMMENT_TEXT,
+        status=Comment.Status.PENDING
+    )
+    restarted = ModerationQueue()
+    restarted.submit(new.pk)
+    restarted.join()
+    assert set(Comment.objects.values_list('status', flat=True)) == {
+        Comment.Status.PUBLISHED
+    }
+    left.refresh_from_db()
+    assert left.status == Comment.Status.PUBLISHED
+
+
+# Сверх обычной правки — транзакция и уменьшение счётчика новости.
+@pytest.mark.query_budgets(**{'news:edit': Budget(queries=8, time_ms=50)})
+def test_edited_comment_is_moderated_again(
+        moderation_settings, author_client, news_detail, news_detail_url,
+        edit_comment_url, comment, django_capture_on_commit_callbacks
+):
+    """Правка опубликованного комментария снова ждёт модерации."""
+    News.objects.filter(pk=news_detail.pk).update(comment_count=1)
+    spam = 'http://a.example http://b.example http://c.example'
+    response = author_client.post(edit_comment_url, data={'text': spam})
+    assertRedirects(response, f'{news_detail_url}#comments')
+    comment.refresh_from_db()
+    assert comment.status == Comment.Status.PENDING
+    news_detail.refresh_from_db()
+    assert news_detail.comment_count == 0
+    assert spam not in author_client.get(news_detail_url).content.decode()
+
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('moderate_comments', stderr=io.StringIO())
+    comment.refresh_from_db()
+    assert comment.status == Comment.Status.REJECTED
+
+    author_client.post(edit_comment_url, data=NEW_FORM_DATA)
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('moderate_comments', stderr=io.StringIO())
+    comment.refresh_from_db()
+    assert comment.status == Comment.Status.PUBLISHED
+    news_detail.refresh_from_db()
+    assert news_detail.comment_count == 1
+
+
+def test_comment_counter_follows_writes(author_client, news_detail,
+                                        news_detail_url):
+    """Счётчик растёт при добавлении и уменьшается при удалении."""
+    author_client.post(news_detail_url, data=FORM_DATA)
+    news_detail.refresh_from_db()
+    assert news_detail.comment_count == 1
+    comment = Comment.objects.get()
+    author_client.post(reverse('news:delete', args=(comment.pk,)))
+    news_detail.refresh_from_db()
+    assert news_detail.comment_count == 0
+
+
+def test_comment_counter_counts_published_only(moderation_settings,
+                                               author_client, news_detail,
+                                               news_detail_url):
+    spam = 'http://a.example http://b.example http://c.example'
+    author_client.post(news_detail_url, data={'text': spam})
+    author_client.post(news_detail_url, data=FORM_DATA)
+    news_detail.refresh_from_db()
+    assert news_detail.comment_count == 0
+    call_command('moderate_comments', stderr=io.StringIO())
+    news_detail.refresh_from_db()
+    assert news_detail.comment_count == 1
@@ -0,0 +1,58 @@
+import json
+import logging
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+PROFILING_LOGGER = 'yanews.profiling'
+
+
+def parse_server_timing(header):
+    """{'sql': {'dur': '1.2', 'desc': '3 queries'}, ...}"""
+    metrics = {}
+    for metric in header.split(','):
+        name, *params = metric.strip().split(';')
+        metrics[name] = dict(
+            (param.split('=', 1)[0], param.split('=', 1)[1].strip('"'))
+            for param in params
+        )
+    return metrics
+
+
+def test_server_timing(settings, client, comment, news_detail_url):
+    """Заголовок разделяет время запроса на SQL и шаблоны."""
+    settings.PROFILING_SERVER_TIMING = True
+    response = client.get(news_detail_url)
+    timing = parse_server_timing(response['Server-Timing'])
+    assert set(timing) == {'total', 'sql', 'tpl'}
+    queries, unit = timing['sql']['desc'].split()
+    assert unit == 'queries' and int(queries) > 0
+    total = float(timing['total']['dur'])
+    assert float(timing['tpl']['dur']) > 0
+    assert total >= float(timing['sql']['dur'])
+    assert total >= float(timing['tpl']['dur'])
+
+
+def test_server_timing_disabled(settings, client, news_detail_url):
+    settings.PROFILING_SERVER_TIMING = False
+    assert 'Server-Timing' not in client.get(news_detail_url)
+
+
+def test_sampled_json_log(settings, caplog, client, comment,
+                          news_detail_url):
+    """Замеры пишутся в журнал строкой JSON с долей выборки."""
+    caplog.set_level(logging.INFO, logger=PROFILING_LOGGER)
+    settings.PROFILING_LOG_SAMPLE_RATE = 0
+    client.get(news_detail_url)
+    assert not caplog.records
+    settings.PROFILING_LOG_SAMPLE_RATE = 1
+    settings.PROFILING_SERVER_TIMING = True
+    response = client.get(news_detail_url)
+    [record] = caplog.records
+    entry = json.loads(record.getMessage())
+    assert entry['view'] == 'news:detail'
+    assert entry['status'] == response.status_code
+    timing = parse_server_timing(response['Server-Timing'])
+    assert f'{entry["queries"]} queries' == timing['sql']['desc']
+    assert entry['total_ms'] >= entry['sql_ms']
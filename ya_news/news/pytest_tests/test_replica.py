@@ -0,0 +1,70 @@
+import sqlite3
+from http import HTTPStatus
+
+import pytest
+from django.db import connection, connections, router
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from news.models import News
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+
+@pytest.fixture
+def replica(settings, tmp_path, news_detail):
+    """Реплика — снимок основной базы в отдельном файле SQLite.
+
+    Записи после снимка на неё не попадают, как при отставании.
+    """
+    path = tmp_path / 'replica.sqlite3'
+    connection.ensure_connection()
+    target = sqlite3.connect(path)
+    connection.connection.backup(target)
+    target.close()
+    connections.databases['replica'] = {
+        **connection.settings_dict, 'NAME': str(path)
+    }
+    settings.DATABASE_REPLICAS = ['replica']
+    yield connections['replica']
+    connections['replica'].close()
+    del connections['replica']
+    del connections.databases['replica']
+
+
+def test_pages_read_replica(replica, author_client, news_detail_url):
+    with CaptureQueriesContext(replica) as queries:
+        response = author_client.get(news_detail_url)
+    assert response.status_code == HTTPStatus.OK
+    assert any('"news_news"' in query['sql'] for query in queries)
+
+
+def test_writer_reads_primary_after_comment(replica, settings,
+                                            author_client, news_detail_url):
+    """Читатель видит свой комментарий, пока реплика отстаёт."""
+    response = author_client.post(news_detail_url, data={'text': 'Текст'})
+    assert response.status_code == HTTPStatus.FOUND
+    pin = response.cookies[settings.REPLICA_PIN_COOKIE]
+    assert pin['max-age'] == settings.REPLICA_PIN_SECONDS
+    response = author_client.get(news_detail_url)
+    assert response.context['object'].comment_count == 1
+    del author_client.cookies[settings.REPLICA_PIN_COOKIE]
+    response = author_client.get(news_detail_url)
+    assert response.context['object'].comment_count == 0
+
+
+def test_replica_reads_do_not_fill_fresh_cache(replica, author_client,
+                                               news_detail_url):
+    """Аноним, прочитавший отстающую реплику, не кладёт её данные под
+    новую версию, и автор после перехода видит свой комментарий.
+    """
+    author_client.post(news_detail_url, data={'text': 'Свежий'})
+    anonymous = Client().get(news_detail_url).content.decode()
+    assert 'Свежий' not in anonymous
+    response = author_client.get(news_detail_url)
+    assert 'Свежий' in response.content.decode()
+
+
+def test_reads_without_request_use_primary(replica):
+    assert router.db_for_read(News) == 'default'
+    assert not router.allow_migrate_model('replica', News)
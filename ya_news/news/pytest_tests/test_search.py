@@ -0,0 +1,78 @@
+from django.core.management import call_command
+from django.urls import reverse
+import pytest
+
+from news import search
+from news.models import Comment, News
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(params=(search.FTS5, search.ENTRIES), autouse=True)
+def search_backend(request, settings):
+    """Поиск проверяется и на FTS5, и на таблице SearchEntry."""
+    settings.NEWS_SEARCH_BACKEND = request.param
+    return request.param
+
+
+@pytest.fixture
+def search_url():
+    return reverse('news:search')
+
+
+def test_search_finds_word_forms():
+    """Запрос в другой форме слова находит новость."""
+    news = News.objects.create(title='Главные новости', text='Текст')
+    News.objects.create(title='Погода', text='Дожди')
+    assert search.search_news('новостей', 10) == [news]
+
+
+def test_search_requires_all_words():
+    News.objects.create(title='Новости спорта', text='Футбол')
+    both = News.objects.create(title='Новости погоды', text='Дожди')
+    assert search.search_news('новость дождь', 10) == [both]
+
+
+def test_title_ranked_above_text():
+    """Совпадение в заголовке весомее совпадения в тексте."""
+    in_text = News.objects.create(title='Обзор', text='Про выборы')
+    in_title = News.objects.create(title='Выборы', text='Обзор')
+    assert search.search_news('выборы', 10) == [in_title, in_text]
+
+
+def test_published_comment_finds_news(news_detail, author):
+    """Текст опубликованного комментария находит его новость."""
+    comment = Comment.objects.create(
+        news=news_detail, author=author, text='Отличный репортаж'
+    )
+    Comment.objects.create(
+        news=news_detail, author=author, text='Спорный прогноз',
+        status=Comment.Status.PENDING
+    )
+    assert search.search_news('репортажи', 10) == [news_detail]
+    assert search.search_news('прогноз', 10) == []
+    comment.delete()
+    assert search.search_news('репортажи', 10) == []
+
+
+def test_changes_update_index(news_detail):
+    news_detail.title = 'Землетрясение'
+    news_detail.save()
+    assert search.search_news('землетрясения', 10) == [news_detail]
+    news_detail.delete()
+    assert search.search_news('землетрясения', 10) == []
+
+
+def test_rebuild_search_index(news_detail):
+    """Команда восстанавливает индекс, потерянный мимо сигналов."""
+    search.remove_news(news_detail.pk)
+    assert search.search_news(news_detail.title, 10) == []
+    call_command('rebuild_search_index')
+    assert search.search_news(news_detail.title, 10) == [news_detail]
+
+
+def test_search_page(client, search_url):
+    news = News.objects.create(title='Новости науки', text='Открытие')
+    response = client.get(search_url, {'q': 'открытия'})
+    assert list(response.context['object_list']) == [news]
+    assert client.get(search_url).context['object_list'] == []
@@ -0,0 +1,24 @@
+import pytest
+from django.db import connections
+
+pytestmark = pytest.mark.django_db
+
+
+def test_pragmas_applied_to_new_connections(settings, tmp_path):
+    settings.SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234
+    }
+    default = connections['default']
+    database = type(default)(
+        {**default.settings_dict, 'NAME': str(tmp_path / 'db.sqlite3')},
+        alias='pragmas'
+    )
+    try:
+        with database.cursor() as cursor:
+            pragmas = [
+                cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'busy_timeout')
+            ]
+    finally:
+        database.close()
+    assert pragmas == ['wal', 1, 1234]
@@ -0,0 +1,221 @@
+"""Полнотекстовый поиск по новостям и комментариям.
+
+Текст разбивается на слова и приводится к основам стеммером Snowball,
+поэтому «новости» и «новостей» находятся одним запросом. Индекс хранится
+в виртуальной таблице SQLite FTS5 с ранжированием BM25, а если FTS5
+недоступен — в таблице SearchEntry с ранжированием TF-IDF. Индекс
+обновляется по одному документу из сигналов моделей и пачками при
+загрузке.
+"""
+import math
+import re
+from functools import lru_cache
+
+import snowballstemmer
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from .models import Comment, News, SearchEntry
+
+FTS_TABLE = 'news_search_fts'
+FTS5 = 'fts5'
+ENTRIES = 'entries'
+TITLE_WEIGHT = 2.0
+WORD = re.compile(r'\w+')
+MAX_TERM_LENGTH = SearchEntry._meta.get_field('term').max_length
+
+_stemmer = snowballstemmer.stemmer('russian')
+
+
+def stems(text):
+    """Основы слов текста в нижнем регистре."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return [stem[:MAX_TERM_LENGTH] for stem in _stemmer.stemWords(words)]
+
+
+@lru_cache(maxsize=None)
+def fts5_table_exists(database_name):
+    """Создана ли таблица FTS5 миграцией; проверяется раз на базу."""
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def backend():
+    """Выбранный в NEWS_SEARCH_BACKEND способ хранения индекса."""
+    choice = settings.NEWS_SEARCH_BACKEND
+    if choice == 'auto':
+        database_name = connection.settings_dict['NAME']
+        return FTS5 if fts5_table_exists(database_name) else ENTRIES
+    return choice
+
+
+def news_key(news_id):
+    return news_id * 2
+
+
+def comment_key(comment_id):
+    return comment_id * 2 + 1
+
+
+def _index(documents, created=False):
+    """Индексирует документы (ключ, новость, заголовок, текст) пачкой:
+    число запросов не зависит от их количества. Новый документ не бывал
+    в индексе, и удалять его записи незачем: первичные ключи SQLite
+    с AUTOINCREMENT не переиспользуются.
+    """
+    documents = [
+        (key, target, stems(title), stems(body))
+        for key, target, title, body in documents
+    ]
+    if not documents:
+        return
+    if not created:
+        _remove([key for key, *_ in documents])
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body, target) '
+                'VALUES (%s, %s, %s, %s)',
+                [
+                    [key, ' '.join(title_stems), ' '.join(body_stems), target]
+                    for key, target, title_stems, body_stems in documents
+                ]
+            )
+        return
+    entries = []
+    for key, target, title_stems, body_stems in documents:
+        weights = {}
+        for stem in body_stems:
+            weights[stem] = weights.get(stem, 0) + 1
+        for stem in title_stems:
+            weights[stem] = weights.get(stem, 0) + TITLE_WEIGHT
+        entries.extend(
+            SearchEntry(document=key, target=target, term=term, weight=weight)
+            for term, weight in weights.items()
+        )
+    SearchEntry.objects.bulk_create(entries)
+
+
+def _remove(keys):
+    if not keys:
+        return
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [[key] for key in keys]
+            )
+        return
+    SearchEntry.objects.filter(document__in=keys).delete()
+
+
+def index_news_items(news_items, created=False):
+    _index(
+        (
+            (news_key(news.pk), news.pk, news.title, news.text)
+            for news in news_items
+        ),
+        created
+    )
+
+
+def index_news(news, created=False):
+    index_news_items([news], created)
+
+
+def remove_news(news_id):
+    _remove([news_key(news_id)])
+
+
+def index_comments(comments, created=False):
+    """Текст опубликованного комментария находит его новость."""
+    comments = list(comments)
+    published = [
+        comment for comment in comments
+        if comment.status == Comment.Status.PUBLISHED
+    ]
+    if not created:
+        _remove([
+            comment_key(comment.pk) for comment in comments
+            if comment.status != Comment.Status.PUBLISHED
+        ])
+    _index(
+        (
+            (comment_key(comment.pk), comment.news_id, '', comment.text)
+            for comment in published
+        ),
+        created
+    )
+
+
+def index_comment(comment, created=False):
+    index_comments([comment], created)
+
+
+def remove_comment(comment_id):
+    _remove([comment_key(comment_id)])
+
+
+def _search_fts5(terms, limit):
+    match = '{title body}: (%s)' % ' AND '.join(f'"{term}"' for term in terms)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT target, MIN(rank) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s '
+            'GROUP BY target ORDER BY score LIMIT %s',
+            [match, limit]
+        )
+        return [target for target, _ in cursor.fetchall()]
+
+
+def _search_entries(terms, limit):
+    entries = SearchEntry.objects.filter(term__in=terms)
+    frequencies = dict(
+        entries.order_by().values('term').annotate(
+            documents=Count('target', distinct=True)
+        ).values_list('term', 'documents')
+    )
+    if len(frequencies) < len(terms):
+        return []
+    total = News.objects.count()
+    score = Sum(Case(
+        *(
+            When(term=term, then=F('weight') * math.log(1 + total / count))
+            for term, count in frequencies.items()
+        ),
+        output_field=FloatField(),
+    ))
+    return list(
+        entries.order_by().values('target').annotate(
+            matched=Count('term', distinct=True), score=score
+        ).filter(matched=len(terms)).order_by(
+            '-score', 'target'
+        ).values_list('target', flat=True)[:limit]
+    )
+
+
+def search_news(query, limit):
+    """Новости, где встречаются все слова запроса, лучшие первыми."""
+    terms = sorted(set(stems(query)))
+    if not terms:
+        return []
+    if backend() == FTS5:
+        ids = _search_fts5(terms, limit)
+    else:
+        ids = _search_entries(terms, limit)
+    found = News.objects.in_bulk(ids)
+    return [found[news_id] for news_id in ids if news_id in found]
+
+
+def rebuild():
+    """Полностью перестраивает индекс текущего способа хранения."""
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchEntry.objects.all().delete()
+    for news in News.objects.iterator():
+        index_news(news)
+    comments = Comment.objects.filter(status=Comment.Status.PUBLISHED)
+    for comment in comments.iterator():
+        index_comment(comment)
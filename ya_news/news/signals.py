@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import search
+from .caching import (
+    LIST_SCOPE, bump_versions, news_scope
+)
+from .models import Comment, News
+
+
+@receiver((post_save, post_delete), sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Новая версия новости сбрасывает кеш её страниц и комментариев.
+
+    Версия меняется после фиксации транзакции: иначе читатель успел бы
+    закешировать под новой версией ещё старые комментарии и счётчик.
+    """
+    scope = news_scope(instance.news_id)
+    transaction.on_commit(lambda: bump_versions(LIST_SCOPE, scope))
+
+
+@receiver((post_save, post_delete), sender=News)
+def news_changed(sender, instance, **kwargs):
+    scope = news_scope(instance.pk)
+    transaction.on_commit(lambda: bump_versions(LIST_SCOPE, scope))
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, created, **kwargs):
+    search.index_comment(instance, created)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    search.remove_comment(instance.pk)
+
+
+@receiver(post_save, sender=News)
+def index_news(sender, instance, created, **kwargs):
+    search.index_news(instance, created)
+
+
+@receiver(post_delete, sender=News)
+def unindex_news(sender, instance, **kwargs):
+    search.remove_news(instance.pk)
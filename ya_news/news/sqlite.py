@@ -0,0 +1,17 @@
+"""PRAGMA из настройки SQLITE_PRAGMAS для каждого нового соединения.
+
+Часть PRAGMA (journal_mode=WAL) хранится в самом файле базы, остальные
+(synchronous, mmap_size, busy_timeout) действуют только на соединение,
+поэтому выполняются при каждом подключении.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
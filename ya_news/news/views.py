@@ -1,47 +1,101 @@
 from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import transaction
+from django.http import Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views import generic
 
+from .caching import (
+    LIST_SCOPE, AnonymousPageCacheMixin, get_rendered_comments, news_scope
+)
+from . import moderation, search
 from .forms import CommentForm
 from .models import Comment, News
+from .pagination import InvalidCursor, KeysetPaginationMixin
 
 
-class NewsList(generic.ListView):
+class NewsList(
+        AnonymousPageCacheMixin,
+        KeysetPaginationMixin,
+        generic.ListView
+):
     """Список новостей."""
     model = News
     template_name = 'news/home.html'
+    paginate_keys = ('-date', '-id')
 
-    def get_queryset(self):
+    def get_cache_scope(self):
+        return LIST_SCOPE
+
+    def get_paginate_by(self, queryset):
         """
         Выводим только несколько последних новостей.
 
-        Их количество определяется в настройках проекта.
+        Их количество определяется в настройках проекта, более старые
+        новости доступны по курсору ?cursor=.
         """
-        return self.model.objects.prefetch_related(
-            'comment_set'
-        )[:settings.NEWS_COUNT_ON_HOME_PAGE]
+        return settings.NEWS_COUNT_ON_HOME_PAGE
 
 
-class NewsDetail(generic.DetailView):
+class NewsDetail(AnonymousPageCacheMixin, generic.DetailView):
     model = News
     template_name = 'news/detail.html'
 
+    def get_cache_scope(self):
+        return news_scope(self.kwargs['pk'])
+
     def get_object(self, queryset=None):
-        obj = get_object_or_404(
-            self.model.objects.prefetch_related('comment_set__author'),
-            pk=self.kwargs['pk']
-        )
-        return obj
+        return get_object_or_404(self.model, pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
+        """Первая страница комментариев берётся отрисованной из кеша.
+
+        Следующие страницы подгружаются фрагментами через NewsComments.
+        """
         context = super().get_context_data(**kwargs)
+        context.update(get_rendered_comments(self.object.pk))
         if self.request.user.is_authenticated:
             context['form'] = CommentForm()
         return context
 
 
+class NewsComments(AnonymousPageCacheMixin, generic.TemplateView):
+    """Фрагмент со следующей страницей комментариев по курсору."""
+    template_name = 'news/includes/comment_list.html'
+
+    def get_cache_scope(self):
+        return news_scope(self.kwargs['pk'])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        news_id = self.kwargs['pk']
+        if not News.objects.filter(pk=news_id).exists():
+            raise Http404('Новость не найдена.')
+        try:
+            context.update(get_rendered_comments(
+                news_id, self.request.GET.get('cursor')
+            ))
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы.')
+        context['news_id'] = news_id
+        return context
+
+
+class NewsSearch(generic.TemplateView):
+    """Поиск по новостям и комментариям к ним."""
+    template_name = 'news/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        context['object_list'] = search.search_news(
+            query, settings.NEWS_SEARCH_RESULTS
+        ) if query else []
+        return context
+
+
 class NewsComment(
         LoginRequiredMixin,
         generic.detail.SingleObjectMixin,
@@ -55,16 +109,29 @@ class NewsComment(
         self.object = self.get_object()
         return super().post(request, *args, **kwargs)
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update(get_rendered_comments(self.object.pk))
+        return context
+
     def form_valid(self, form):
         comment = form.save(commit=False)
         comment.news = self.object
         comment.author = self.request.user
-        comment.save()
+        if settings.NEWS_COMMENT_MODERATION:
+            comment.status = Comment.Status.PENDING
+        with transaction.atomic():
+            comment.save()
+            if comment.status == Comment.Status.PUBLISHED:
+                News.add_comments(comment.news_id)
+        if settings.NEWS_COMMENT_MODERATION:
+            moderation.submit(comment)
         return super().form_valid(form)
 
     def get_success_url(self):
-        post = self.get_object()
-        return reverse('news:detail', kwargs={'pk': post.pk}) + '#comments'
+        return reverse(
+            'news:detail', kwargs={'pk': self.object.pk}
+        ) + '#comments'
 
 
 class NewsDetailView(generic.View):
@@ -83,22 +150,77 @@ class CommentBase(LoginRequiredMixin):
     model = Comment
 
     def get_success_url(self):
-        comment = self.get_object()
+        """Комментарий уже загружен представлением, а для адреса
+        новости достаточно news_id без запроса к самой новости.
+        """
         return reverse(
-            'news:detail', kwargs={'pk': comment.news.pk}
+            'news:detail', kwargs={'pk': self.object.news_id}
         ) + '#comments'
 
     def get_queryset(self):
-        """Пользователь может работать только со своими комментариями."""
-        return self.model.objects.filter(author=self.request.user)
+        """Пользователь может работать только со своими комментариями.
+
+        Заголовок новости выводят шаблоны правки и удаления.
+        """
+        return self.model.objects.filter(
+            author=self.request.user
+        ).select_related('news')
 
 
 class CommentUpdate(CommentBase, generic.UpdateView):
-    """Редактирование комментария."""
+    """Редактирование комментария.
+
+    В режиме модерации правленый текст снова ждёт проверки, как новый
+    комментарий: иначе безобидный текст после публикации можно было бы
+    заменить рассылкой.
+    """
     template_name = 'news/edit.html'
     form_class = CommentForm
 
+    def get_queryset(self):
+        """Статус читается под блокировкой: модерация не опубликует
+        комментарий между чтением и возвратом на проверку.
+        """
+        queryset = super().get_queryset()
+        if self.request.method == 'POST' and settings.NEWS_COMMENT_MODERATION:
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def post(self, request, *args, **kwargs):
+        if not settings.NEWS_COMMENT_MODERATION:
+            return super().post(request, *args, **kwargs)
+        with transaction.atomic():
+            return super().post(request, *args, **kwargs)
+
+    def form_valid(self, form):
+        if not settings.NEWS_COMMENT_MODERATION:
+            return super().form_valid(form)
+        comment = form.save(commit=False)
+        if comment.status == Comment.Status.PUBLISHED:
+            News.add_comments(comment.news_id, -1)
+        comment.status = Comment.Status.PENDING
+        comment.save()
+        moderation.submit(comment)
+        return HttpResponseRedirect(self.get_success_url())
+
 
 class CommentDelete(CommentBase, generic.DeleteView):
     """Удаление комментария."""
     template_name = 'news/delete.html'
+
+    def get_queryset(self):
+        """Статус удаляемого комментария читается под блокировкой:
+        модерация не опубликует его между чтением и удалением.
+        """
+        queryset = super().get_queryset()
+        if self.request.method == 'POST':
+            queryset = queryset.select_for_update()
+        return queryset
+
+    def delete(self, request, *args, **kwargs):
+        """Счётчик уменьшается в одной транзакции с удалением."""
+        with transaction.atomic():
+            response = super().delete(request, *args, **kwargs)
+            if self.object.status == Comment.Status.PUBLISHED:
+                News.add_comments(self.object.news_id, -1)
+        return response
@@ -0,0 +1,74 @@
+"""Пользователь сессии из кеша процесса.
+
+ModelBackend читает пользователя из БД на каждый запрос вошедшего
+читателя. CachedModelBackend помнит загруженных пользователей
+AUTH_USER_CACHE_TTL секунд, не больше AUTH_USER_CACHE_SIZE записей.
+Сверка хеша сессии в django.contrib.auth.get_user остаётся прежней,
+поэтому смена пароля по-прежнему завершает остальные сессии.
+
+Запись и удаление пользователя и выход из аккаунта сбрасывают его
+запись в этом процессе; в остальных процессах она живёт не дольше TTL.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.signals import user_logged_out
+from django.core.signals import setting_changed
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+_users = OrderedDict()
+_lock = threading.Lock()
+
+
+def forget(user_id):
+    with _lock:
+        _users.pop(user_id, None)
+
+
+def clear():
+    with _lock:
+        _users.clear()
+
+
+class CachedModelBackend(ModelBackend):
+
+    def get_user(self, user_id):
+        """Копия из кеша: запрос может менять своего пользователя."""
+        now = time.monotonic()
+        with _lock:
+            entry = _users.get(user_id)
+            if entry is not None and entry[0] > now:
+                _users.move_to_end(user_id)
+                return copy.copy(entry[1])
+        user = super().get_user(user_id)
+        if user is not None:
+            with _lock:
+                _users[user_id] = (
+                    now + settings.AUTH_USER_CACHE_TTL, copy.copy(user)
+                )
+                _users.move_to_end(user_id)
+                while len(_users) > settings.AUTH_USER_CACHE_SIZE:
+                    _users.popitem(last=False)
+        return user
+
+
+@receiver((post_save, post_delete), sender=settings.AUTH_USER_MODEL)
+def forget_changed_user(sender, instance, **kwargs):
+    forget(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, request, user, **kwargs):
+    if user is not None:
+        forget(user.pk)
+
+
+@receiver(setting_changed)
+def clear_on_setting_change(setting, **kwargs):
+    if setting.startswith('AUTH'):
+        clear()
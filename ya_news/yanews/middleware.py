@@ -0,0 +1,158 @@
+"""Профилирование запросов: общее время, SQL и отрисовка шаблонов.
+
+ProfilingMiddleware должен стоять первым в MIDDLEWARE, тогда замер
+охватывает и остальные middleware. Результат отдаётся заголовком
+
+    Server-Timing: total;dur=12.3, sql;desc="7 queries";dur=4.5, tpl;dur=3.2
+
+(PROFILING_SERVER_TIMING) и доля PROFILING_LOG_SAMPLE_RATE запросов
+пишется в журнал yanews.profiling одной строкой JSON.
+
+Время шаблонов считается по внешним вызовам Template.render, поэтому
+{% include %} не учитывается дважды, а запросы, которые шаблон
+выполняет лениво, входят и в sql, и в tpl. Запросы, выполненные при
+отдаче потокового ответа, в замер не попадают.
+
+Замер текущего запроса хранится в ContextVar, а запросы к БД ловит
+общая обёртка всех соединений. Контекст переходит в потоки
+sync_to_async, поэтому под ASGI учитываются и запросы асинхронных
+представлений, выполненные в пуле потоков.
+"""
+import asyncio
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+logger = logging.getLogger('yanews.profiling')
+
+_profile = ContextVar('profile', default=None)
+
+
+class Profile:
+    """Замеры одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.queries = 0
+        self.sql = 0.0
+        self.templates = 0.0
+        self.depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql += time.perf_counter() - started
+
+    def server_timing(self):
+        return (
+            f'total;dur={self.total * 1000:.1f}, '
+            f'sql;desc="{self.queries} queries";dur={self.sql * 1000:.1f}, '
+            f'tpl;dur={self.templates * 1000:.1f}'
+        )
+
+    def as_dict(self, request, response):
+        match = request.resolver_match
+        return {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(self.total * 1000, 3),
+            'sql_ms': round(self.sql * 1000, 3),
+            'queries': self.queries,
+            'templates_ms': round(self.templates * 1000, 3),
+        }
+
+
+def _timed(render):
+    def wrapper(self, context):
+        profile = _profile.get()
+        if profile is None:
+            return render(self, context)
+        profile.depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.depth -= 1
+            if not profile.depth:
+                profile.templates += time.perf_counter() - started
+
+    wrapper.profiled = True
+    return wrapper
+
+
+def _record(execute, sql, params, many, context):
+    profile = _profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile(execute, sql, params, many, context)
+
+
+def _attach(connection, **kwargs):
+    """Обёртка встаёт первой: connection.execute_wrapper() снимает
+    свою обёртку с конца списка.
+    """
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record)
+
+
+def instrument():
+    """Один раз на процесс оборачивает Template.render и соединения."""
+    if getattr(Template.render, 'profiled', False):
+        return
+    Template.render = _timed(Template.render)
+    connection_created.connect(_attach)
+    for connection in connections.all():
+        _attach(connection)
+
+
+class ProfilingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так обработчик Django узнаёт асинхронный middleware.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+        instrument()
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        profile = Profile()
+        token = _profile.set(profile)
+        try:
+            response = self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.finish(profile, request, response)
+
+    async def __acall__(self, request):
+        profile = Profile()
+        token = _profile.set(profile)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _profile.reset(token)
+        return self.finish(profile, request, response)
+
+    def finish(self, profile, request, response):
+        profile.total = time.perf_counter() - profile.started
+        if settings.PROFILING_SERVER_TIMING:
+            response['Server-Timing'] = profile.server_timing()
+        if random.random() < settings.PROFILING_LOG_SAMPLE_RATE:
+            logger.info(json.dumps(profile.as_dict(request, response)))
+        return response
@@ -0,0 +1,122 @@
+"""Чтение новостей с реплики, запись — в основную базу.
+
+ReplicaRouter отправляет чтение моделей приложения news на одну из
+DATABASE_REPLICAS, а запись — в основную базу default. Реплики
+включаются только внутри запроса, прошедшего ReplicaPinMiddleware:
+команды, фоновые потоки и сами записи читают основную базу.
+
+Реплика отстаёт от основной базы, поэтому читатель сразу после своей
+записи читает основную базу:
+
+- небезопасные методы (POST и др.) целиком идут в основную базу,
+  включая проверки формы перед записью;
+- запрос, записавший модели news, ставит cookie REPLICA_PIN_COOKIE
+  на REPLICA_PIN_SECONDS секунд, и пока она жива, страницы этого
+  читателя — например, переход на #comments после комментария —
+  тоже читают основную базу.
+"""
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_pin = ContextVar('replica_pin', default=None)
+
+
+class Pin:
+    """Выбор базы для чтения в текущем запросе."""
+
+    def __init__(self, primary):
+        self.primary = primary
+        self.wrote = False
+
+
+class ReplicaRouter:
+    route_app_labels = {'news'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        pin = _pin.get()
+        if pin is None or pin.primary or not settings.DATABASE_REPLICAS:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        """Объект, прочитанный с реплики, сохраняется в основную базу.
+
+        После записи запрос до конца читает основную базу.
+        """
+        if model._meta.app_label not in self.route_app_labels:
+            return None
+        pin = _pin.get()
+        if pin is not None:
+            pin.primary = pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        """Реплики хранят те же строки, что и основная база."""
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, **hints):
+        """Схему реплик переносит репликация, а не migrate."""
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """Включает реплики для запроса и ставит cookie после записи.
+
+    Должен стоять перед middleware и представлениями, читающими news.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Так обработчик Django узнаёт асинхронный middleware.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        pin = self.pin(request)
+        token = _pin.set(pin)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pin.reset(token)
+        return self.finish(pin, response)
+
+    async def __acall__(self, request):
+        pin = self.pin(request)
+        token = _pin.set(pin)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _pin.reset(token)
+        return self.finish(pin, response)
+
+    def pin(self, request):
+        return Pin(
+            request.method not in SAFE_METHODS
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+
+    def finish(self, pin, response):
+        if pin.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
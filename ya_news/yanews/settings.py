@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -21,6 +22,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanews.middleware.ProfilingMiddleware',
+    'yanews.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -58,6 +61,75 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения: путь к её файлу SQLite в переменной окружения
+# YANEWS_REPLICA_DB. Страницы читают новости и комментарии с реплики, а читатель
+# после своей записи REPLICA_PIN_SECONDS секунд читает основную базу.
+DATABASE_REPLICAS = []
+if os.environ.get('YANEWS_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YANEWS_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['yanews.routers.ReplicaRouter']
+REPLICA_PIN_COOKIE = 'primary_db'
+REPLICA_PIN_SECONDS = 5
+
+# Профиль SQLite для рабочей нагрузки: YANEWS_DB_PROFILE=production.
+# WAL — читатели не ждут пишущих; synchronous=NORMAL в WAL не портит
+# базу, лишь теряет последние транзакции при сбое питания; mmap_size —
+# чтение файла через отображение в память; busy_timeout — пишущий ждёт
+# блокировку до 5 секунд вместо ошибки «database is locked».
+# Соединения живут между запросами (CONN_MAX_AGE), чтобы не открывать
+# базу и не выполнять PRAGMA на каждый запрос.
+SQLITE_PRAGMAS = {}
+if os.environ.get('YANEWS_DB_PROFILE') == 'production':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,
+    }
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 600
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Сессии вошедших пользователей:
+# 'db' — сессия и пользователь читаются из БД на каждый запрос;
+# 'cache' — сессия читается из кеша, а пишется и в кеш, и в БД;
+# 'signed_cookies' — сессия хранится у клиента в подписанной cookie.
+# В режимах 'cache' и 'signed_cookies' пользователь сессии берётся из
+# кеша процесса (до AUTH_USER_CACHE_TTL секунд). Режим задаёт переменная
+# окружения YANEWS_SESSION_MODE; смена режима завершает открытые сессии.
+SESSION_MODE = os.environ.get('YANEWS_SESSION_MODE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+if SESSION_MODE != 'db':
+    AUTHENTICATION_BACKENDS = ['yanews.auth.CachedModelBackend']
+AUTH_USER_CACHE_TTL = 30
+AUTH_USER_CACHE_SIZE = 1024
+
+# Сколько секунд хранить отрисованные комментарии новости.
+NEWS_COMMENTS_CACHE_TIMEOUT = 60 * 60
+# Комментариев на странице новости; следующие подгружаются по курсору.
+NEWS_COMMENTS_ON_PAGE = 50
+# Сколько секунд хранить страницы, отрисованные для анонимных читателей.
+NEWS_PAGE_CACHE_TIMEOUT = 60 * 60
+# Сколько секунд хранить версии областей кеша. Истёкшая версия
+# заводится заново с текущим временем, и прежние записи просто
+# перестают находиться; так запросы к несуществующим новостям не
+# копят вечных ключей.
+NEWS_VERSION_CACHE_TIMEOUT = 24 * 60 * 60
+
 
 AUTH_PASSWORD_VALIDATORS = []
 
@@ -80,3 +152,53 @@ LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('news:home')
 
 NEWS_COUNT_ON_HOME_PAGE = 10
+
+# Слова, запрещённые в комментариях, в дополнение к news.forms.BAD_WORDS,
+# и файл с такими словами, по одному на строку.
+BAD_WORDS = ()
+BAD_WORDS_FILE = None
+# Искать запрещённые слова только целиком, а не как часть других слов.
+BAD_WORDS_WHOLE_WORDS = False
+
+# Отложенная модерация: новые комментарии ждут проверки вне запроса.
+NEWS_COMMENT_MODERATION = False
+# 'thread' — очередь в памяти процесса, 'db' — команда moderate_comments.
+NEWS_MODERATION_QUEUE = 'thread'
+NEWS_MODERATION_WORKERS = 1
+NEWS_MODERATION_BATCH_SIZE = 100
+NEWS_MODERATION_CHECKS = (
+    'news.moderation.check_links',
+)
+NEWS_MODERATION_MAX_LINKS = 2
+
+# Хранение поискового индекса: 'fts5', 'entries' или 'auto' — FTS5,
+# если таблица для него создана миграцией.
+NEWS_SEARCH_BACKEND = 'auto'
+NEWS_SEARCH_RESULTS = 20
+
+# Размер страницы списка новостей в JSON API и число комментариев,
+# читаемых из БД и отправляемых в потоковый ответ за раз.
+NEWS_API_PAGE_SIZE = 50
+NEWS_API_STREAM_CHUNK = 500
+
+# Асинхронные страницы чтения для запуска под ASGI: запросы к БД и
+# отрисовка выполняются в пуле потоков, а не в общем потоке синхронных
+# представлений.
+NEWS_ASYNC_VIEWS = False
+
+# Заголовок Server-Timing со временем запроса, SQL и шаблонов и доля
+# запросов (от 0 до 1), замеры которых пишутся в журнал
+# yanews.profiling строкой JSON.
+PROFILING_SERVER_TIMING = DEBUG
+PROFILING_LOG_SAMPLE_RATE = 0.0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yanews.profiling': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
@@ -0,0 +1,48 @@
+"""Асинхронные страницы чтения для запуска под ASGI.
+
+Под ASGI Django 3.2 выполняет синхронные представления в одном общем
+потоке (thread_sensitive), и запросы к ним идут строго по очереди.
+Здесь синхронное представление целиком — запросы к БД и отрисовка
+шаблона — уходит в пул потоков с thread_sensitive=False: event loop
+не ждёт БД и держит медленных клиентов без потока на соединение, а
+сами представления выполняются параллельно. Соединение с БД живёт в
+потоке пула, поэтому после вызова закрывается по правилам
+CONN_MAX_AGE, как в конце обычного запроса.
+
+Асинхронные классы-представления появились только в Django 4.1,
+поэтому классы оборачиваются в функции. Включаются настройкой
+NOTES_ASYNC_VIEWS.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+from . import views
+
+
+def offload(view_class):
+    """Асинхронное представление, выполняющее view_class в пуле."""
+    view = view_class.as_view()
+
+    def run(request, *args, **kwargs):
+        try:
+            response = view(request, *args, **kwargs)
+            # Шаблон отрисовывается здесь же: ленивые QuerySet в нём
+            # обращаются к БД и не должны попасть в event loop.
+            if hasattr(response, 'render'):
+                response = response.render()
+            return response
+        finally:
+            close_old_connections()
+
+    async def async_view(request, *args, **kwargs):
+        return await sync_to_async(run, thread_sensitive=False)(
+            request, *args, **kwargs
+        )
+
+    async_view.view_class = view_class
+    async_view.__doc__ = view_class.__doc__
+    return async_view
+
+
+notes_list = offload(views.NotesList)
+note_detail = offload(views.NoteDetail)
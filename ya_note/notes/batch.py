@@ -0,0 +1,211 @@
+"""Пакетное создание, изменение и удаление заметок одним запросом.
+
+Операции проверяются формой NoteForm без обращений к БД, заметки
+пользователя загружаются одним запросом, а занятость всех slug пакета
+проверяется одним запросом с IN. Прошедшие проверку операции
+применяются в одной транзакции через bulk_create и bulk_update;
+результат сообщается для каждой операции отдельно.
+"""
+from collections import Counter
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import search
+from .forms import WARNING, NoteForm
+from .models import Note, next_revision
+from .slugs import candidates, make_slug
+
+CREATE = 'create'
+UPDATE = 'update'
+DELETE = 'delete'
+OPERATIONS = (CREATE, UPDATE, DELETE)
+
+# Сколько вариантов с суффиксами проверяется для каждого slug,
+# построенного из заголовка, сверх числа заметок с таким же заголовком.
+SLUG_CANDIDATES = 10
+
+NOT_FOUND = 'Заметка не найдена.'
+DUPLICATE = 'Заметка уже изменяется другой операцией пакета.'
+UNKNOWN_OPERATION = 'Неизвестная операция.'
+INVALID_ID = 'Id заметки должен быть целым числом.'
+
+
+def is_id(value):
+    """Целое число, но не True или False: bool — подкласс int."""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class Item:
+    """Операция пакета вместе с заметкой и результатом проверки."""
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.op = operation.get('op')
+        self.note = None
+        self.form = None
+        self.errors = {}
+
+    def fail(self, field, message):
+        self.errors.setdefault(field, []).append(message)
+
+    def result(self):
+        if self.errors:
+            return {'op': self.op, 'status': 'error', 'errors': self.errors}
+        result = {'op': self.op, 'status': 'ok', 'id': self.note.pk}
+        if self.op != DELETE:
+            result['slug'] = self.note.slug
+        return result
+
+
+def parse(operations, queryset, author):
+    """Проверяет операции; изменять можно только заметки из queryset.
+
+    Все затронутые заметки загружаются одним запросом.
+    """
+    items = [Item(operation) for operation in operations]
+    ids = {
+        item.operation.get('id') for item in items
+        if item.op in (UPDATE, DELETE) and is_id(item.operation.get('id'))
+    }
+    notes = queryset.in_bulk(ids)
+    seen = set()
+    for item in items:
+        if item.op not in OPERATIONS:
+            item.fail('op', UNKNOWN_OPERATION)
+            continue
+        if item.op == CREATE:
+            item.note = Note(author=author)
+        else:
+            if not is_id(item.operation.get('id')):
+                item.fail('id', INVALID_ID)
+                continue
+            item.note = notes.get(item.operation['id'])
+            if item.note is None:
+                item.fail('id', NOT_FOUND)
+                continue
+            if item.note.pk in seen:
+                item.fail('id', DUPLICATE)
+                continue
+            seen.add(item.note.pk)
+        if item.op == DELETE:
+            continue
+        data = {
+            'title': item.note.title, 'text': item.note.text,
+            'slug': item.note.slug,
+        } if item.op == UPDATE else {}
+        data.update({
+            field: item.operation[field]
+            for field in NoteForm.Meta.fields if field in item.operation
+        })
+        item.form = NoteForm(data=data, instance=item.note)
+        if not item.form.is_valid():
+            item.errors = {
+                field: list(messages)
+                for field, messages in item.form.errors.items()
+            }
+    return items
+
+
+def assign_slugs(items):
+    """Проверяет и подбирает slug всего пакета одним запросом.
+
+    Slug удаляемых в пакете заметок считаются свободными. Если среди
+    проверенных вариантов свободного не нашлось, slug остаётся пустым
+    и подбирается при обычном сохранении заметки.
+    """
+    writes = [item for item in items if item.form and not item.errors]
+    deleted = {
+        item.note.pk for item in items
+        if item.op == DELETE and not item.errors
+    }
+    max_length = Note._meta.get_field('slug').max_length
+    explicit = [item for item in writes if item.note.slug]
+    generated = [item for item in writes if not item.note.slug]
+    bases = Counter(
+        make_slug(item.note.title, max_length) for item in generated
+    )
+    options = {
+        base: list(islice(
+            candidates(base, max_length), number + SLUG_CANDIDATES
+        ))
+        for base, number in bases.items()
+    }
+    wanted = {item.note.slug for item in explicit}
+    for base_options in options.values():
+        wanted.update(base_options)
+    owners = dict(
+        Note.objects.filter(slug__in=wanted).values_list('slug', 'pk')
+    )
+    used = {}
+    for item in explicit:
+        slug = item.note.slug
+        owner = used.get(slug, owners.get(slug))
+        if owner is not None and owner not in (item.note.pk, *deleted):
+            item.fail('slug', slug + WARNING)
+            continue
+        used[slug] = item.note.pk or item
+    for item in generated:
+        base = make_slug(item.note.title, max_length)
+        for slug in options[base]:
+            owner = used.get(slug, owners.get(slug))
+            if owner is None or owner in (item.note.pk, *deleted):
+                item.note.slug = slug
+                used[slug] = item.note.pk or item
+                break
+
+
+def apply(items):
+    """Применяет проверенные операции в одной транзакции.
+
+    bulk_create и bulk_update не отправляют сигналы и не вызывают
+    Note.save, поэтому номера изменений и поисковый индекс
+    обновляются здесь.
+    """
+    valid = [item for item in items if not item.errors]
+    deleted = [item.note.pk for item in valid if item.op == DELETE]
+    created = [
+        item.note for item in valid if item.op == CREATE and item.note.slug
+    ]
+    updated = [
+        item.note for item in valid if item.op == UPDATE and item.note.slug
+    ]
+    # Заметки, для которых не нашлось свободного slug среди вариантов.
+    fallback = [
+        item.note for item in valid
+        if item.op in (CREATE, UPDATE) and not item.note.slug
+    ]
+    with transaction.atomic():
+        if deleted:
+            Note.objects.filter(pk__in=deleted).delete()
+        # Номера вычисляют сами bulk_update и bulk_create, каждый от
+        # последнего номера автора на момент своего запроса.
+        now = timezone.now()
+        for group in (updated, created):
+            for offset, note in enumerate(group):
+                note.revision = next_revision(note.author_id, offset)
+                note.updated = now
+        Note.objects.bulk_update(
+            updated, ('title', 'text', 'slug', 'updated', 'revision')
+        )
+        Note.objects.bulk_create(created)
+        if created and created[0].pk is None:
+            ids = dict(Note.objects.filter(
+                slug__in=[note.slug for note in created]
+            ).values_list('slug', 'pk'))
+            for note in created:
+                note.pk = ids[note.slug]
+        for note in fallback:
+            note.save()
+        search.index_notes(created + updated)
+    for note in created + updated:
+        # Номер — выражение; настоящий загрузится при обращении.
+        del note.revision
+
+
+def run(operations, queryset, author):
+    items = parse(operations, queryset, author)
+    assign_slugs(items)
+    apply(items)
+    return [item.result() for item in items]
@@ -0,0 +1,39 @@
+"""ETag страниц заметок для условных GET-запросов.
+
+Версия заметок пользователя — число его заметок и наибольший номер
+изменения: любое создание или изменение увеличивает номер, а удаление
+уменьшает число. Оба значения берутся одним агрегирующим запросом по
+индексу (author, revision), поэтому совпавший If-None-Match получает
+304 без выборки заметок и отрисовки шаблона.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+
+from .models import Note
+
+
+def make_etag(request, *parts):
+    """Версия страницы для пользователя и полного адреса запроса."""
+    user = request.user
+    key = '|'.join(
+        map(str, (user.pk, user.username, request.get_full_path(), *parts))
+    )
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def notes_list_etag(request, *args, **kwargs):
+    version = Note.objects.filter(author=request.user).aggregate(
+        count=Count('pk'), revision=Max('revision')
+    )
+    return make_etag(request, version['count'], version['revision'])
+
+
+def note_detail_etag(request, *args, **kwargs):
+    """У отсутствующей заметки нет ETag: ответ даст само представление."""
+    revision = Note.objects.filter(
+        author=request.user, slug=kwargs['slug']
+    ).values_list('revision', flat=True).first()
+    if revision is None:
+        return None
+    return make_etag(request, revision)
@@ -0,0 +1,88 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Max
+from django.core.management.base import BaseCommand, CommandError
+from django.test.client import RequestFactory
+
+from notes import sync
+from notes.models import Note
+from notes.pagination import NEXT, PREVIOUS
+from notes.views import NoteDetail, NotesList, NoteSync
+
+# Полный просмотр таблицы, любой последовательный просмотр и сортировка
+# во временной структуре для SQLite и PostgreSQL. Сортировка допустима
+# только поверх поиска по индексу, когда строк заведомо немного.
+FULL_SCAN = re.compile(r'\bSCAN (?!.*\bUSING\b)(?!CONSTANT)|\bSeq Scan\b')
+ANY_SCAN = re.compile(r'\bSCAN \w|\bSeq Scan\b')
+SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY|\bSort\b')
+
+
+def is_unindexed(plan):
+    """План читает таблицу целиком или сортирует весь просмотр."""
+    return bool(
+        FULL_SCAN.search(plan)
+        or SORT.search(plan) and ANY_SCAN.search(plan)
+    )
+
+
+def _setup_view(view_class, user, **kwargs):
+    request = RequestFactory().get('/')
+    request.user = user
+    view = view_class()
+    view.setup(request, **kwargs)
+    return view
+
+
+def view_querysets():
+    """Запросы, которые выполняют представления приложения notes."""
+    user = get_user_model()(pk=1)
+    notes_list = _setup_view(NotesList, user)
+    queryset = notes_list.get_queryset()
+    paginator, page, object_list, _ = notes_list.paginate_queryset(
+        queryset, notes_list.get_paginate_by(queryset)
+    )
+    boundary = Note(pk=1)
+    note_detail = _setup_view(NoteDetail, user, slug='slug')
+    note_sync = _setup_view(NoteSync, user)
+    return (
+        ('notes:list', object_list),
+        ('notes:list next', paginator.page(
+            paginator.encode(NEXT, boundary)
+        ).object_list),
+        ('notes:list previous', paginator.page(
+            paginator.encode(PREVIOUS, boundary)
+        ).object_list),
+        ('notes:detail/edit/delete', note_detail.get_queryset().filter(
+            slug=note_detail.kwargs['slug']
+        )),
+        ('notes:list etag', Note.objects.filter(author=user).values(
+            'author'
+        ).annotate(count=Count('pk'), revision=Max('revision'))),
+        ('notes:sync notes', sync.changed_notes(
+            note_sync.get_queryset(), 1
+        )[:1]),
+        ('notes:sync deleted', sync.tombstones(user, 1)[:1]),
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет EXPLAIN для запросов представлений и завершается '
+        'ошибкой, если какой-то из них читает таблицу целиком и '
+        'сортирует результат без индекса.'
+    )
+
+    def handle(self, *args, **options):
+        failures = []
+        for label, queryset in view_querysets():
+            plan = queryset.explain()
+            bad = is_unindexed(plan)
+            self.stdout.write(f'{label}: {"FAIL" if bad else "OK"}')
+            self.stdout.write(plan)
+            if bad:
+                failures.append(label)
+        if failures:
+            raise CommandError(
+                'Запросы без подходящего индекса: ' + ', '.join(failures)
+            )
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from notes import sync
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые следы удалённых заметок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.NOTES_SYNC_TOMBSTONE_DAYS,
+            help='Сколько дней хранить следы.'
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        deleted = sync.prune_tombstones(before)
+        self.stderr.write(f'Удалено следов: {deleted}.')
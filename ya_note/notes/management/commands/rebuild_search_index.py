@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from notes import search
+
+
+class Command(BaseCommand):
+    help = 'Заново строит поисковый индекс заметок.'
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stderr.write(f'Индекс перестроен ({search.backend()}).')
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.15 on 2026-10-18 02:25
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+FTS_TABLE = 'notes_search_fts'
+
+
+def create_fts_table(apps, schema_editor):
+    """Таблица FTS5 создаётся, только если SQLite собран с FTS5.
+
+    Автор хранится индексируемым токеном, чтобы отбирать свои заметки
+    в том же MATCH.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        options = {row[0] for row in cursor.fetchall()}
+        if 'ENABLE_FTS5' not in options:
+            return
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} '
+            'USING fts5(title, body, owner)'
+        )
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) "
+            "VALUES ('rank', 'bm25(2.0, 1.0, 0.0)')"
+        )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notes', '0002_note_author_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('weight', models.FloatField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('note', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='notes.note')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchentry',
+            index=models.Index(fields=['author', 'term', 'note'], name='search_author_term_idx'),
+        ),
+        migrations.RunPython(create_fts_table, drop_fts_table),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 3.2.15 on 2026-10-18 02:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def number_existing_notes(apps, schema_editor):
+    """Существующие заметки нумеруются по id, счётчик — следом."""
+    Note = apps.get_model('notes', 'Note')
+    Revision = apps.get_model('notes', 'Revision')
+    Note.objects.update(revision=models.F('id'))
+    last = Note.objects.aggregate(last=models.Max('id'))['last'] or 0
+    Revision.objects.create(pk=1, value=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0003_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Revision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('note_id', models.BigIntegerField()),
+                ('author_id', models.BigIntegerField()),
+                ('revision', models.BigIntegerField()),
+                ('deleted', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='revision',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='note',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='note',
+            index=models.Index(fields=['author', 'revision'], name='note_author_rev_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['author_id', 'revision'], name='tombstone_author_rev_idx'),
+        ),
+        migrations.RunPython(
+            number_existing_notes, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 3.2.15 on 2026-10-18 12:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0004_sync'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='Revision',
+        ),
+    ]
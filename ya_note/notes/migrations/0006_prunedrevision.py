@@ -0,0 +1,21 @@
+# Generated by Django 3.2.15 on 2026-10-18 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notes', '0005_revision_per_author'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrunedRevision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author_id', models.BigIntegerField(unique=True)),
+                ('revision', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -1,7 +1,10 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
 
-from pytils.translit import slugify
+from .slugs import make_slug, save_with_unique_slug
 
 
 class Note(models.Model):
@@ -27,12 +30,120 @@ class Note(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(default=timezone.now, editable=False)
+    updated = models.DateTimeField(auto_now=True)
+    revision = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('author', 'id'), name='note_author_id_idx'),
+            models.Index(
+                fields=('author', 'revision'), name='note_author_rev_idx'
+            ),
+        )
 
     def __str__(self):
         return self.title
 
     def save(self, *args, **kwargs):
-        if not self.slug:
+        """Пустой slug строится из заголовка и при занятости получает
+        суффикс; явно заданный slug сохраняется как есть. Каждое
+        сохранение получает новый номер изменения.
+
+        Номер вычисляет сам INSERT или UPDATE, поэтому после сохранения
+        revision загружается из БД при первом обращении.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated', 'revision'}
+
+        def save():
+            super(Note, self).save(*args, **kwargs)
+
+        self.revision = next_revision(self.author_id)
+        try:
+            if self.slug:
+                save()
+                return
             max_slug_length = self._meta.get_field('slug').max_length
-            self.slug = slugify(self.title)[:max_slug_length]
-        super().save(*args, **kwargs)
+            save_with_unique_slug(
+                self, save, make_slug(self.title, max_slug_length)
+            )
+        finally:
+            del self.revision
+
+
+class Tombstone(models.Model):
+    """След удалённой заметки для синхронизации клиентов.
+
+    Ссылки хранятся числами: след переживает и заметку, и её автора,
+    удаление которого каскадом создаёт следы его заметок.
+    """
+    note_id = models.BigIntegerField()
+    author_id = models.BigIntegerField()
+    revision = models.BigIntegerField()
+    deleted = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author_id', 'revision'),
+                name='tombstone_author_rev_idx'
+            ),
+        )
+
+
+class PrunedRevision(models.Model):
+    """Наибольший номер удалённых prune_tombstones следов автора.
+
+    Клиент с номером меньше этого мог пропустить удаления, которых уже
+    не найти, и должен синхронизироваться заново.
+    """
+    author_id = models.BigIntegerField(unique=True)
+    revision = models.BigIntegerField()
+
+
+def next_revision(author_id, offset=0):
+    """Выражение номера следующего изменения заметок автора.
+
+    Номера идут по автору: следующий больше последнего номера его
+    заметок и следов, так что запись одного автора не ждёт записей
+    остальных. Выражение вычисляется внутри того же INSERT или UPDATE;
+    SQLite выполняет записи по одной, поэтому изменения автора
+    фиксируются в порядке номеров. offset нумерует строки одного
+    массового запроса.
+    """
+    latest = [
+        Coalesce(Subquery(
+            model.objects.filter(author_id=author_id)
+            .order_by('-revision').values('revision')[:1]
+        ), Value(0))
+        for model in (Note, Tombstone)
+    ]
+    return Greatest(*latest, output_field=models.BigIntegerField()) + (
+        offset + 1
+    )
+
+
+class SearchEntry(models.Model):
+    """Запись обратного индекса поиска на случай, когда FTS5 недоступен.
+
+    weight — число вхождений основы в заметку с учётом веса заголовка;
+    автор хранится рядом, чтобы искать только среди своих заметок.
+    """
+    term = models.CharField(max_length=100)
+    note = models.ForeignKey(
+        Note, on_delete=models.CASCADE, related_name='+'
+    )
+    author = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+'
+    )
+    weight = models.FloatField()
+
+    class Meta:
+        indexes = (
+            models.Index(
+                fields=('author', 'term', 'note'),
+                name='search_author_term_idx'
+            ),
+        )
@@ -0,0 +1,217 @@
+"""Keyset-пагинация: страницы по курсору вместо OFFSET."""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.http import Http404
+from django.utils.functional import cached_property
+
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    """Курсор не удалось разобрать."""
+
+
+class KeysetPage:
+    """Страница выборки, ограниченная курсором.
+
+    object_list остаётся QuerySet в прямом порядке сортировки, поэтому
+    шаблоны и тесты работают с ним так же, как со срезом. Строки же
+    читаются одним запросом из window — на строку больше страницы в
+    направлении курсора: лишняя строка показывает, есть ли страница
+    дальше, без отдельного exists().
+    """
+
+    def __init__(self, paginator, object_list, cursor, window,
+                 direction=NEXT):
+        self.paginator = paginator
+        self.object_list = object_list
+        self.cursor = cursor
+        self.window = window
+        self.direction = direction
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    @cached_property
+    def _fetched(self):
+        rows = list(self.window)
+        more = len(rows) > self.paginator.per_page
+        rows = rows[:self.paginator.per_page]
+        if self.direction == PREVIOUS:
+            rows.reverse()
+        # object_list отдаёт уже прочитанные строки, не повторяя запрос.
+        self.object_list._result_cache = rows
+        return rows, more
+
+    @property
+    def _rows(self):
+        return self._fetched[0]
+
+    @cached_property
+    def has_next(self):
+        if not self._rows:
+            return False
+        if self.direction == NEXT:
+            return self._fetched[1]
+        return self.paginator.exists_after(self._rows[-1])
+
+    @cached_property
+    def has_previous(self):
+        if self.cursor is None or not self._rows:
+            return False
+        if self.direction == PREVIOUS:
+            return self._fetched[1]
+        return self.paginator.exists_before(self._rows[0])
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        if not self.has_next:
+            return None
+        return self.paginator.encode(NEXT, self._rows[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self.has_previous:
+            return None
+        return self.paginator.encode(PREVIOUS, self._rows[0])
+
+
+class KeysetPaginator:
+    """Пагинатор по набору ключей сортировки, например ('-date', '-id').
+
+    Последний ключ должен быть уникальным, чтобы порядок был строгим.
+    Стоимость любой страницы одинакова: фильтр по ключам плюс LIMIT.
+    """
+
+    def __init__(self, queryset, keys, per_page):
+        self.keys = tuple(keys)
+        self.queryset = queryset.order_by(*self.keys)
+        self.per_page = per_page
+        self.fields = [key.lstrip('-') for key in self.keys]
+
+    def _values(self, obj):
+        """Ключи объекта модели или строки из .values()."""
+        if isinstance(obj, dict):
+            return [obj[field] for field in self.fields]
+        return [getattr(obj, field) for field in self.fields]
+
+    def _filter(self, values, forward):
+        """Строки строго после (forward) или до ключей values.
+
+        Нестрогое условие на первый ключ дублирует дизъюнкцию, чтобы
+        база могла начать чтение индекса сразу с нужной позиции.
+        """
+        first_lookup = (
+            'lte' if self.keys[0].startswith('-') == forward else 'gte'
+        )
+        bound = Q(**{f'{self.fields[0]}__{first_lookup}': values[0]})
+        condition = Q()
+        for position, key in enumerate(self.keys):
+            field = self.fields[position]
+            descending = key.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            step = Q(**{f'{field}__{lookup}': values[position]})
+            for prev_field, value in zip(
+                    self.fields[:position], values[:position]
+            ):
+                step &= Q(**{prev_field: value})
+            condition |= step
+        return bound & condition
+
+    def exists_after(self, obj):
+        return self.queryset.filter(
+            self._filter(self._values(obj), forward=True)
+        ).exists()
+
+    def exists_before(self, obj):
+        return self.queryset.filter(
+            self._filter(self._values(obj), forward=False)
+        ).exists()
+
+    def encode(self, direction, obj):
+        values = [
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in self._values(obj)
+        ]
+        raw = json.dumps([direction, values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode(self, cursor):
+        padded = cursor + '=' * (-len(cursor) % 4)
+        try:
+            direction, raw_values = json.loads(
+                base64.urlsafe_b64decode(padded.encode())
+            )
+            if direction not in (NEXT, PREVIOUS):
+                raise ValueError(direction)
+            if len(raw_values) != len(self.fields):
+                raise ValueError(raw_values)
+            values = [
+                self.queryset.model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, raw_values)
+            ]
+        except (
+                binascii.Error, TypeError, ValueError, ValidationError
+        ) as error:
+            raise InvalidCursor(cursor) from error
+        return direction, values
+
+    def page(self, cursor=None):
+        if not cursor:
+            return KeysetPage(
+                self, self.queryset[:self.per_page], None,
+                self.queryset[:self.per_page + 1]
+            )
+        direction, values = self.decode(cursor)
+        if direction == NEXT:
+            following = self.queryset.filter(
+                self._filter(values, forward=True)
+            )
+            return KeysetPage(
+                self, following[:self.per_page], cursor,
+                following[:self.per_page + 1]
+            )
+        # Берём ближайшие строки в обратном порядке и возвращаем их
+        # в прямом порядке сортировки через подзапрос по ключу.
+        reversed_keys = [
+            key[1:] if key.startswith('-') else f'-{key}'
+            for key in self.keys
+        ]
+        preceding = self.queryset.filter(
+            self._filter(values, forward=False)
+        ).order_by(*reversed_keys)
+        object_list = self.queryset.filter(
+            pk__in=preceding.values('pk')[:self.per_page]
+        )
+        return KeysetPage(
+            self, object_list, cursor, preceding[:self.per_page + 1],
+            PREVIOUS
+        )
+
+
+class KeysetPaginationMixin:
+    """Подключает KeysetPaginator к ListView.
+
+    Курсор передаётся в GET-параметре cursor_kwarg.
+    """
+    paginate_keys = ('-id',)
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.paginate_keys, page_size)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Неверный курсор страницы.')
+        return paginator, page, page.object_list, page.has_other_pages()
@@ -0,0 +1,180 @@
+"""Полнотекстовый поиск по заметкам автора.
+
+Текст разбивается на слова и приводится к основам стеммером Snowball,
+поэтому разные формы слова находятся одним запросом. Индекс хранится
+в виртуальной таблице SQLite FTS5 с ранжированием BM25, а если FTS5
+недоступен — в таблице SearchEntry с ранжированием TF-IDF. Индекс
+обновляется из сигналов модели, а пакетные операции индексируют
+заметки пачкой.
+"""
+import math
+import re
+from functools import lru_cache
+
+import snowballstemmer
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Sum, When
+
+from .models import Note, SearchEntry
+
+FTS_TABLE = 'notes_search_fts'
+FTS5 = 'fts5'
+ENTRIES = 'entries'
+TITLE_WEIGHT = 2.0
+WORD = re.compile(r'\w+')
+MAX_TERM_LENGTH = SearchEntry._meta.get_field('term').max_length
+
+_stemmer = snowballstemmer.stemmer('russian')
+
+
+def stems(text):
+    """Основы слов текста в нижнем регистре."""
+    words = WORD.findall(text.lower().replace('ё', 'е'))
+    return [stem[:MAX_TERM_LENGTH] for stem in _stemmer.stemWords(words)]
+
+
+def owner_token(author_id):
+    return f'u{author_id}'
+
+
+@lru_cache(maxsize=None)
+def fts5_table_exists(database_name):
+    """Создана ли таблица FTS5 миграцией; проверяется раз на базу."""
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def backend():
+    """Выбранный в NOTES_SEARCH_BACKEND способ хранения индекса."""
+    choice = settings.NOTES_SEARCH_BACKEND
+    if choice == 'auto':
+        database_name = connection.settings_dict['NAME']
+        return FTS5 if fts5_table_exists(database_name) else ENTRIES
+    return choice
+
+
+def _weights(note):
+    weights = {}
+    for stem in stems(note.text):
+        weights[stem] = weights.get(stem, 0) + 1
+    for stem in stems(note.title):
+        weights[stem] = weights.get(stem, 0) + TITLE_WEIGHT
+    return weights
+
+
+def index_notes(notes, created=False):
+    """Индексирует заметки пачкой: число запросов не зависит от их
+    количества. У новых заметок (created) старых записей нет, и их
+    удаление пропускается.
+    """
+    notes = list(notes)
+    if not notes:
+        return
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            if not created:
+                cursor.executemany(
+                    f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                    [[note.pk] for note in notes]
+                )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, body, owner) '
+                'VALUES (%s, %s, %s, %s)',
+                [
+                    [
+                        note.pk, ' '.join(stems(note.title)),
+                        ' '.join(stems(note.text)),
+                        owner_token(note.author_id)
+                    ]
+                    for note in notes
+                ]
+            )
+        return
+    if not created:
+        SearchEntry.objects.filter(
+            note_id__in=[note.pk for note in notes]
+        ).delete()
+    SearchEntry.objects.bulk_create(
+        SearchEntry(
+            note_id=note.pk, author_id=note.author_id,
+            term=term, weight=weight
+        )
+        for note in notes
+        for term, weight in _weights(note).items()
+    )
+
+
+def index_note(note, created=False):
+    index_notes([note], created)
+
+
+def remove_note(note_id):
+    """Записи SearchEntry удаляются каскадом вместе с заметкой."""
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [note_id]
+            )
+
+
+def _search_fts5(author_id, terms, limit):
+    match = 'owner: %s AND {title body}: (%s)' % (
+        owner_token(author_id), ' AND '.join(f'"{term}"' for term in terms)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            'ORDER BY rank LIMIT %s',
+            [match, limit]
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _search_entries(author_id, terms, limit):
+    entries = SearchEntry.objects.filter(author_id=author_id, term__in=terms)
+    frequencies = dict(
+        entries.order_by().values('term').annotate(
+            notes=Count('note')
+        ).values_list('term', 'notes')
+    )
+    if len(frequencies) < len(terms):
+        return []
+    total = Note.objects.filter(author_id=author_id).count()
+    score = Sum(Case(
+        *(
+            When(term=term, then=F('weight') * math.log(1 + total / count))
+            for term, count in frequencies.items()
+        ),
+        output_field=FloatField(),
+    ))
+    return list(
+        entries.order_by().values('note').annotate(
+            matched=Count('term'), score=score
+        ).filter(matched=len(terms)).order_by(
+            '-score', 'note'
+        ).values_list('note', flat=True)[:limit]
+    )
+
+
+def search_notes(author, query, limit):
+    """Заметки автора со всеми словами запроса, лучшие первыми."""
+    terms = sorted(set(stems(query)))
+    if not terms:
+        return []
+    if backend() == FTS5:
+        ids = _search_fts5(author.pk, terms, limit)
+    else:
+        ids = _search_entries(author.pk, terms, limit)
+    found = Note.objects.filter(author=author).in_bulk(ids)
+    return [found[note_id] for note_id in ids if note_id in found]
+
+
+def rebuild():
+    """Полностью перестраивает индекс текущего способа хранения."""
+    if backend() == FTS5:
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchEntry.objects.all().delete()
+    for note in Note.objects.iterator():
+        index_note(note)
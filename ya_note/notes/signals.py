@@ -0,0 +1,28 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import search
+from .models import Note, Tombstone, next_revision
+
+
+@receiver(post_save, sender=Note)
+def index_note(sender, instance, created, **kwargs):
+    search.index_note(instance, created)
+
+
+@receiver(post_delete, sender=Note)
+def unindex_note(sender, instance, **kwargs):
+    search.remove_note(instance.pk)
+
+
+@receiver(pre_delete, sender=Note)
+def leave_tombstone(sender, instance, **kwargs):
+    """Удаление выполняется в транзакции, и след попадает в неё же.
+
+    След пишется до удаления строки: его номер больше номера самой
+    удаляемой заметки, и клиент, получивший её, получит и след.
+    """
+    Tombstone.objects.create(
+        note_id=instance.pk, author_id=instance.author_id,
+        revision=next_revision(instance.author_id)
+    )
@@ -0,0 +1,62 @@
+"""Выбор уникального slug для заметки без предварительных проверок.
+
+Вместо запроса «а свободен ли slug» заметка сразу сохраняется, а при
+конфликте уникальности сохранение повторяется с суффиксами -2, -3, …
+В обычном случае это один INSERT, и гонки между проверкой и записью нет.
+"""
+from functools import lru_cache
+from itertools import count, islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from pytils.translit import slugify
+
+MAX_ATTEMPTS = 100
+
+
+@lru_cache(maxsize=settings.NOTES_SLUG_CACHE_SIZE)
+def transliterate(title):
+    """Транслитерация slugify с LRU-кешем для повторяющихся заголовков.
+
+    Счётчики попаданий и промахов доступны через
+    transliterate.cache_info().
+    """
+    return slugify(title)
+
+
+def make_slug(title, max_length):
+    return transliterate(title)[:max_length]
+
+
+def candidates(base, max_length):
+    """base, base-2, base-3, … с обрезкой под max_length."""
+    yield base
+    for number in count(2):
+        suffix = f'-{number}'
+        yield base[:max_length - len(suffix)] + suffix
+
+
+def slug_taken(instance, slug):
+    return type(instance).objects.filter(
+        slug=slug
+    ).exclude(pk=instance.pk).exists()
+
+
+def save_with_unique_slug(instance, save, base):
+    """Сохраняет instance функцией save, подбирая свободный slug.
+
+    Каждая попытка идёт в своей точке сохранения, чтобы ошибка не
+    ломала внешнюю транзакцию. Ошибки, не связанные со slug, и
+    исчерпание попыток пробрасываются дальше.
+    """
+    max_length = instance._meta.get_field('slug').max_length
+    for slug in islice(candidates(base, max_length), MAX_ATTEMPTS):
+        instance.slug = slug
+        try:
+            with transaction.atomic():
+                save()
+            return
+        except IntegrityError:
+            if not slug_taken(instance, slug):
+                raise
+    raise IntegrityError(f'Не удалось подобрать свободный slug для {base}')
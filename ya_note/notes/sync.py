@@ -0,0 +1,136 @@
+"""Разностная синхронизация заметок по номеру изменения.
+
+Клиент хранит номер последнего полученного изменения и запрашивает
+только то, что изменилось после него: заметки с большим номером
+и следы удалённых заметок. Обе выборки идут по индексам
+(author, revision), поэтому стоимость зависит от числа изменений,
+а не от числа заметок.
+
+Следы удалённых заметок хранятся NOTES_SYNC_TOMBSTONE_DAYS дней
+(команда prune_tombstones), а наибольший номер удалённых следов
+запоминается для автора. Клиенту, не синхронизировавшемуся дольше,
+changes() отвечает reset: он должен начать заново с пустого номера,
+иначе пропустит удаления.
+"""
+from heapq import merge
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .models import PrunedRevision, Tombstone
+
+NOTE_FIELDS = ('id', 'title', 'text', 'slug', 'created', 'updated')
+
+
+# Сколько следов удалять одним запросом.
+PRUNE_BATCH_SIZE = 500
+
+
+class InvalidToken(Exception):
+    """Номер изменения не удалось разобрать."""
+
+
+class TokenExpired(Exception):
+    """Следы удалений после номера уже удалены; нужна полная синхронизация."""
+
+
+def parse_token(token):
+    if not token:
+        return 0
+    try:
+        value = int(token)
+    except ValueError as error:
+        raise InvalidToken(token) from error
+    if value < 0:
+        raise InvalidToken(token)
+    return value
+
+
+def changed_notes(notes, token):
+    return notes.filter(revision__gt=token).order_by('revision').values(
+        'revision', *NOTE_FIELDS
+    )
+
+
+def tombstones(author, token):
+    """Следы после token; expired — удалены ли уже следы после него.
+
+    prune_tombstones оставляет последний след автора, поэтому после
+    устаревшего token всегда найдётся след, несущий этот признак.
+    """
+    expired = PrunedRevision.objects.filter(
+        author_id=author.pk, revision__gt=token
+    )
+    return Tombstone.objects.filter(
+        author_id=author.pk, revision__gt=token
+    ).annotate(expired=Exists(expired)).order_by('revision').values(
+        'revision', 'note_id', 'expired'
+    )
+
+
+def changes(notes, author, token, limit):
+    """Не больше limit изменений после token по возрастанию номера.
+
+    notes — заметки, доступные пользователю. Возвращает изменённые
+    заметки, id удалённых, новый номер и признак, что изменения ещё
+    остались. Если следы после token уже удалены, бросает TokenExpired;
+    пустой номер (0) годен всегда — такому клиенту нечего удалять.
+    """
+    deleted = list(tombstones(author, token)[:limit + 1])
+    if token and deleted and deleted[0]['expired']:
+        raise TokenExpired(token)
+    changed = changed_notes(notes, token)[:limit + 1]
+    rows = list(islice(
+        merge(changed, deleted, key=lambda row: row['revision']), limit + 1
+    ))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        'notes': [
+            {field: row[field] for field in NOTE_FIELDS}
+            for row in rows if 'id' in row
+        ],
+        'deleted': [row['note_id'] for row in rows if 'note_id' in row],
+        'token': rows[-1]['revision'] if rows else token,
+        'more': more,
+    }
+
+
+def prune_tombstones(before):
+    """Удаляет следы, оставленные до before; возвращает их число.
+
+    Последний след автора остаётся: от него отсчитывается номер
+    следующего изменения, если удалённая заметка была последней.
+    """
+    newer = Tombstone.objects.filter(
+        author_id=OuterRef('author_id'), revision__gt=OuterRef('revision')
+    )
+    stale = list(Tombstone.objects.filter(
+        Exists(newer), deleted__lt=before
+    ).values_list('pk', 'author_id', 'revision'))
+    horizons = {}
+    for _, author_id, revision in stale:
+        horizons[author_id] = max(revision, horizons.get(author_id, 0))
+    with transaction.atomic():
+        # Граница сдвигается до удаления следов: клиент не получит
+        # дельту, из которой удаления уже пропали.
+        known = PrunedRevision.objects.in_bulk(
+            list(horizons), field_name='author_id'
+        )
+        for pruned in known.values():
+            pruned.revision = max(
+                pruned.revision, horizons[pruned.author_id]
+            )
+        PrunedRevision.objects.bulk_update(known.values(), ('revision',))
+        PrunedRevision.objects.bulk_create(
+            PrunedRevision(author_id=author_id, revision=revision)
+            for author_id, revision in horizons.items()
+            if author_id not in known
+        )
+        ids = [pk for pk, _, _ in stale]
+        for start in range(0, len(ids), PRUNE_BATCH_SIZE):
+            Tombstone.objects.filter(
+                pk__in=ids[start:start + PRUNE_BATCH_SIZE]
+            ).delete()
+    return len(stale)
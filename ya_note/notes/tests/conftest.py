@@ -0,0 +1,38 @@
+import pytest
+
+from notes.tests.budgets import MIDDLEWARE, Budget
+
+# Число запросов — с учётом сессии и пользователя, время — суммарное
+# время SQL с запасом на медленные машины.
+QUERY_BUDGETS = {
+    'notes:list': Budget(queries=6, time_ms=50),
+    'notes:detail': Budget(queries=4, time_ms=50),
+    'notes:add': Budget(queries=11, time_ms=50),
+    'notes:edit': Budget(queries=10, time_ms=50),
+    'notes:delete': Budget(queries=9, time_ms=50),
+    'notes:search': Budget(queries=6, time_ms=50),
+    'notes:batch': Budget(queries=19, time_ms=100),
+    'notes:sync': Budget(queries=4, time_ms=50),
+}
+QUERY_BUDGET_DEFAULT = Budget(queries=5, time_ms=50)
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budgets(**budgets): бюджеты SQL маршрутов для одного теста, '
+        'например query_budgets(**{"notes:list": Budget(queries=1)})'
+    )
+
+
+@pytest.fixture(autouse=True)
+def query_budgets(request, settings):
+    """Каждый запрос тестового клиента проверяется по бюджету SQL."""
+    budgets = dict(QUERY_BUDGETS)
+    marker = request.node.get_closest_marker('query_budgets')
+    if marker is not None:
+        budgets.update(marker.kwargs)
+    settings.QUERY_BUDGETS = budgets
+    settings.QUERY_BUDGET_DEFAULT = QUERY_BUDGET_DEFAULT
+    settings.MIDDLEWARE = [MIDDLEWARE, *settings.MIDDLEWARE]
+    return budgets
@@ -1,9 +1,25 @@
-from django.test import TestCase, Client
-from django.urls import reverse
+import asyncio
+import base64
+import importlib
+import io
+import json
+from http import HTTPStatus
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+)
+from django.urls import clear_url_caches, resolve, reverse
 from django.contrib.auth import get_user_model
+from django.test.utils import CaptureQueriesContext
 
+import notes.urls
+import yanote.urls
+from yanote import auth
 from notes.models import Note
 from notes.forms import NoteForm
+from notes.tests.budgets import BudgetExceeded, QueryBudget
 
 User = get_user_model()
 
@@ -48,6 +64,65 @@ class TestHomePage(TestCase):
                 )
 
 
+@override_settings(NOTES_COUNT_ON_PAGE=2)
+class TestNotesPagination(TestCase):
+    LIST_URL = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.notes = [
+            Note.objects.create(
+                title=f'Заметка {index}',
+                text='Текст',
+                author=cls.author,
+                slug=f'note-{index}'
+            )
+            for index in range(5)
+        ]
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.author)
+
+    def test_cursor_walks_all_notes(self):
+        """Курсоры проходят все заметки по id без пропусков и повторов."""
+        seen = []
+        response = self.client_author.get(self.LIST_URL)
+        while True:
+            page = response.context['page_obj']
+            self.assertLessEqual(len(page.object_list), 2)
+            seen.extend(response.context['object_list'])
+            if not page.has_next:
+                break
+            response = self.client_author.get(
+                self.LIST_URL, {'cursor': page.next_cursor}
+            )
+        self.assertEqual(seen, self.notes)
+        previous = self.client_author.get(
+            self.LIST_URL,
+            {'cursor': response.context['page_obj'].previous_cursor}
+        )
+        self.assertEqual(
+            list(previous.context['object_list']), self.notes[2:4]
+        )
+
+    def test_tampered_cursor(self):
+        """Негодный id в курсоре даёт 404, а не ошибку сервера."""
+        cursor = base64.urlsafe_b64encode(b'["n",["x"]]').decode()
+        response = self.client_author.get(self.LIST_URL, {'cursor': cursor})
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_is_paginated_only_with_other_pages(self):
+        """Заметки на одной странице не дают is_paginated."""
+        self.assertIs(
+            self.client_author.get(self.LIST_URL).context['is_paginated'],
+            True
+        )
+        with self.settings(NOTES_COUNT_ON_PAGE=5):
+            response = self.client_author.get(self.LIST_URL)
+        self.assertIs(response.context['is_paginated'], False)
+        self.assertIs(response.context['page_obj'].has_next, False)
+
+
 class TestNotePages(TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -74,3 +149,218 @@ class TestNotePages(TestCase):
                 response = self.client_author.get(url)
                 self.assertIn('form', response.context)
                 self.assertIsInstance(response.context['form'], NoteForm)
+
+
+class TestQueryPlans(TestCase):
+
+    def test_view_queries_use_indexes(self):
+        """Запросы представлений не читают таблицы целиком с сортировкой."""
+        call_command('check_query_plans', stdout=io.StringIO())
+
+
+class TestConditionalGet(TestCase):
+    LIST_URL = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        cls.reader = User.objects.create(username='Читатель')
+        cls.note = Note.objects.create(
+            title='Заметка', text='Текст', author=cls.author, slug='note'
+        )
+        cls.detail_url = reverse('notes:detail', args=(cls.note.slug,))
+        cls.client_author = Client()
+        cls.client_author.force_login(cls.author)
+        cls.client_reader = Client()
+        cls.client_reader.force_login(cls.reader)
+
+    def test_matching_etag_skips_rendering(self):
+        """Совпавший ETag даёт 304 после одного запроса к заметкам."""
+        for url in (self.LIST_URL, self.detail_url):
+            with self.subTest(url=url):
+                etag = self.client_author.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client_author.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(
+                    response.status_code, HTTPStatus.NOT_MODIFIED
+                )
+                self.assertFalse(response.templates)
+                self.assertEqual(len([
+                    query for query in queries.captured_queries
+                    if '"notes_note"' in query['sql']
+                ]), 1)
+
+    def test_changes_produce_new_etag(self):
+        def etags():
+            return (
+                self.client_author.get(self.LIST_URL)['ETag'],
+                self.client_author.get(self.detail_url)['ETag'],
+            )
+
+        old_list, old_detail = etags()
+        self.note.text = 'Новый текст'
+        self.note.save()
+        new_list, new_detail = etags()
+        self.assertNotEqual(old_list, new_list)
+        self.assertNotEqual(old_detail, new_detail)
+        other = Note.objects.create(
+            title='Ещё', text='Текст', author=self.author
+        )
+        self.assertNotEqual(etags()[0], new_list)
+        other.delete()
+        self.assertEqual(etags()[0], new_list)
+
+    def test_etag_depends_on_user_and_page(self):
+        etag = self.client_author.get(self.LIST_URL)['ETag']
+        self.assertNotEqual(
+            self.client_reader.get(self.LIST_URL)['ETag'], etag
+        )
+        self.assertNotEqual(
+            self.client_author.get(self.LIST_URL, {'cursor': ''})['ETag'],
+            etag
+        )
+        response = self.client_reader.get(
+            self.detail_url, HTTP_IF_NONE_MATCH='*'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+
+class TestQueryBudget(TestCase):
+
+    def test_exceeded_budget_lists_queries(self):
+        """Превышение бюджета называет лимит и выполненные запросы."""
+        with self.assertRaisesRegex(
+            BudgetExceeded, r'запросов 2 при бюджете 1(.|\n)*"notes_note"'
+        ):
+            with QueryBudget(queries=1):
+                Note.objects.exists()
+                Note.objects.count()
+
+    def test_budget_within_limits(self):
+        with QueryBudget(queries=1, time_ms=1000) as spent:
+            Note.objects.exists()
+        self.assertEqual(len(spent.queries), 1)
+
+
+class TestProfiling(TestCase):
+    LIST_URL = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+        Note.objects.create(
+            title='Заметка', text='Текст', author=cls.author, slug='note'
+        )
+
+    def setUp(self):
+        self.client.force_login(self.author)
+
+    @override_settings(
+        PROFILING_SERVER_TIMING=True, PROFILING_LOG_SAMPLE_RATE=1
+    )
+    def test_server_timing_and_log(self):
+        """Время SQL и шаблонов видно в заголовке и в журнале."""
+        with self.assertLogs('yanote.profiling', 'INFO') as logs:
+            response = self.client.get(self.LIST_URL)
+        names = [
+            metric.strip().split(';')[0]
+            for metric in response['Server-Timing'].split(',')
+        ]
+        self.assertEqual(names, ['total', 'sql', 'tpl'])
+        [line] = logs.records
+        entry = json.loads(line.getMessage())
+        self.assertEqual(entry['view'], 'notes:list')
+        self.assertIn(f'"{entry["queries"]} queries"',
+                      response['Server-Timing'])
+        self.assertGreater(entry['queries'], 0)
+        self.assertGreater(entry['templates_ms'], 0)
+
+    @override_settings(
+        PROFILING_SERVER_TIMING=False, PROFILING_LOG_SAMPLE_RATE=0
+    )
+    def test_disabled(self):
+        with self.assertNoLogs('yanote.profiling', 'INFO'):
+            response = self.client.get(self.LIST_URL)
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies',
+    AUTHENTICATION_BACKENDS=['yanote.auth.CachedModelBackend'],
+    AUTH_USER_CACHE_TTL=60,
+)
+class TestCachedAuth(TestCase):
+    LIST_URL = reverse('notes:list')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='Автор')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        self.client.get(self.LIST_URL)
+
+    def test_no_session_or_user_queries(self):
+        """Сессия приходит в cookie, а пользователь — из кеша процесса."""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.LIST_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        tables = ' '.join(query['sql'] for query in queries)
+        self.assertNotIn('django_session', tables)
+        self.assertNotIn('"auth_user"', tables)
+
+    def test_password_change_ends_session(self):
+        self.author.set_password('new-password')
+        self.author.save()
+        response = self.client.get(self.LIST_URL)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_logout_forgets_user(self):
+        self.assertIn(self.author.pk, auth._users)
+        self.client.logout()
+        self.assertNotIn(self.author.pk, auth._users)
+
+
+class TestAsyncViews(TransactionTestCase):
+    """Потоки пула открывают свои соединения и видят только
+    зафиксированные данные, поэтому тест без общей транзакции.
+    """
+
+    def setUp(self):
+        async_views = override_settings(NOTES_ASYNC_VIEWS=True)
+        async_views.enable()
+        # Очистка идёт в обратном порядке: сначала прежние настройки.
+        self.addCleanup(self.reload_urls)
+        self.addCleanup(async_views.disable)
+        self.reload_urls()
+        self.author = User.objects.create(username='Автор')
+        self.note = Note.objects.create(
+            title='Заметка', text='Текст', author=self.author, slug='note'
+        )
+        self.urls = (
+            reverse('notes:list'),
+            reverse('notes:detail', args=(self.note.slug,)),
+        )
+        self.client = AsyncClient()
+        self.client.force_login(self.author)
+
+    def reload_urls(self):
+        """Корневой URLconf хранит вложенный resolver со списком
+        маршрутов, поэтому перезагружается вслед за notes.urls.
+        """
+        importlib.reload(notes.urls)
+        importlib.reload(yanote.urls)
+        clear_url_caches()
+
+    def test_read_views_under_asgi(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertTrue(
+                    asyncio.iscoroutinefunction(resolve(url).func)
+                )
+                response = asyncio.run(self.client.get(url))
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertContains(response, self.note.title)
+                self.assertIn('ETag', response)
@@ -1,14 +1,50 @@
+import io
+import json
+import os
+import re
+import sqlite3
+import tempfile
+from datetime import timedelta
 from http import HTTPStatus
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.db import connection, connections, router, transaction
+from django.test import (
+    Client, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from pytils.translit import slugify
 
+from notes import search
+from notes.batch import INVALID_ID
 from notes.forms import WARNING
-from notes.models import Note
+from notes.models import Note, Tombstone
+from notes.slugs import transliterate
 
 User = get_user_model()
+TABLE = re.compile(r'\b(?:FROM|INTO|UPDATE)\s+"?(\w+)')
+MANY = re.compile(r'^\d+ times: ')
+
+
+def statements(queries):
+    """Запросы в виде «команда таблица»; таблицы поискового индекса
+    обоих способов хранения называются search.
+    """
+    result = []
+    for query in queries.captured_queries:
+        # executemany записывается как «N times: SQL».
+        sql = MANY.sub('', query['sql'])
+        command = sql.split()[0]
+        match = TABLE.search(sql)
+        if match:
+            table = match.group(1)
+            command += ' search' if 'search' in table else f' {table}'
+        result.append(command)
+    return result
 
 
 class TestNoteCreation(TestCase):
@@ -87,6 +123,65 @@ class TestNoteCreation(TestCase):
         self.assertEqual(notes_count, 1)
 
 
+class TestSlugAllocation(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='Пользователь')
+
+    def test_duplicate_titles_get_suffixes(self):
+        """Одинаковые заголовки получают slug с суффиксами -2, -3."""
+        notes = [
+            Note.objects.create(
+                title='Заметка', text='Текст', author=self.user
+            )
+            for _ in range(3)
+        ]
+        base = slugify('Заметка')
+        self.assertEqual(
+            [note.slug for note in notes],
+            [base, f'{base}-2', f'{base}-3']
+        )
+
+    def test_suffix_respects_max_length(self):
+        """Суффикс не выводит slug за пределы длины поля."""
+        title = 'a' * 100
+        Note.objects.create(title=title, text='Текст', author=self.user)
+        note = Note.objects.create(title=title, text='Текст', author=self.user)
+        self.assertEqual(note.slug, 'a' * 98 + '-2')
+
+    def test_transliteration_is_memoized(self):
+        """Повторный заголовок транслитерируется из кеша."""
+        transliterate.cache_clear()
+        for _ in range(3):
+            Note.objects.create(text='Без заголовка', author=self.user)
+        info = transliterate.cache_info()
+        self.assertEqual((info.misses, info.hits), (1, 2))
+
+    def test_create_is_single_insert(self):
+        """Без конфликта заметка сохраняется одним INSERT без SELECT.
+
+        Номер изменения вычисляет сам INSERT, а поисковый индекс новой
+        заметки только дополняется. Точка сохранения нужна подбору slug.
+        """
+        search.backend()
+        with CaptureQueriesContext(connection) as queries:
+            Note.objects.create(title='Новая', text='Текст', author=self.user)
+        self.assertEqual(statements(queries), [
+            'SAVEPOINT', 'INSERT notes_note', 'INSERT search', 'RELEASE'
+        ])
+
+    def test_create_with_slug_has_no_savepoint(self):
+        search.backend()
+        with CaptureQueriesContext(connection) as queries:
+            Note.objects.create(
+                title='Новая', text='Текст', slug='new', author=self.user
+            )
+        self.assertEqual(
+            statements(queries), ['INSERT notes_note', 'INSERT search']
+        )
+
+
 class TestNoteEditDelete(TestCase):
     UPDATED_NOTE_TITLE = 'Обновленный заголовок'
     UPDATED_NOTE_TEXT = 'Обновлённая заметка'
@@ -198,3 +293,468 @@ class TestNoteEditDelete(TestCase):
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
 
         self.assertTrue(Note.objects.filter(id=self.note.id).exists())
+
+
+class TestSearch(TestCase):
+    URL_TO_SEARCH = reverse('notes:search')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='Пользователь')
+        cls.reader = User.objects.create(username='Читатель')
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.user)
+
+    def check_backends(self, check):
+        """Поиск проверяется и на FTS5, и на таблице SearchEntry."""
+        for backend in (search.FTS5, search.ENTRIES):
+            with self.subTest(backend=backend), self.settings(
+                    NOTES_SEARCH_BACKEND=backend
+            ), transaction.atomic():
+                check()
+                transaction.set_rollback(True)
+
+    def test_search_finds_word_forms_of_own_notes(self):
+        def check():
+            note = Note.objects.create(
+                author=self.user, title='Задачи на неделю', text='Молоко'
+            )
+            Note.objects.create(
+                author=self.reader, title='Задача', text='Хлеб'
+            )
+            self.assertEqual(
+                search.search_notes(self.user, 'задача', 10), [note]
+            )
+            self.assertEqual(
+                search.search_notes(self.user, 'хлеб', 10), []
+            )
+        self.check_backends(check)
+
+    def test_title_ranked_above_text(self):
+        def check():
+            in_text = Note.objects.create(
+                author=self.user, title='Дела', text='Позвонить врачу'
+            )
+            in_title = Note.objects.create(
+                author=self.user, title='Врач', text='Дела'
+            )
+            self.assertEqual(
+                search.search_notes(self.user, 'врача', 10),
+                [in_title, in_text]
+            )
+        self.check_backends(check)
+
+    def test_changes_update_index(self):
+        def check():
+            note = Note.objects.create(
+                author=self.user, title='Черновик', text='Текст'
+            )
+            note.text = 'Рецепты пирогов'
+            note.save()
+            self.assertEqual(
+                search.search_notes(self.user, 'пирог', 10), [note]
+            )
+            self.assertEqual(
+                search.search_notes(self.user, 'текст', 10), []
+            )
+            note.delete()
+            self.assertEqual(
+                search.search_notes(self.user, 'пирог', 10), []
+            )
+        self.check_backends(check)
+
+    def test_search_page(self):
+        def check():
+            note = Note.objects.create(
+                author=self.user, title='Планы на отпуск', text='Море'
+            )
+            response = self.auth_client.get(
+                self.URL_TO_SEARCH, {'q': 'отпуска'}
+            )
+            self.assertEqual(response.context['object_list'], [note])
+        self.check_backends(check)
+
+
+class TestNoteBatch(TestCase):
+    URL_TO_BATCH = reverse('notes:batch')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='Пользователь')
+        cls.other = User.objects.create(username='Другой')
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.user)
+
+    def setUp(self):
+        self.note = Note.objects.create(
+            author=self.user, title='Старая', text='Текст', slug='old'
+        )
+        self.other_note = Note.objects.create(
+            author=self.other, title='Чужая', text='Текст', slug='other'
+        )
+
+    def post(self, operations, client=None):
+        return (client or self.auth_client).post(
+            self.URL_TO_BATCH, data=json.dumps(operations),
+            content_type='application/json'
+        )
+
+    def test_batch_applies_all_operations(self):
+        response = self.post([
+            {'op': 'create', 'title': 'Первая', 'text': 'А', 'slug': 'one'},
+            {'op': 'create', 'title': 'Заметка', 'text': 'Б'},
+            {'op': 'create', 'title': 'Заметка', 'text': 'В'},
+            {'op': 'update', 'id': self.note.pk, 'text': 'Новый текст'},
+        ])
+        results = response.json()['results']
+        self.assertEqual(
+            [result['status'] for result in results], ['ok'] * 4
+        )
+        base = slugify('Заметка')
+        self.assertEqual(
+            [result['slug'] for result in results],
+            ['one', base, f'{base}-2', 'old']
+        )
+        for result in results:
+            self.assertTrue(
+                Note.objects.filter(
+                    pk=result['id'], slug=result['slug'], author=self.user
+                ).exists()
+            )
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Новый текст')
+        self.assertEqual(self.note.title, 'Старая')
+        response = self.post([{'op': 'delete', 'id': self.note.pk}])
+        self.assertEqual(response.json()['results'][0]['status'], 'ok')
+        self.assertFalse(Note.objects.filter(pk=self.note.pk).exists())
+
+    def test_invalid_operations_reported_per_item(self):
+        """Ошибочные операции не мешают остальным."""
+        response = self.post([
+            {'op': 'update', 'id': self.other_note.pk, 'text': 'Взлом'},
+            {'op': 'delete', 'id': self.other_note.pk},
+            {'op': 'create', 'title': 'Дубль', 'text': 'А', 'slug': 'other'},
+            {'op': 'create', 'title': 'Без текста'},
+            {'op': 'rename'},
+            {'op': 'create', 'title': 'Новая', 'text': 'А', 'slug': 'new'},
+            {'op': 'create', 'title': 'Вторая', 'text': 'Б', 'slug': 'new'},
+        ])
+        results = response.json()['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['error'] * 5 + ['ok', 'error']
+        )
+        self.assertIn('id', results[0]['errors'])
+        self.assertEqual(results[2]['errors']['slug'], ['other' + WARNING])
+        self.assertIn('text', results[3]['errors'])
+        self.assertEqual(
+            set(Note.objects.values_list('slug', flat=True)),
+            {'old', 'other', 'new'}
+        )
+        self.other_note.refresh_from_db()
+        self.assertEqual(self.other_note.text, 'Текст')
+
+    def test_malformed_ids_reported_per_item(self):
+        """Id не целым числом — ошибка своей операции, а не всего пакета."""
+        response = self.post([
+            {'op': 'update', 'id': [], 'text': 'А'},
+            {'op': 'delete', 'id': {}},
+            {'op': 'delete', 'id': True},
+            {'op': 'delete', 'id': str(self.note.pk)},
+            {'op': 'update', 'id': self.note.pk, 'text': 'Новый текст'},
+        ])
+        results = response.json()['results']
+        self.assertEqual(
+            [result['status'] for result in results],
+            ['error'] * 4 + ['ok']
+        )
+        for result in results[:4]:
+            self.assertEqual(result['errors'], {'id': [INVALID_ID]})
+        self.note.refresh_from_db()
+        self.assertEqual(self.note.text, 'Новый текст')
+
+    def test_slug_of_deleted_note_can_be_reused(self):
+        results = self.post([
+            {'op': 'delete', 'id': self.note.pk},
+            {'op': 'create', 'title': 'Замена', 'text': 'А', 'slug': 'old'},
+        ]).json()['results']
+        self.assertEqual([result['status'] for result in results],
+                         ['ok', 'ok'])
+        self.assertEqual(Note.objects.get(slug='old').title, 'Замена')
+
+    def test_query_count_does_not_grow_with_batch(self):
+        """Число запросов к заметкам не зависит от размера пакета."""
+        def count_queries(size):
+            operations = [
+                {'op': 'create', 'title': f'Заметка {size} {index}',
+                 'text': 'Текст'}
+                for index in range(size)
+            ] + [{'op': 'update', 'id': self.note.pk, 'text': str(size)}]
+            with CaptureQueriesContext(connection) as queries:
+                self.post(operations)
+            return len([
+                query for query in queries.captured_queries
+                if '"notes_note"' in query['sql']
+            ])
+        self.assertEqual(count_queries(5), count_queries(50))
+
+    def test_bad_requests(self):
+        self.assertEqual(
+            self.post([{'op': 'delete', 'id': self.note.pk}],
+                      client=self.client).status_code,
+            HTTPStatus.UNAUTHORIZED
+        )
+        response = self.auth_client.post(
+            self.URL_TO_BATCH, data='{', content_type='application/json'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertEqual(
+            self.post({'op': 'delete'}).status_code, HTTPStatus.BAD_REQUEST
+        )
+
+
+class TestNoteSync(TestCase):
+    URL_TO_SYNC = reverse('notes:sync')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username='Пользователь')
+        cls.other = User.objects.create(username='Другой')
+        cls.auth_client = Client()
+        cls.auth_client.force_login(cls.user)
+
+    def setUp(self):
+        self.notes = [
+            Note.objects.create(
+                author=self.user, title=f'Заметка {index}', text='Текст'
+            )
+            for index in range(3)
+        ]
+        Note.objects.create(author=self.other, title='Чужая', text='Текст')
+
+    def sync(self, token=None):
+        params = {} if token is None else {'token': token}
+        return self.auth_client.get(self.URL_TO_SYNC, params).json()
+
+    def test_full_sync_returns_own_notes(self):
+        data = self.sync()
+        self.assertEqual(
+            [note['id'] for note in data['notes']],
+            [note.pk for note in self.notes]
+        )
+        self.assertEqual(data['deleted'], [])
+        self.assertFalse(data['more'])
+        self.assertEqual(data['token'], self.notes[-1].revision)
+
+    def test_delta_contains_only_changes(self):
+        """После token приходят только изменения и удаления."""
+        token = self.sync()['token']
+        self.assertEqual(self.sync(token)['notes'], [])
+        first, second, _ = self.notes
+        first.text = 'Изменено'
+        first.save()
+        deleted_id = second.pk
+        second.delete()
+        created = Note.objects.create(
+            author=self.user, title='Новая', text='Текст'
+        )
+        data = self.sync(token)
+        self.assertEqual(
+            [(note['id'], note['text']) for note in data['notes']],
+            [(first.pk, 'Изменено'), (created.pk, 'Текст')]
+        )
+        self.assertEqual(data['deleted'], [deleted_id])
+        self.assertEqual(self.sync(data['token'])['notes'], [])
+
+    def test_deleting_latest_note_is_synced(self):
+        """След получает номер больше номера удалённой заметки."""
+        token = self.sync()['token']
+        latest = self.notes[-1]
+        deleted_id = latest.pk
+        latest.delete()
+        self.assertEqual(self.sync(token)['deleted'], [deleted_id])
+
+    def test_revisions_are_per_author(self):
+        """Записи другого автора не расходуют номера пользователя."""
+        Note.objects.create(author=self.other, title='Ещё', text='Текст')
+        self.assertEqual(
+            list(Note.objects.filter(author=self.user).order_by(
+                'revision'
+            ).values_list('revision', flat=True)),
+            [1, 2, 3]
+        )
+
+    def test_prune_keeps_latest_tombstone(self):
+        first, second, third = self.notes
+        second_id, third_id = second.pk, third.pk
+        first.delete()
+        token = self.sync()['token']
+        second.delete()
+        Tombstone.objects.update(deleted=timezone.now() - timedelta(days=1))
+        call_command('prune_tombstones', days=0, stderr=io.StringIO())
+        self.assertEqual(
+            list(Tombstone.objects.values_list('note_id', flat=True)),
+            [second_id]
+        )
+        third.delete()
+        created = Note.objects.create(
+            author=self.user, title='Новая', text='Текст'
+        )
+        data = self.sync(token)
+        self.assertEqual(data['deleted'], [second_id, third_id])
+        self.assertEqual([note['id'] for note in data['notes']], [created.pk])
+
+    def test_token_before_pruned_tombstones_needs_reset(self):
+        """Клиент, пропустивший удалённые следы, получает 410 и reset."""
+        first, second, third = self.notes
+        stale_token, second_id = third.revision, second.pk
+        first.delete()
+        fresh_token = self.sync()['token']
+        second.delete()
+        Tombstone.objects.update(deleted=timezone.now() - timedelta(days=1))
+        call_command('prune_tombstones', days=0, stderr=io.StringIO())
+        response = self.auth_client.get(
+            self.URL_TO_SYNC, {'token': stale_token}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.GONE)
+        self.assertIs(response.json()['reset'], True)
+        self.assertEqual(self.sync(fresh_token)['deleted'], [second_id])
+        full = self.sync()
+        self.assertEqual(
+            [note['id'] for note in full['notes']], [third.pk]
+        )
+        self.assertEqual(self.sync(full['token'])['deleted'], [])
+
+    def test_batch_changes_are_synced(self):
+        token = self.sync()['token']
+        self.auth_client.post(
+            reverse('notes:batch'), content_type='application/json',
+            data=json.dumps([
+                {'op': 'update', 'id': self.notes[0].pk, 'text': 'Пакет'},
+            ])
+        )
+        data = self.sync(token)
+        self.assertEqual(
+            [note['text'] for note in data['notes']], ['Пакет']
+        )
+
+    def test_sync_pages(self):
+        """Изменения отдаются порциями, пока more истинно."""
+        deleted_id = self.notes[0].pk
+        self.notes[0].delete()
+        seen, token = [], None
+        with self.settings(NOTES_SYNC_PAGE_SIZE=1):
+            while True:
+                data = self.sync(token)
+                seen += [note['id'] for note in data['notes']]
+                seen += data['deleted']
+                token = data['token']
+                if not data['more']:
+                    break
+        self.assertEqual(
+            seen, [note.pk for note in self.notes[1:]] + [deleted_id]
+        )
+
+    def test_sync_cost_does_not_grow_with_notes(self):
+        token = self.sync()['token']
+        for index in range(20):
+            Note.objects.create(
+                author=self.user, title=f'Ещё {index}', text='Текст'
+            )
+        with CaptureQueriesContext(connection) as queries:
+            self.sync(token)
+        statements = [
+            query['sql'] for query in queries.captured_queries
+            if '"notes_note"' in query['sql']
+            or '"notes_tombstone"' in query['sql']
+        ]
+        self.assertEqual(len(statements), 2)
+
+    def test_invalid_token(self):
+        response = self.auth_client.get(self.URL_TO_SYNC, {'token': 'x'})
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+
+    def test_deleting_author_keeps_tombstones(self):
+        self.other.delete()
+        self.assertFalse(Note.objects.filter(author_id=self.other.pk))
+
+
+class TestReplica(TransactionTestCase):
+    """Реплика — снимок основной базы в отдельном файле SQLite.
+
+    Записи после снимка на неё не попадают, как при отставании.
+    """
+    URL_TO_ADD = reverse('notes:add')
+    LIST_URL = reverse('notes:list')
+
+    def setUp(self):
+        self.author = User.objects.create(username='Автор')
+        Note.objects.create(
+            title='Заметка', text='Текст', author=self.author, slug='note'
+        )
+        self.client.force_login(self.author)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'replica.sqlite3')
+        connection.ensure_connection()
+        target = sqlite3.connect(path)
+        connection.connection.backup(target)
+        target.close()
+        connections.databases['replica'] = {
+            **connection.settings_dict, 'NAME': path
+        }
+        self.addCleanup(connections.databases.pop, 'replica')
+        self.addCleanup(connections.__delitem__, 'replica')
+        self.addCleanup(connections['replica'].close)
+        replicas = override_settings(DATABASE_REPLICAS=['replica'])
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+
+    def test_list_reads_replica(self):
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get(self.LIST_URL)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertTrue(
+            any('"notes_note"' in query['sql'] for query in queries)
+        )
+
+    def test_author_reads_primary_after_write(self):
+        """Автор видит свою заметку, пока реплика отстаёт."""
+        response = self.client.post(self.URL_TO_ADD, data={
+            'title': 'Новая', 'text': 'Текст', 'slug': 'new'
+        })
+        self.assertRedirects(response, reverse('notes:success'))
+        pin = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(pin['max-age'], settings.REPLICA_PIN_SECONDS)
+        detail_url = reverse('notes:detail', args=('new',))
+        response = self.client.get(detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        del self.client.cookies[settings.REPLICA_PIN_COOKIE]
+        response = self.client.get(detail_url)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_reads_without_request_use_primary(self):
+        self.assertEqual(router.db_for_read(Note), 'default')
+        self.assertFalse(router.allow_migrate_model('replica', Note))
+
+
+class TestSqlitePragmas(TestCase):
+
+    @override_settings(SQLITE_PRAGMAS={
+        'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234
+    })
+    def test_pragmas_applied_to_new_connections(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        default = connections['default']
+        database = type(default)({
+            **default.settings_dict,
+            'NAME': os.path.join(directory.name, 'db.sqlite3'),
+        }, alias='pragmas')
+        self.addCleanup(database.close)
+        with database.cursor() as cursor:
+            pragmas = [
+                cursor.execute(f'PRAGMA {name}').fetchone()[0]
+                for name in ('journal_mode', 'synchronous', 'busy_timeout')
+            ]
+        self.assertEqual(pragmas, ['wal', 1, 1234])
@@ -19,6 +19,7 @@ URLS = {
     'list': 'notes:list',
     'add': 'notes:add',
     'success': 'notes:success',
+    'search': 'notes:search',
 }
 
 
@@ -66,7 +67,9 @@ class TestRoutes(TestCase):
 
     def test_pages_availability_for_auth_users(self):
         """Проверяет доступность страниц для авторизованных пользователей."""
-        urls = (URLS['list'], URLS['add'], URLS['success'])
+        urls = (
+            URLS['list'], URLS['add'], URLS['success'], URLS['search']
+        )
         for name in urls:
             with self.subTest(name=name):
                 url = reverse(name)
@@ -80,6 +83,7 @@ class TestRoutes(TestCase):
             (URLS['list'], None),
             (URLS['add'], None),
             (URLS['success'], None),
+            (URLS['search'], None),
             (URLS['detail'], (self.note.slug,)),
             (URLS['edit'], (self.note.slug,)),
             (URLS['delete'], (self.note.slug,)),
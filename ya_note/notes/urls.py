@@ -1,15 +1,26 @@
+from django.conf import settings
 from django.urls import path
 
-from notes import views
+from notes import async_views, views
 
 app_name = 'notes'
 
+if settings.NOTES_ASYNC_VIEWS:
+    note_detail = async_views.note_detail
+    notes_list = async_views.notes_list
+else:
+    note_detail = views.NoteDetail.as_view()
+    notes_list = views.NotesList.as_view()
+
 urlpatterns = [
     path('', views.Home.as_view(), name='home'),
     path('add/', views.NoteCreate.as_view(), name='add'),
     path('edit/<slug:slug>/', views.NoteUpdate.as_view(), name='edit'),
-    path('note/<slug:slug>/', views.NoteDetail.as_view(), name='detail'),
+    path('note/<slug:slug>/', note_detail, name='detail'),
     path('delete/<slug:slug>/', views.NoteDelete.as_view(), name='delete'),
-    path('notes/', views.NotesList.as_view(), name='list'),
+    path('notes/', notes_list, name='list'),
+    path('search/', views.NoteSearch.as_view(), name='search'),
+    path('batch/', views.NoteBatch.as_view(), name='batch'),
+    path('sync/', views.NoteSync.as_view(), name='sync'),
     path('done/', views.NoteSuccess.as_view(), name='success'),
 ]
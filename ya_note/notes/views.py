@@ -1,9 +1,22 @@
+import json
+from http import HTTPStatus
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
 from django.views import generic
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
 
-from .forms import NoteForm
+from . import batch, search, sync
+from .etags import note_detail_etag, notes_list_etag
+from .forms import WARNING, NoteForm
 from .models import Note
+from .pagination import KeysetPaginationMixin
+from .slugs import slug_taken
 
 
 class Home(generic.TemplateView):
@@ -26,22 +39,38 @@ class NoteBase(LoginRequiredMixin):
         return self.model.objects.filter(author=self.request.user)
 
 
-class NoteCreate(NoteBase, generic.CreateView):
-    """Добавление заметки."""
+class NoteFormMixin:
+    """Общая часть создания и редактирования заметки."""
     template_name = 'notes/form.html'
     form_class = NoteForm
 
     def form_valid(self, form):
-        new_note = form.save(commit=False)
-        new_note.author = self.request.user
-        new_note.save()
+        """Занятый slug обнаруживается при записи, а не заранее.
+
+        Запись идёт в точке сохранения, чтобы после ошибки можно было
+        проверить slug и во внешней транзакции.
+        """
+        try:
+            with transaction.atomic():
+                return super().form_valid(form)
+        except IntegrityError:
+            slug = form.instance.slug
+            if not slug_taken(form.instance, slug):
+                raise
+            form.add_error('slug', slug + WARNING)
+            return self.form_invalid(form)
+
+
+class NoteCreate(NoteBase, NoteFormMixin, generic.CreateView):
+    """Добавление заметки."""
+
+    def form_valid(self, form):
+        form.instance.author = self.request.user
         return super().form_valid(form)
 
 
-class NoteUpdate(NoteBase, generic.UpdateView):
+class NoteUpdate(NoteBase, NoteFormMixin, generic.UpdateView):
     """Редактирование заметки."""
-    template_name = 'notes/form.html'
-    form_class = NoteForm
 
 
 class NoteDelete(NoteBase, generic.DeleteView):
@@ -49,11 +78,116 @@ class NoteDelete(NoteBase, generic.DeleteView):
     template_name = 'notes/delete.html'
 
 
-class NotesList(NoteBase, generic.ListView):
-    """Список всех заметок пользователя."""
-    template_name = 'notes/list.html'
+# Страницы проверяются условным запросом при каждом обращении:
+# совпавший ETag даёт 304 после одного агрегирующего запроса.
+revalidate = cache_control(private=True, no_cache=True)
 
 
+@method_decorator(
+    (revalidate, condition(etag_func=notes_list_etag)), name='get'
+)
+class NotesList(NoteBase, KeysetPaginationMixin, generic.ListView):
+    """Список всех заметок пользователя постранично по курсору."""
+    template_name = 'notes/list.html'
+    paginate_keys = ('id',)
+
+    def get_paginate_by(self, queryset):
+        return settings.NOTES_COUNT_ON_PAGE
+
+
+class NoteApiBase(NoteBase):
+    """Основа JSON-представлений: без входа ответ 401, а не редирект."""
+
+    def handle_no_permission(self):
+        return self.error('Требуется вход.', HTTPStatus.UNAUTHORIZED)
+
+    def error(self, message, status=HTTPStatus.BAD_REQUEST, **data):
+        return JsonResponse({'error': message, **data}, status=status)
+
+
+class NoteBatch(NoteApiBase, generic.View):
+    """Пакет операций над заметками пользователя в одном запросе.
+
+    Тело запроса — JSON-список операций вида {"op": "create", "title":
+    …, "text": …, "slug": …}, {"op": "update", "id": …, …} или
+    {"op": "delete", "id": …}. В ответе результат каждой операции в том
+    же порядке.
+    """
+    http_method_names = ('post',)
+
+    def post(self, request, *args, **kwargs):
+        try:
+            operations = json.loads(request.body)
+        except ValueError:
+            return self.error('Тело запроса не является JSON.')
+        if not isinstance(operations, list) or not all(
+                isinstance(operation, dict) for operation in operations
+        ):
+            return self.error('Ожидается список операций.')
+        if len(operations) > settings.NOTES_BATCH_MAX_SIZE:
+            return self.error(
+                'Не больше {} операций за запрос.'.format(
+                    settings.NOTES_BATCH_MAX_SIZE
+                )
+            )
+        try:
+            results = batch.run(
+                operations, self.get_queryset(), request.user
+            )
+        except IntegrityError:
+            return self.error(
+                'Пакет конфликтует с параллельными изменениями, '
+                'повторите запрос.', status=HTTPStatus.CONFLICT
+            )
+        return JsonResponse(
+            {'results': results}, json_dumps_params={'ensure_ascii': False}
+        )
+
+
+class NoteSync(NoteApiBase, generic.View):
+    """Изменения заметок пользователя после номера ?token=.
+
+    Клиент повторяет запрос с полученным token, пока more истинно.
+    На устаревший token ответ 410 с reset: клиент отбрасывает свою копию
+    и синхронизируется заново без token.
+    """
+    http_method_names = ('get',)
+
+    def get(self, request, *args, **kwargs):
+        try:
+            token = sync.parse_token(request.GET.get('token'))
+        except sync.InvalidToken:
+            return self.error('Неверный token.')
+        try:
+            data = sync.changes(
+                self.get_queryset(), request.user, token,
+                settings.NOTES_SYNC_PAGE_SIZE
+            )
+        except sync.TokenExpired:
+            return self.error(
+                'token устарел, нужна полная синхронизация.',
+                HTTPStatus.GONE, reset=True
+            )
+        return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
+
+
+class NoteSearch(LoginRequiredMixin, generic.TemplateView):
+    """Поиск по заметкам пользователя."""
+    template_name = 'notes/search.html'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.request.GET.get('q', '').strip()
+        context['query'] = query
+        context['object_list'] = search.search_notes(
+            self.request.user, query, settings.NOTES_SEARCH_RESULTS
+        ) if query else []
+        return context
+
+
+@method_decorator(
+    (revalidate, condition(etag_func=note_detail_etag)), name='get'
+)
 class NoteDetail(NoteBase, generic.DetailView):
     """Заметка подробно."""
     template_name = 'notes/detail.html'
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from django.urls import reverse_lazy
@@ -22,6 +23,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yanote.middleware.ProfilingMiddleware',
+    'yanote.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -59,6 +62,39 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения: путь к её файлу SQLite в переменной окружения
+# YANOTE_REPLICA_DB. Страницы читают заметки с реплики, а читатель
+# после своей записи REPLICA_PIN_SECONDS секунд читает основную базу.
+DATABASE_REPLICAS = []
+if os.environ.get('YANOTE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ['YANOTE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['yanote.routers.ReplicaRouter']
+REPLICA_PIN_COOKIE = 'primary_db'
+REPLICA_PIN_SECONDS = 5
+
+# Профиль SQLite для рабочей нагрузки: YANOTE_DB_PROFILE=production.
+# WAL — читатели не ждут пишущих; synchronous=NORMAL в WAL не портит
+# базу, лишь теряет последние транзакции при сбое питания; mmap_size —
+# чтение файла через отображение в память; busy_timeout — пишущий ждёт
+# блокировку до 5 секунд вместо ошибки «database is locked».
+# Соединения живут между запросами (CONN_MAX_AGE), чтобы не открывать
+# базу и не выполнять PRAGMA на каждый запрос.
+SQLITE_PRAGMAS = {}
+if os.environ.get('YANOTE_DB_PROFILE') == 'production':
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        'busy_timeout': 5000,
+    }
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 600
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -87,3 +123,61 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = reverse_lazy('users:login')
 LOGIN_REDIRECT_URL = reverse_lazy('notes:home')
+
+# Сессии вошедших пользователей:
+# 'db' — сессия и пользователь читаются из БД на каждый запрос;
+# 'cache' — сессия читается из кеша, а пишется и в кеш, и в БД;
+# 'signed_cookies' — сессия хранится у клиента в подписанной cookie.
+# В режимах 'cache' и 'signed_cookies' пользователь сессии берётся из
+# кеша процесса (до AUTH_USER_CACHE_TTL секунд). Режим задаёт переменная
+# окружения YANOTE_SESSION_MODE; смена режима завершает открытые сессии.
+SESSION_MODE = os.environ.get('YANOTE_SESSION_MODE', 'db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cache': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_MODE]
+if SESSION_MODE != 'db':
+    AUTHENTICATION_BACKENDS = ['yanote.auth.CachedModelBackend']
+AUTH_USER_CACHE_TTL = 30
+AUTH_USER_CACHE_SIZE = 1024
+
+NOTES_COUNT_ON_PAGE = 50
+
+# Сколько последних заголовков помнит кеш транслитерации slug.
+NOTES_SLUG_CACHE_SIZE = 1024
+
+# Хранение поискового индекса: 'fts5', 'entries' или 'auto' — FTS5,
+# если таблица для него создана миграцией.
+NOTES_SEARCH_BACKEND = 'auto'
+NOTES_SEARCH_RESULTS = 20
+
+# Наибольшее число операций в одном запросе к notes:batch.
+NOTES_BATCH_MAX_SIZE = 500
+
+# Наибольшее число изменений в одном ответе notes:sync.
+NOTES_SYNC_PAGE_SIZE = 500
+# Сколько дней хранить следы удалённых заметок для синхронизации.
+NOTES_SYNC_TOMBSTONE_DAYS = 90
+
+# Асинхронные страницы чтения для запуска под ASGI: запросы к БД и
+# отрисовка выполняются в пуле потоков, а не в общем потоке синхронных
+# представлений.
+NOTES_ASYNC_VIEWS = False
+
+# Заголовок Server-Timing со временем запроса, SQL и шаблонов и доля
+# запросов (от 0 до 1), замеры которых пишутся в журнал
+# yanote.profiling строкой JSON.
+PROFILING_SERVER_TIMING = DEBUG
+PROFILING_LOG_SAMPLE_RATE = 0.0
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yanote.profiling': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}